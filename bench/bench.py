@@ -0,0 +1,357 @@
+"""
+S++ Benchmark Suite
+Times the Lexer, Parser and tree Interpreter separately on the example
+programs and on generated stress workloads, and compares the results with
+a stored baseline so performance regressions in interpreter.py show up.
+
+    python bench/bench.py                       # run and compare with bench/baseline.json
+    python bench/bench.py --update-baseline     # record a new baseline
+    python bench/bench.py --only many_calls --repeat 5
+
+Every phase is timed in CPU time, keeping the best of --repeat runs.
+tokens/s is tokens over lexing time, stmts/s parsed statements over parsing
+time, and peak memory comes from a separate run under tracemalloc. vm/tree
+is the time to compile and run the optimized program on the bytecode VM
+over the tree interpreter's run time.
+Timings depend on the machine: record the baseline on the machine that
+runs the comparison.
+"""
+
+import argparse
+import glob
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+
+import interpreter as spp
+
+BASELINE_PATH = os.path.join(BENCH_DIR, 'baseline.json')
+BASELINE_VERSION = 1
+
+# A metric regresses when it grows by more than the threshold and by more
+# than its noise floor, so sub-millisecond phases never fail the run
+DEFAULT_THRESHOLD = 0.25
+NOISE_FLOORS = {'lex': 0.002, 'parse': 0.002, 'optimize': 0.002, 'run': 0.005, 'vm': 0.005,
+                'peak_memory': 256 * 1024}
+PHASES = ('lex', 'parse', 'optimize', 'run')
+
+# Answers for example programs that ask for input
+EXAMPLE_ANSWERS = {
+    '08_calculator.spp': ['10', '5', '7', '0', '2.5', '2'],
+}
+
+# ============================================================================
+# WORKLOADS
+# ============================================================================
+
+def deep_recursion() -> str:
+    return '''
+define countdown with n
+  if n is greater than 0 then
+    set rest to call countdown with n minus 1.
+    return rest plus 1.
+  end.
+  return 0.
+end.
+set depth to call countdown with 10000.
+print depth.
+'''
+
+def counter_loops() -> str:
+    return '''
+set i to 0.
+set total to 0.
+repeat while i is less than 100000
+  set total to total plus i.
+  set i to i plus 1.
+end.
+print total.
+
+set j to 0.
+repeat while j is less than 100000
+  set j to j plus 2.
+  set k to j times 3.
+end.
+print k.
+'''
+
+def print_heavy() -> str:
+    return '''
+set i to 0.
+repeat 20000 times
+  print i.
+  print the loop is still running.
+  set i to i plus 1.
+end.
+'''
+
+def large_source() -> str:
+    blocks = []
+    for i in range(2000):
+        blocks.append(f'set value{i} to {i} plus {i % 7} times 2.\n'
+                      f'if value{i} is greater than {i} then\n'
+                      f'  print value{i}.\n'
+                      f'otherwise\n'
+                      f'  print value {i} is small.\n'
+                      f'end.\n')
+    return ''.join(blocks)
+
+def many_calls() -> str:
+    return '''
+define add with a, b
+  return a plus b.
+end.
+define combine with a, b
+  set sum to call add with a, b.
+  return sum minus 1.
+end.
+set i to 0.
+set total to 0.
+repeat while i is less than 10000
+  set total to call combine with total, i.
+  set i to i plus 1.
+end.
+print total.
+'''
+
+SYNTHETIC_WORKLOADS: Dict[str, Callable[[], str]] = {
+    'deep_recursion': deep_recursion,
+    'counter_loops': counter_loops,
+    'print_heavy': print_heavy,
+    'large_source': large_source,
+    'many_calls': many_calls,
+}
+
+def load_workloads() -> Dict[str, Tuple[str, List[str]]]:
+    """Every workload's source and scripted ask answers, by name"""
+    workloads = {}
+    for path in sorted(glob.glob(os.path.join(REPO_DIR, 'examples', '*.spp'))):
+        name = os.path.basename(path)
+        with open(path, 'r') as f:
+            workloads[name[:-len('.spp')]] = (f.read(), EXAMPLE_ANSWERS.get(name, []))
+    for name, generate in SYNTHETIC_WORKLOADS.items():
+        workloads[name] = (generate(), [])
+    return workloads
+
+# ============================================================================
+# MEASUREMENT
+# ============================================================================
+
+class NullSink:
+    """Discards program output so printing costs only the interpreter's share"""
+    def write(self, text: str):
+        pass
+    
+    def flush(self):
+        pass
+
+def count_statements(statements: List[spp.ASTNode]) -> int:
+    count = 0
+    for stmt in statements:
+        count += 1
+        for field in ('body', 'then_body', 'else_body'):
+            count += count_statements(getattr(stmt, field, None) or [])
+    return count
+
+def run_phases(source: str, answers: List[str]) -> Dict[str, Any]:
+    """Lex, parse, optimize and run once, timing every phase"""
+    timings: Dict[str, Any] = {}
+    start = time.process_time()
+    lexer = spp.Lexer(source)
+    tokens = lexer.token_buffer()
+    timings['lex'] = time.process_time() - start
+
+    start = time.process_time()
+    program = spp.Parser(lexer).parse()
+    timings['parse'] = time.process_time() - start
+    timings['tokens'] = len(tokens) - 1  # Not counting EOF
+    timings['statements'] = count_statements(program.statements)
+
+    start = time.process_time()
+    program = spp.Optimizer().optimize(program)
+    timings['optimize'] = time.process_time() - start
+
+    # Compiled before the tree run, which rewrites nodes as it prepares them
+    vm = spp.VirtualMachine(output=spp.OutputBuffer(NullSink()), input_source=spp.BatchInput(answers))
+    start = time.process_time()
+    try:
+        vm.run(spp.Compiler().compile_program(program))
+    except Exception as e:
+        timings['vm_error'] = str(e)
+    timings['vm'] = time.process_time() - start
+
+    interpreter = spp.Interpreter(output=spp.OutputBuffer(NullSink()),
+                                  input_source=spp.BatchInput(answers))
+    start = time.process_time()
+    try:
+        interpreter.visit(program)
+    except Exception as e:
+        timings['error'] = str(e)
+    timings['run'] = time.process_time() - start
+    return timings
+
+def measure(source: str, answers: List[str], repeat: int) -> Dict[str, Any]:
+    """Best time per phase over repeat runs, plus peak memory from a separate traced run"""
+    result: Dict[str, Any] = {}
+    for _ in range(repeat):
+        timings = run_phases(source, answers)
+        for phase in PHASES + ('vm',):
+            result[phase] = min(result.get(phase, float('inf')), timings[phase])
+        for key in ('tokens', 'statements', 'error', 'vm_error'):
+            if key in timings:
+                result[key] = timings[key]
+
+    # tracemalloc slows everything down, so it gets a run of its own
+    tracemalloc.start()
+    try:
+        run_phases(source, answers)
+        result['peak_memory'] = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    result['tokens_per_sec'] = result['tokens'] / result['lex'] if result['lex'] else 0.0
+    result['statements_per_sec'] = result['statements'] / result['parse'] if result['parse'] else 0.0
+    return result
+
+# ============================================================================
+# BASELINE
+# ============================================================================
+
+def load_baseline(path: str) -> Optional[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        baseline = json.load(f)
+    if baseline.get('version') != BASELINE_VERSION:
+        raise Exception(f"Baseline {path} has version {baseline.get('version')}, expected {BASELINE_VERSION}")
+    return baseline
+
+def write_baseline(path: str, results: Dict[str, Dict[str, Any]]):
+    baseline = {
+        'version': BASELINE_VERSION,
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'results': results,
+    }
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+def find_regressions(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Any],
+                     threshold: float) -> List[str]:
+    """One message per metric that grew past the threshold and its noise floor"""
+    regressions = []
+    for name, result in results.items():
+        expected = baseline['results'].get(name)
+        if expected is None:
+            continue
+        for metric, floor in NOISE_FLOORS.items():
+            old, new = expected.get(metric), result.get(metric)
+            if old is None or new is None:
+                continue
+            if new > old * (1 + threshold) and new - old > floor:
+                regressions.append(f"{name}: {metric} {format_metric(metric, old)} -> "
+                                   f"{format_metric(metric, new)} (+{(new / old - 1) * 100:.0f}%)")
+    return regressions
+
+# ============================================================================
+# REPORT
+# ============================================================================
+
+def format_metric(metric: str, value: float) -> str:
+    if metric == 'peak_memory':
+        return f'{value / 1024:.0f}K'
+    return f'{value * 1000:.1f}ms'
+
+def format_rate(value: float) -> str:
+    if value >= 1e6:
+        return f'{value / 1e6:.1f}M'
+    if value >= 1e3:
+        return f'{value / 1e3:.0f}K'
+    return f'{value:.0f}'
+
+def print_report(results: Dict[str, Dict[str, Any]], baseline: Optional[Dict[str, Any]]):
+    header = (f"{'workload':<18} {'lex':>9} {'parse':>9} {'optimize':>9} {'run':>10} "
+              f"{'tokens/s':>9} {'stmts/s':>9} {'peak mem':>9} {'vm/tree':>8} {'vs base':>8}")
+    print(header)
+    print('-' * len(header))
+    for name, result in results.items():
+        comparison = ''
+        expected = baseline['results'].get(name) if baseline else None
+        if expected:
+            old_total = sum(expected[phase] for phase in PHASES)
+            new_total = sum(result[phase] for phase in PHASES)
+            comparison = f'{new_total / old_total:.2f}x' if old_total else ''
+        vm_ratio = f"{result['vm'] / result['run']:.2f}x" if result['run'] else ''
+        print(f"{name:<18} "
+              + ' '.join(f"{format_metric(phase, result[phase]):>{10 if phase == 'run' else 9}}"
+                         for phase in PHASES)
+              + f" {format_rate(result['tokens_per_sec']):>9} {format_rate(result['statements_per_sec']):>9}"
+              f" {format_metric('peak_memory', result['peak_memory']):>9} {vm_ratio:>8} {comparison:>8}")
+        if 'error' in result:
+            print(f"{'':<18} error: {result['error']}")
+        if 'vm_error' in result:
+            print(f"{'':<18} vm error: {result['vm_error']}")
+
+def main(argv: Optional[List[str]] = None) -> int:
+    arg_parser = argparse.ArgumentParser(description="S++ benchmark suite")
+    arg_parser.add_argument('--only', action='append', metavar='NAME',
+                            help="run only this workload (repeatable)")
+    arg_parser.add_argument('--repeat', type=int, default=3, metavar='N',
+                            help="time every workload N times and keep the best (default 3)")
+    arg_parser.add_argument('--baseline', default=BASELINE_PATH, metavar='FILE',
+                            help="baseline JSON to compare with (default bench/baseline.json)")
+    arg_parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, metavar='FRACTION',
+                            help=f"fail when a metric grows by more than this fraction "
+                                 f"(default {DEFAULT_THRESHOLD})")
+    arg_parser.add_argument('--update-baseline', action='store_true',
+                            help="write the results to the baseline file instead of comparing")
+    arg_parser.add_argument('--json', metavar='FILE',
+                            help="also write the results to FILE")
+    args = arg_parser.parse_args(argv)
+
+    workloads = load_workloads()
+    names = args.only or list(workloads)
+    unknown = [name for name in names if name not in workloads]
+    if unknown:
+        arg_parser.error(f"unknown workload {', '.join(unknown)}; choose from {', '.join(workloads)}")
+
+    results = {}
+    for name in names:
+        source, answers = workloads[name]
+        results[name] = measure(source, answers, args.repeat)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write('\n')
+    if args.update_baseline:
+        write_baseline(args.baseline, results)
+        print_report(results, None)
+        print(f"\nBaseline written to {args.baseline}")
+        return 0
+
+    baseline = load_baseline(args.baseline)
+    print_report(results, baseline)
+    if baseline is None:
+        print(f"\nNo baseline at {args.baseline}; run with --update-baseline to record one")
+        return 0
+    regressions = find_regressions(results, baseline, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold * 100:.0f}%:")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+    print(f"\nNo regressions beyond {args.threshold * 100:.0f}%")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
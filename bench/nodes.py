@@ -0,0 +1,89 @@
+"""
+S++ Node Microbenchmark
+Times the tree Interpreter evaluating single expressions, to show what one
+node visit costs for each operator and operand shape.
+
+    python bench/nodes.py
+    python bench/nodes.py --number 500000 --repeat 7
+
+Every expression is parsed, prepared the way a run prepares it and then
+evaluated --number times against the same variables, keeping the best of
+--repeat rounds. ns/node divides the time of one evaluation by the nodes
+the expression has. Each expression is timed twice: as a run prepares it,
+with every BinaryOp specialized, and with specialize() off, where its
+BinaryOps stay generic. ratio is the specialized time over the generic
+one. Timings depend on the machine, so compare runs made on the same one.
+"""
+
+import argparse
+import os
+import sys
+import timeit
+from typing import List, Optional, Tuple
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+
+import interpreter as spp
+
+# Variables every expression can read
+SETUP = 'set x to 7.\nset y to 3.\n'
+
+EXPRESSIONS: List[Tuple[str, str]] = [
+    ('variable', 'x'),
+    ('variable plus literal', 'x plus 1'),
+    ('literal times variable', '2 times x'),
+    ('variable minus variable', 'x minus y'),
+    ('variable divided by literal', 'x divided by 2'),
+    ('variable less than literal', 'x is less than 10'),
+    ('variable equals variable', 'x equals y'),
+    ('variable or literal', 'x or 0'),
+    ('nested arithmetic', 'x times 2 plus y minus 1'),
+]
+
+def generalize(node: spp.ASTNode):
+    """Undo specialize() on node and everything under it"""
+    if isinstance(node, spp.BinaryOp):
+        node.__class__ = spp.BinaryOp
+    for value in spp.node_values(node):
+        if isinstance(value, spp.ASTNode):
+            generalize(value)
+
+def prepare(expression: str, specialized: bool) -> Tuple[spp.Interpreter, spp.ASTNode]:
+    """An interpreter that has run SETUP, and the expression ready to visit"""
+    program = spp.Parser(spp.Lexer(f'{SETUP}set result to {expression}.\n')).parse()
+    interpreter = spp.Interpreter(output=spp.OutputBuffer(None))
+    interpreter.visit(program)
+    node = program.statements[-1].value
+    if not specialized:
+        generalize(node)
+    return interpreter, node
+
+def measure(expression: str, number: int, repeat: int, specialized: bool = True) -> Tuple[float, int]:
+    """Best seconds per evaluation and the expression's node count"""
+    interpreter, node = prepare(expression, specialized)
+    timer = timeit.Timer(lambda: interpreter.visit(node))
+    best = min(timer.repeat(repeat=repeat, number=number)) / number
+    return best, spp.count_nodes(node)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    arg_parser = argparse.ArgumentParser(description="S++ node microbenchmark")
+    arg_parser.add_argument('--number', type=int, default=200000, metavar='N',
+                            help="evaluations per round (default 200000)")
+    arg_parser.add_argument('--repeat', type=int, default=5, metavar='N',
+                            help="rounds per expression, keeping the best (default 5)")
+    args = arg_parser.parse_args(argv)
+
+    header = f"{'expression':<30} {'nodes':>5} {'ns/eval':>9} {'ns/node':>9} {'generic':>9} {'ratio':>6}"
+    print(header)
+    print('-' * len(header))
+    for name, expression in EXPRESSIONS:
+        seconds, nodes = measure(expression, args.number, args.repeat)
+        generic, _ = measure(expression, args.number, args.repeat, specialized=False)
+        print(f"{name:<30} {nodes:>5} {seconds * 1e9:>9.0f} {seconds * 1e9 / nodes:>9.0f} "
+              f"{generic * 1e9 / nodes:>9.0f} {seconds / generic:>5.2f}x")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,911 +1,4971 @@
-"""
-S++ Language Interpreter
-An English-like programming language with minimal symbols (only comma and period)
-"""
-
-import re
-import sys
-from enum import Enum
-from typing import Any, Dict, List, Optional, Union
-
-# ============================================================================
-# LEXER
-# ============================================================================
-
-class TokenType(Enum):
-    # Literals
-    NUMBER = "NUMBER"
-    STRING = "STRING"
-    
-    # Keywords
-    SET = "SET"
-    TO = "TO"
-    PRINT = "PRINT"
-    WRITE = "WRITE"
-    ASK = "ASK"
-    AND_STORE_IN = "AND_STORE_IN"
-    IF = "IF"
-    THEN = "THEN"
-    OTHERWISE = "OTHERWISE"
-    END = "END"
-    REPEAT = "REPEAT"
-    WHILE = "WHILE"
-    TIMES = "TIMES"
-    FOR = "FOR"
-    EACH = "EACH"
-    IN = "IN"
-    DEFINE = "DEFINE"
-    WITH = "WITH"
-    CALL = "CALL"
-    RETURN = "RETURN"
-    
-    # Operators
-    PLUS = "PLUS"
-    MINUS = "MINUS"
-    TIMES_OP = "TIMES_OP"
-    DIVIDED_BY = "DIVIDED_BY"
-    EQUALS = "EQUALS"
-    IS_GREATER_THAN = "IS_GREATER_THAN"
-    IS_LESS_THAN = "IS_LESS_THAN"
-    IS_EQUAL_TO = "IS_EQUAL_TO"
-    OR = "OR"
-    NOT = "NOT"
-    
-    # Symbols
-    COMMA = "COMMA"
-    PERIOD = "PERIOD"
-    
-    # Special
-    IDENTIFIER = "IDENTIFIER"
-    EOF = "EOF"
-
-class Token:
-    def __init__(self, token_type: TokenType, value: Any, line: int, column: int):
-        self.type = token_type
-        self.value = value
-        self.line = line
-        self.column = column
-    
-    def __repr__(self):
-        return f"Token({self.type}, {self.value!r}, {self.line}:{self.column})"
-
-class Lexer:
-    KEYWORDS = {
-        'set': TokenType.SET,
-        'to': TokenType.TO,
-        'print': TokenType.PRINT,
-        'write': TokenType.WRITE,
-        'ask': TokenType.ASK,
-        'and': TokenType.OR,  # Used in "and" conditions
-        'store': TokenType.AND_STORE_IN,
-        'in': TokenType.IN,
-        'if': TokenType.IF,
-        'then': TokenType.THEN,
-        'otherwise': TokenType.OTHERWISE,
-        'end': TokenType.END,
-        'repeat': TokenType.REPEAT,
-        'while': TokenType.WHILE,
-        'times': TokenType.TIMES,
-        'for': TokenType.FOR,
-        'each': TokenType.EACH,
-        'define': TokenType.DEFINE,
-        'with': TokenType.WITH,
-        'call': TokenType.CALL,
-        'return': TokenType.RETURN,
-        'plus': TokenType.PLUS,
-        'minus': TokenType.MINUS,
-        'times': TokenType.TIMES_OP,
-        'divided': TokenType.DIVIDED_BY,
-        'equals': TokenType.EQUALS,
-        'or': TokenType.OR,
-        'not': TokenType.NOT,
-    }
-    
-    def __init__(self, text: str):
-        self.text = text
-        self.pos = 0
-        self.line = 1
-        self.column = 1
-        self.current_char = self.text[0] if text else None
-    
-    def advance(self):
-        if self.current_char == '\n':
-            self.line += 1
-            self.column = 1
-        else:
-            self.column += 1
-        
-        self.pos += 1
-        if self.pos >= len(self.text):
-            self.current_char = None
-        else:
-            self.current_char = self.text[self.pos]
-    
-    def peek(self, offset: int = 1) -> Optional[str]:
-        peek_pos = self.pos + offset
-        if peek_pos >= len(self.text):
-            return None
-        return self.text[peek_pos]
-    
-    def skip_whitespace(self):
-        while self.current_char and self.current_char.isspace():
-            self.advance()
-    
-    def skip_comment(self):
-        if self.current_char == '/' and self.peek() == '/':
-            while self.current_char and self.current_char != '\n':
-                self.advance()
-    
-    def read_number(self) -> Token:
-        line, col = self.line, self.column
-        num_str = ''
-        
-        while self.current_char and self.current_char.isdigit():
-            num_str += self.current_char
-            self.advance()
-        
-        if self.current_char == '.' and self.peek() and self.peek().isdigit():
-            num_str += '.'
-            self.advance()
-            while self.current_char and self.current_char.isdigit():
-                num_str += self.current_char
-                self.advance()
-        
-        return Token(TokenType.NUMBER, float(num_str) if '.' in num_str else int(num_str), line, col)
-    
-    def read_word(self) -> Token:
-        line, col = self.line, self.column
-        word = ''
-        
-        while self.current_char and (self.current_char.isalnum() or self.current_char == '_'):
-            word += self.current_char
-            self.advance()
-        
-        word_lower = word.lower()
-        
-        # Special handling for "divided" - check if followed by "by"
-        if word_lower == 'divided':
-            # Save current position
-            saved_pos = self.pos
-            saved_char = self.current_char
-            saved_line, saved_col = self.line, self.column
-            
-            # Try to peek ahead for "by"
-            self.skip_whitespace()
-            temp_word = ''
-            while self.current_char and (self.current_char.isalnum() or self.current_char == '_'):
-                temp_word += self.current_char
-                self.advance()
-            
-            if temp_word.lower() == 'by':
-                # Consume the "by" as part of the operator
-                return Token(TokenType.DIVIDED_BY, 'divided by', line, col)
-            else:
-                # Reset and treat "divided" as an identifier
-                self.pos = saved_pos
-                self.current_char = saved_char
-                self.line = saved_line
-                self.column = saved_col
-                word_lower = 'divided'
-        
-        # Similar handling for "is greater than"
-        if word_lower == 'is':
-            saved_pos = self.pos
-            saved_char = self.current_char
-            saved_line, saved_col = self.line, self.column
-            
-            self.skip_whitespace()
-            temp_word = ''
-            while self.current_char and (self.current_char.isalnum() or self.current_char == '_'):
-                temp_word += self.current_char
-                self.advance()
-            
-            if temp_word.lower() == 'greater':
-                # Check for "than"
-                self.skip_whitespace()
-                temp_word2 = ''
-                while self.current_char and (self.current_char.isalnum() or self.current_char == '_'):
-                    temp_word2 += self.current_char
-                    self.advance()
-                
-                if temp_word2.lower() == 'than':
-                    return Token(TokenType.IS_GREATER_THAN, 'is greater than', line, col)
-            elif temp_word.lower() == 'less':
-                # Check for "than"
-                self.skip_whitespace()
-                temp_word2 = ''
-                while self.current_char and (self.current_char.isalnum() or self.current_char == '_'):
-                    temp_word2 += self.current_char
-                    self.advance()
-                
-                if temp_word2.lower() == 'than':
-                    return Token(TokenType.IS_LESS_THAN, 'is less than', line, col)
-            
-            # Reset if not a multi-word operator
-            self.pos = saved_pos
-            self.current_char = saved_char
-            self.line = saved_line
-            self.column = saved_col
-        
-        if word_lower in self.KEYWORDS:
-            token_type = self.KEYWORDS[word_lower]
-        else:
-            token_type = TokenType.IDENTIFIER
-        
-        return Token(token_type, word, line, col)
-    
-    def get_next_token(self) -> Token:
-        while self.current_char:
-            if self.current_char.isspace():
-                self.skip_whitespace()
-                continue
-            
-            if self.current_char == '/' and self.peek() == '/':
-                self.skip_comment()
-                continue
-            
-            if self.current_char.isdigit():
-                return self.read_number()
-            
-            if self.current_char.isalpha() or self.current_char == '_':
-                return self.read_word()
-            
-            if self.current_char == ',':
-                line, col = self.line, self.column
-                self.advance()
-                return Token(TokenType.COMMA, ',', line, col)
-            
-            if self.current_char == '.':
-                line, col = self.line, self.column
-                self.advance()
-                return Token(TokenType.PERIOD, '.', line, col)
-            
-            raise Exception(f"Invalid character '{self.current_char}' at {self.line}:{self.column}")
-        
-        return Token(TokenType.EOF, None, self.line, self.column)
-
-# ============================================================================
-# AST NODES
-# ============================================================================
-
-class ASTNode:
-    pass
-
-class Program(ASTNode):
-    def __init__(self, statements: List[ASTNode]):
-        self.statements = statements
-
-class SetStatement(ASTNode):
-    def __init__(self, var_name: str, value: ASTNode):
-        self.var_name = var_name
-        self.value = value
-
-class PrintStatement(ASTNode):
-    def __init__(self, expression: ASTNode):
-        self.expression = expression
-
-class AskStatement(ASTNode):
-    def __init__(self, prompt: str, var_name: str):
-        self.prompt = prompt
-        self.var_name = var_name
-
-class IfStatement(ASTNode):
-    def __init__(self, condition: ASTNode, then_body: List[ASTNode], else_body: Optional[List[ASTNode]]):
-        self.condition = condition
-        self.then_body = then_body
-        self.else_body = else_body
-
-class RepeatWhileStatement(ASTNode):
-    def __init__(self, condition: ASTNode, body: List[ASTNode]):
-        self.condition = condition
-        self.body = body
-
-class RepeatTimesStatement(ASTNode):
-    def __init__(self, count: ASTNode, body: List[ASTNode]):
-        self.count = count
-        self.body = body
-
-class ForEachStatement(ASTNode):
-    def __init__(self, item_name: str, list_expr: ASTNode, body: List[ASTNode]):
-        self.item_name = item_name
-        self.list_expr = list_expr
-        self.body = body
-
-class FunctionDef(ASTNode):
-    def __init__(self, name: str, params: List[str], body: List[ASTNode]):
-        self.name = name
-        self.params = params
-        self.body = body
-
-class FunctionCall(ASTNode):
-    def __init__(self, name: str, args: List[ASTNode]):
-        self.name = name
-        self.args = args
-
-class ReturnStatement(ASTNode):
-    def __init__(self, value: Optional[ASTNode]):
-        self.value = value
-
-class BinaryOp(ASTNode):
-    def __init__(self, left: ASTNode, op: Token, right: ASTNode):
-        self.left = left
-        self.op = op
-        self.right = right
-
-class UnaryOp(ASTNode):
-    def __init__(self, op: Token, expr: ASTNode):
-        self.op = op
-        self.expr = expr
-
-class Literal(ASTNode):
-    def __init__(self, value: Any):
-        self.value = value
-
-class Variable(ASTNode):
-    def __init__(self, name: str):
-        self.name = name
-        self.is_literal_if_undefined = False  # Flag for print context
-
-class ListLiteral(ASTNode):
-    def __init__(self, items: List[ASTNode]):
-        self.items = items
-
-# ============================================================================
-# PARSER
-# ============================================================================
-
-class Parser:
-    def __init__(self, lexer: Lexer):
-        self.lexer = lexer
-        self.current_token = self.lexer.get_next_token()
-    
-    def eat(self, token_type: TokenType):
-        if self.current_token.type == token_type:
-            self.current_token = self.lexer.get_next_token()
-        else:
-            raise Exception(f"Expected {token_type}, got {self.current_token.type}")
-    
-    def parse(self) -> Program:
-        statements = []
-        while self.current_token.type != TokenType.EOF:
-            stmt = self.parse_statement()
-            if stmt:
-                statements.append(stmt)
-        return Program(statements)
-    
-    def parse_statement(self) -> Optional[ASTNode]:
-        if self.current_token.type == TokenType.SET:
-            return self.parse_set_statement()
-        elif self.current_token.type == TokenType.PRINT:
-            return self.parse_print_statement()
-        elif self.current_token.type == TokenType.WRITE:
-            return self.parse_print_statement()
-        elif self.current_token.type == TokenType.ASK:
-            return self.parse_ask_statement()
-        elif self.current_token.type == TokenType.IF:
-            return self.parse_if_statement()
-        elif self.current_token.type == TokenType.REPEAT:
-            return self.parse_repeat_statement()
-        elif self.current_token.type == TokenType.FOR:
-            return self.parse_for_statement()
-        elif self.current_token.type == TokenType.DEFINE:
-            return self.parse_function_def()
-        elif self.current_token.type == TokenType.CALL:
-            return self.parse_function_call()
-        elif self.current_token.type == TokenType.RETURN:
-            return self.parse_return_statement()
-        else:
-            return None
-    
-    def parse_set_statement(self) -> SetStatement:
-        self.eat(TokenType.SET)
-        var_name = self.current_token.value
-        self.eat(TokenType.IDENTIFIER)
-        self.eat(TokenType.TO)
-        value = self.parse_set_expression()
-        self.eat(TokenType.PERIOD)
-        return SetStatement(var_name, value)
-    
-    def parse_set_expression(self) -> ASTNode:
-        """Parse expression in a set context, allowing undefined identifiers as literals"""
-        expr = self.parse_expression()
-        # Enable literal fallback for all variables in this expression
-        self._mark_fallback_to_literal(expr)
-        return expr
-    
-    def _mark_fallback_to_literal(self, node: ASTNode):
-        """Recursively mark all Variable nodes to fallback to literal if undefined"""
-        if isinstance(node, Variable):
-            node.is_literal_if_undefined = True
-        elif isinstance(node, BinaryOp):
-            self._mark_fallback_to_literal(node.left)
-            self._mark_fallback_to_literal(node.right)
-        elif isinstance(node, UnaryOp):
-            self._mark_fallback_to_literal(node.expr)
-    
-    def parse_print_statement(self) -> PrintStatement:
-        self.eat(self.current_token.type)  # PRINT or WRITE
-        
-        # Collect everything until period, treating most things as a phrase
-        words = []
-        
-        while self.current_token.type != TokenType.PERIOD and self.current_token.type != TokenType.EOF:
-            # Stop at operators that would indicate this is an expression
-            if self.current_token.type in [TokenType.PLUS, TokenType.MINUS, TokenType.TIMES_OP, TokenType.DIVIDED_BY]:
-                # This is an operation on previous words
-                if len(words) > 0:
-                    # Parse the first word as a variable/number and the rest as expression
-                    first_val = words[0]
-                    if first_val.isdigit() or (first_val[0].isdigit() if first_val else False):
-                        left = Literal(int(first_val))
-                    else:
-                        left = Variable(first_val)
-                        left.is_literal_if_undefined = True
-                    
-                    # Now parse operators
-                    while self.current_token.type in [TokenType.PLUS, TokenType.MINUS, TokenType.TIMES_OP, TokenType.DIVIDED_BY]:
-                        op = self.current_token
-                        self.eat(self.current_token.type)
-                        
-                        if self.current_token.type == TokenType.NUMBER:
-                            right = Literal(self.current_token.value)
-                            self.eat(TokenType.NUMBER)
-                        elif self.current_token.type == TokenType.IDENTIFIER:
-                            right = Variable(self.current_token.value)
-                            right.is_literal_if_undefined = True
-                            self.eat(TokenType.IDENTIFIER)
-                        else:
-                            raise Exception(f"Expected operand after operator")
-                        
-                        left = BinaryOp(left, op, right)
-                    
-                    self.eat(TokenType.PERIOD)
-                    return PrintStatement(left)
-                else:
-                    raise Exception("No left operand for expression")
-            elif self.current_token.type in [TokenType.IDENTIFIER, TokenType.NUMBER]:
-                words.append(str(self.current_token.value))
-                self.eat(self.current_token.type)
-            else:
-                # It's some other keyword... treat it as part of the phrase
-                if self.current_token.type == TokenType.TO:
-                    words.append('to')
-                    self.eat(TokenType.TO)
-                elif self.current_token.type == TokenType.AND_STORE_IN:
-                    words.append('and store in')
-                    self.eat(TokenType.AND_STORE_IN)
-                else:
-                    # For other keywords, try to treat as part of phrase
-                    words.append(self.current_token.value if self.current_token.value else self.current_token.type.name.lower())
-                    self.eat(self.current_token.type)
-        
-        self.eat(TokenType.PERIOD)
-        
-        if len(words) == 0:
-            raise Exception("No expression after print statement")
-        elif len(words) == 1:
-            # Single word - could be variable or literal
-            token_val = words[0]
-            var_node = Variable(token_val)
-            var_node.is_literal_if_undefined = True
-            return PrintStatement(var_node)
-        else:
-            # Multiple words - treat as phrase
-            phrase = ' '.join(words)
-            return PrintStatement(Literal(phrase))
-    
-    def parse_ask_statement(self) -> AskStatement:
-        self.eat(TokenType.ASK)
-        prompt = self.parse_string_phrase()
-        self.eat(TokenType.AND_STORE_IN)
-        var_name = self.current_token.value
-        self.eat(TokenType.IDENTIFIER)
-        self.eat(TokenType.PERIOD)
-        return AskStatement(prompt, var_name)
-    
-    def parse_if_statement(self) -> IfStatement:
-        self.eat(TokenType.IF)
-        condition = self.parse_expression()
-        self.eat(TokenType.THEN)
-        then_body = self.parse_block()
-        
-        else_body = None
-        if self.current_token.type == TokenType.OTHERWISE:
-            self.eat(TokenType.OTHERWISE)
-            else_body = self.parse_block()
-        
-        self.eat(TokenType.END)
-        self.eat(TokenType.PERIOD)
-        return IfStatement(condition, then_body, else_body)
-    
-    def parse_repeat_statement(self) -> Union[RepeatWhileStatement, RepeatTimesStatement]:
-        self.eat(TokenType.REPEAT)
-        
-        if self.current_token.type == TokenType.WHILE:
-            self.eat(TokenType.WHILE)
-            condition = self.parse_expression()
-            body = self.parse_block()
-            self.eat(TokenType.END)
-            self.eat(TokenType.PERIOD)
-            return RepeatWhileStatement(condition, body)
-        else:
-            # Parse count - but be careful not to consume 'times'
-            # We only want primary expressions here, not multiplication
-            if self.current_token.type == TokenType.NUMBER:
-                count = Literal(self.current_token.value)
-                self.eat(TokenType.NUMBER)
-            elif self.current_token.type == TokenType.IDENTIFIER:
-                count = Variable(self.current_token.value)
-                self.eat(TokenType.IDENTIFIER)
-            else:
-                count = self.parse_primary()
-            
-            self.eat(TokenType.TIMES_OP)  # 'times' keyword
-            body = self.parse_block()
-            self.eat(TokenType.END)
-            self.eat(TokenType.PERIOD)
-            return RepeatTimesStatement(count, body)
-    
-    def parse_for_statement(self) -> ForEachStatement:
-        self.eat(TokenType.FOR)
-        self.eat(TokenType.EACH)
-        item_name = self.current_token.value
-        self.eat(TokenType.IDENTIFIER)
-        self.eat(TokenType.IN)
-        list_expr = self.parse_expression()
-        body = self.parse_block()
-        self.eat(TokenType.END)
-        self.eat(TokenType.PERIOD)
-        return ForEachStatement(item_name, list_expr, body)
-    
-    def parse_function_def(self) -> FunctionDef:
-        self.eat(TokenType.DEFINE)
-        name = self.current_token.value
-        self.eat(TokenType.IDENTIFIER)
-        
-        params = []
-        if self.current_token.type == TokenType.WITH:
-            self.eat(TokenType.WITH)
-            params.append(self.current_token.value)
-            self.eat(TokenType.IDENTIFIER)
-            
-            while self.current_token.type == TokenType.COMMA:
-                self.eat(TokenType.COMMA)
-                params.append(self.current_token.value)
-                self.eat(TokenType.IDENTIFIER)
-        
-        body = self.parse_block()
-        self.eat(TokenType.END)
-        self.eat(TokenType.PERIOD)
-        return FunctionDef(name, params, body)
-    
-    def parse_function_call(self) -> FunctionCall:
-        self.eat(TokenType.CALL)
-        name = self.current_token.value
-        self.eat(TokenType.IDENTIFIER)
-        
-        args = []
-        if self.current_token.type == TokenType.WITH:
-            self.eat(TokenType.WITH)
-            args.append(self.parse_expression())
-            
-            while self.current_token.type == TokenType.COMMA:
-                self.eat(TokenType.COMMA)
-                args.append(self.parse_expression())
-        
-        return FunctionCall(name, args)
-    
-    def parse_return_statement(self) -> ReturnStatement:
-        self.eat(TokenType.RETURN)
-        value = None
-        if self.current_token.type != TokenType.PERIOD:
-            value = self.parse_expression()
-        self.eat(TokenType.PERIOD)
-        return ReturnStatement(value)
-    
-    def parse_block(self) -> List[ASTNode]:
-        statements = []
-        while self.current_token.type not in [TokenType.END, TokenType.OTHERWISE, TokenType.EOF]:
-            stmt = self.parse_statement()
-            if stmt:
-                statements.append(stmt)
-        return statements
-    
-    def parse_expression(self) -> ASTNode:
-        return self.parse_or_expr()
-    
-    def parse_or_expr(self) -> ASTNode:
-        left = self.parse_and_expr()
-        
-        while self.current_token.type == TokenType.OR:
-            op = self.current_token
-            self.eat(TokenType.OR)
-            right = self.parse_and_expr()
-            left = BinaryOp(left, op, right)
-        
-        return left
-    
-    def parse_and_expr(self) -> ASTNode:
-        left = self.parse_comparison()
-        
-        while self.current_token.type == TokenType.OR and self.lexer.text[self.lexer.pos-5:self.lexer.pos].lower().endswith('and'):
-            op = self.current_token
-            self.eat(TokenType.OR)
-            right = self.parse_comparison()
-            left = BinaryOp(left, op, right)
-        
-        return left
-    
-    def parse_comparison(self) -> ASTNode:
-        left = self.parse_addition()
-        
-        while self.current_token.type in [TokenType.EQUALS, TokenType.IS_GREATER_THAN, TokenType.IS_LESS_THAN]:
-            op = self.current_token
-            self.eat(self.current_token.type)
-            right = self.parse_addition()
-            left = BinaryOp(left, op, right)
-        
-        return left
-    
-    def parse_addition(self) -> ASTNode:
-        left = self.parse_multiplication()
-        
-        while self.current_token.type in [TokenType.PLUS, TokenType.MINUS]:
-            op = self.current_token
-            self.eat(self.current_token.type)
-            right = self.parse_multiplication()
-            left = BinaryOp(left, op, right)
-        
-        return left
-    
-    def parse_multiplication(self) -> ASTNode:
-        left = self.parse_unary()
-        
-        while self.current_token.type in [TokenType.TIMES_OP, TokenType.DIVIDED_BY]:
-            op = self.current_token
-            self.eat(self.current_token.type)
-            right = self.parse_unary()
-            left = BinaryOp(left, op, right)
-        
-        return left
-    
-    def parse_unary(self) -> ASTNode:
-        if self.current_token.type == TokenType.NOT:
-            op = self.current_token
-            self.eat(TokenType.NOT)
-            expr = self.parse_unary()
-            return UnaryOp(op, expr)
-        
-        return self.parse_primary()
-    
-    def parse_primary(self) -> ASTNode:
-        if self.current_token.type == TokenType.NUMBER:
-            value = self.current_token.value
-            self.eat(TokenType.NUMBER)
-            return Literal(value)
-        
-        elif self.current_token.type == TokenType.IDENTIFIER:
-            name = self.current_token.value
-            self.eat(TokenType.IDENTIFIER)
-            
-            # Check for list literal or function call
-            if self.current_token.type == TokenType.COMMA or (self.current_token.type != TokenType.PERIOD and self.current_token.type != TokenType.COMMA):
-                return Variable(name)
-            
-            return Variable(name)
-        
-        elif self.current_token.type == TokenType.CALL:
-            return self.parse_function_call()
-        
-        else:
-            raise Exception(f"Unexpected token: {self.current_token}")
-    
-    def parse_string_phrase(self) -> str:
-        words = []
-        while self.current_token.type in [TokenType.IDENTIFIER, TokenType.NUMBER]:
-            words.append(str(self.current_token.value))
-            self.eat(self.current_token.type)
-        return ' '.join(words)
-
-# ============================================================================
-# INTERPRETER
-# ============================================================================
-
-class ReturnValue(Exception):
-    def __init__(self, value):
-        self.value = value
-
-class Interpreter:
-    def __init__(self):
-        self.variables = {}
-        self.functions = {}
-    
-    def visit(self, node: ASTNode) -> Any:
-        method_name = f'visit_{type(node).__name__}'
-        method = getattr(self, method_name, self.visit_generic)
-        return method(node)
-    
-    def visit_generic(self, node):
-        raise Exception(f'No visit_{type(node).__name__} method')
-    
-    def visit_Program(self, node: Program) -> Any:
-        result = None
-        for stmt in node.statements:
-            result = self.visit(stmt)
-        return result
-    
-    def visit_SetStatement(self, node: SetStatement) -> Any:
-        value = self.visit(node.value)
-        self.variables[node.var_name] = value
-        return value
-    
-    def visit_PrintStatement(self, node: PrintStatement) -> Any:
-        value = self.visit(node.expression)
-        print(self.format_output(value))
-        return value
-    
-    def visit_AskStatement(self, node: AskStatement) -> Any:
-        value = input(node.prompt + " ")
-        try:
-            self.variables[node.var_name] = int(value)
-        except ValueError:
-            try:
-                self.variables[node.var_name] = float(value)
-            except ValueError:
-                self.variables[node.var_name] = value
-        return self.variables[node.var_name]
-    
-    def visit_IfStatement(self, node: IfStatement) -> Any:
-        condition = self.visit(node.condition)
-        if self.is_truthy(condition):
-            for stmt in node.then_body:
-                self.visit(stmt)
-        elif node.else_body:
-            for stmt in node.else_body:
-                self.visit(stmt)
-    
-    def visit_RepeatWhileStatement(self, node: RepeatWhileStatement) -> Any:
-        while self.is_truthy(self.visit(node.condition)):
-            for stmt in node.body:
-                self.visit(stmt)
-    
-    def visit_RepeatTimesStatement(self, node: RepeatTimesStatement) -> Any:
-        count = int(self.visit(node.count))
-        for _ in range(count):
-            for stmt in node.body:
-                self.visit(stmt)
-    
-    def visit_ForEachStatement(self, node: ForEachStatement) -> Any:
-        items = self.visit(node.list_expr)
-        if not isinstance(items, list):
-            items = [items]
-        
-        for item in items:
-            self.variables[node.item_name] = item
-            for stmt in node.body:
-                self.visit(stmt)
-    
-    def visit_FunctionDef(self, node: FunctionDef) -> Any:
-        self.functions[node.name] = node
-    
-    def visit_FunctionCall(self, node: FunctionCall) -> Any:
-        if node.name not in self.functions:
-            raise Exception(f"Function '{node.name}' not defined")
-        
-        func_def = self.functions[node.name]
-        args = [self.visit(arg) for arg in node.args]
-        
-        # Create local scope
-        old_vars = self.variables.copy()
-        
-        # Bind parameters
-        for i, param in enumerate(func_def.params):
-            if i < len(args):
-                self.variables[param] = args[i]
-        
-        # Execute function body
-        result = None
-        try:
-            for stmt in func_def.body:
-                self.visit(stmt)
-        except ReturnValue as ret:
-            result = ret.value
-        
-        # Restore scope
-        self.variables = old_vars
-        
-        return result
-    
-    def visit_ReturnStatement(self, node: ReturnStatement) -> Any:
-        value = self.visit(node.value) if node.value else None
-        raise ReturnValue(value)
-    
-    def visit_BinaryOp(self, node: BinaryOp) -> Any:
-        left = self.visit(node.left)
-        right = self.visit(node.right)
-        
-        if node.op.type == TokenType.PLUS:
-            return left + right
-        elif node.op.type == TokenType.MINUS:
-            return left - right
-        elif node.op.type == TokenType.TIMES_OP:
-            return left * right
-        elif node.op.type == TokenType.DIVIDED_BY:
-            return left / right if right != 0 else 0
-        elif node.op.type == TokenType.EQUALS:
-            return left == right
-        elif node.op.type == TokenType.IS_GREATER_THAN:
-            return left > right
-        elif node.op.type == TokenType.IS_LESS_THAN:
-            return left < right
-        elif node.op.type == TokenType.OR:
-            return self.is_truthy(left) or self.is_truthy(right)
-    
-    def visit_UnaryOp(self, node: UnaryOp) -> Any:
-        expr = self.visit(node.expr)
-        
-        if node.op.type == TokenType.NOT:
-            return not self.is_truthy(expr)
-    
-    def visit_Literal(self, node: Literal) -> Any:
-        return node.value
-    
-    def visit_Variable(self, node: Variable) -> Any:
-        if node.name not in self.variables:
-            # If this is a print context and variable is undefined, treat as literal
-            if hasattr(node, 'is_literal_if_undefined') and node.is_literal_if_undefined:
-                return node.name
-            raise Exception(f"Variable '{node.name}' not defined")
-        return self.variables[node.name]
-    
-    def visit_ListLiteral(self, node: ListLiteral) -> Any:
-        return [self.visit(item) for item in node.items]
-    
-    def is_truthy(self, value: Any) -> bool:
-        if isinstance(value, bool):
-            return value
-        if isinstance(value, (int, float)):
-            return value != 0
-        if isinstance(value, str):
-            return value.lower() not in ['', 'false', 'no']
-        if isinstance(value, list):
-            return len(value) > 0
-        return bool(value)
-    
-    def format_output(self, value: Any) -> str:
-        if isinstance(value, list):
-            return ', '.join(str(item) for item in value)
-        return str(value)
-
-# ============================================================================
-# MAIN
-# ============================================================================
-
-def run_program(code: str):
-    try:
-        lexer = Lexer(code)
-        parser = Parser(lexer)
-        ast = parser.parse()
-        interpreter = Interpreter()
-        interpreter.visit(ast)
-    except Exception as e:
-        print(f"Error: {e}", file=sys.stderr)
-
-if __name__ == "__main__":
-    if len(sys.argv) > 1:
-        with open(sys.argv[1], 'r') as f:
-            code = f.read()
-        run_program(code)
-    else:
-        print("S++ Language Interpreter")
-        print("========================")
-        print("Enter code (type 'STOP.' on a new line to execute):")
-        lines = []
-        while True:
-            line = input()
-            if line.strip() == 'STOP.':
-                break
-            lines.append(line)
-        
-        code = '\n'.join(lines)
-        run_program(code)
+"""
+S++ Language Interpreter
+An English-like programming language with minimal symbols (only comma and period)
+"""
+
+import copy
+import hashlib
+import hmac
+import io
+import math
+import os
+import pickle
+import re
+import string
+import sys
+import tempfile
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from enum import Enum
+from functools import reduce
+from itertools import accumulate, compress, repeat
+from operator import add, eq, gt, itemgetter, lt, mul, sub, truediv
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+try:
+    import numpy
+except ImportError:  # List arithmetic then runs through map() over the arrays
+    numpy = None
+
+# ============================================================================
+# LEXER
+# ============================================================================
+
+class TokenType(Enum):
+    # Literals
+    NUMBER = "NUMBER"
+    STRING = "STRING"
+    
+    # Keywords
+    SET = "SET"
+    TO = "TO"
+    PRINT = "PRINT"
+    WRITE = "WRITE"
+    ASK = "ASK"
+    AND_STORE_IN = "AND_STORE_IN"
+    IF = "IF"
+    THEN = "THEN"
+    OTHERWISE = "OTHERWISE"
+    END = "END"
+    REPEAT = "REPEAT"
+    WHILE = "WHILE"
+    TIMES = "TIMES"
+    FOR = "FOR"
+    EACH = "EACH"
+    IN = "IN"
+    DEFINE = "DEFINE"
+    WITH = "WITH"
+    CALL = "CALL"
+    RETURN = "RETURN"
+    
+    # Operators
+    PLUS = "PLUS"
+    MINUS = "MINUS"
+    TIMES_OP = "TIMES_OP"
+    DIVIDED_BY = "DIVIDED_BY"
+    EQUALS = "EQUALS"
+    IS_GREATER_THAN = "IS_GREATER_THAN"
+    IS_LESS_THAN = "IS_LESS_THAN"
+    IS_EQUAL_TO = "IS_EQUAL_TO"
+    OR = "OR"
+    NOT = "NOT"
+    
+    # Symbols
+    COMMA = "COMMA"
+    PERIOD = "PERIOD"
+    
+    # Special
+    IDENTIFIER = "IDENTIFIER"
+    EOF = "EOF"
+
+class Token:
+    __slots__ = ('type', 'value', 'line', 'column')
+    
+    def __init__(self, token_type: TokenType, value: Any, line: int, column: int):
+        self.type = token_type
+        self.value = value
+        self.line = line
+        self.column = column
+    
+    def __repr__(self):
+        if self.line is None:
+            return f"Token({self.type}, {self.value!r})"
+        return f"Token({self.type}, {self.value!r}, {self.line}:{self.column})"
+
+class TokenCode:
+    """Small-int codes for each TokenType, as stored in a TokenBuffer
+    
+    Comparing plain ints is several times cheaper than looking up and
+    comparing Enum members, which the parser does for every token.
+    """
+    NUMBER, STRING = 0, 1
+    SET, TO, PRINT, WRITE, ASK, AND_STORE_IN = 2, 3, 4, 5, 6, 7
+    IF, THEN, OTHERWISE, END = 8, 9, 10, 11
+    REPEAT, WHILE, TIMES, FOR, EACH, IN = 12, 13, 14, 15, 16, 17
+    DEFINE, WITH, CALL, RETURN = 18, 19, 20, 21
+    PLUS, MINUS, TIMES_OP, DIVIDED_BY, EQUALS = 22, 23, 24, 25, 26
+    IS_GREATER_THAN, IS_LESS_THAN, IS_EQUAL_TO, OR, NOT = 27, 28, 29, 30, 31
+    COMMA, PERIOD = 32, 33
+    IDENTIFIER, EOF = 34, 35
+    
+    # Scanner-only codes that never reach the parser
+    INVALID = 254
+    SKIP = 255
+
+TOKEN_TYPES = list(TokenType)
+TOKEN_CODES = {token_type: getattr(TokenCode, token_type.name) for token_type in TokenType}
+
+class TokenBuffer:
+    """Packed, column-oriented token stream
+    
+    Type codes, start/end offsets and line numbers are held in arrays; token
+    values are sliced out of the source only when asked for. If the source
+    contains an invalid character the buffer stops just before it, and error
+    holds the exception to raise once the parser gets there.
+    """
+    MULTI_WORD_VALUES = {
+        TokenCode.DIVIDED_BY: 'divided by',
+        TokenCode.IS_GREATER_THAN: 'is greater than',
+        TokenCode.IS_LESS_THAN: 'is less than',
+    }
+    
+    def __init__(self, text: str):
+        self.text = text
+        self.types = array('B')
+        self.starts = array('I')
+        self.ends = array('I')
+        self.lines = array('I')
+        self.error: Optional[Exception] = None
+    
+    def __len__(self) -> int:
+        return len(self.types)
+    
+    def append(self, code: int, start: int, end: int, line: int):
+        self.types.append(code)
+        self.starts.append(start)
+        self.ends.append(end)
+        self.lines.append(line)
+    
+    def truncate(self, length: int):
+        del self.types[length:]
+        del self.starts[length:]
+        del self.ends[length:]
+        del self.lines[length:]
+    
+    def value(self, index: int) -> Any:
+        code = self.types[index]
+        if code == TokenCode.PERIOD:
+            return '.'
+        if code == TokenCode.COMMA:
+            return ','
+        if code == TokenCode.EOF:
+            return None
+        raw = self.text[self.starts[index]:self.ends[index]]
+        if code == TokenCode.NUMBER:
+            return float(raw) if '.' in raw else int(raw)
+        # A lone "divided" keeps its spelling; the multi-word forms are normalized
+        if code in self.MULTI_WORD_VALUES and not raw.isalpha():
+            return self.MULTI_WORD_VALUES[code]
+        return raw
+    
+    def column(self, index: int) -> int:
+        start = self.starts[index]
+        return start - self.text.rfind('\n', 0, start)
+    
+    def token(self, index: int) -> Token:
+        return Token(TOKEN_TYPES[self.types[index]], self.value(index), self.lines[index], self.column(index))
+
+def _case_insensitive(word: str) -> str:
+    """Regex matching an ASCII word in any letter case, e.g. [dD][iI]..."""
+    return ''.join(f'[{char}{char.upper()}]' for char in word)
+
+class Lexer:
+    KEYWORDS = {
+        'set': TokenType.SET,
+        'to': TokenType.TO,
+        'print': TokenType.PRINT,
+        'write': TokenType.WRITE,
+        'ask': TokenType.ASK,
+        'and': TokenType.OR,  # Used in "and" conditions
+        'store': TokenType.AND_STORE_IN,
+        'in': TokenType.IN,
+        'if': TokenType.IF,
+        'then': TokenType.THEN,
+        'otherwise': TokenType.OTHERWISE,
+        'end': TokenType.END,
+        'repeat': TokenType.REPEAT,
+        'while': TokenType.WHILE,
+        'times': TokenType.TIMES,
+        'for': TokenType.FOR,
+        'each': TokenType.EACH,
+        'define': TokenType.DEFINE,
+        'with': TokenType.WITH,
+        'call': TokenType.CALL,
+        'return': TokenType.RETURN,
+        'plus': TokenType.PLUS,
+        'minus': TokenType.MINUS,
+        'times': TokenType.TIMES_OP,
+        'divided': TokenType.DIVIDED_BY,
+        'equals': TokenType.EQUALS,
+        'or': TokenType.OR,
+        'not': TokenType.NOT,
+    }
+    
+    KEYWORD_CODES = {word: TOKEN_CODES[token_type] for word, token_type in KEYWORDS.items()}
+    
+    # A single master regex matches every token. Multi-word operators are tried
+    # before plain words, so they need no lookahead-and-restore, and the (?!\w)
+    # guards make the last word end there just like a full word read would.
+    # Whitespace and comments match as their own (skipped) kind, so the matches
+    # tile the whole source and each token starts where the previous one ended.
+    TOKEN_PATTERN = re.compile('|'.join([
+        r'(?P<skip>(?:\s+|//[^\n]*)+)',
+        rf'(?P<divided_by>{_case_insensitive("divided")}\s+{_case_insensitive("by")}(?!\w))',
+        rf'(?P<greater_than>{_case_insensitive("is")}\s+{_case_insensitive("greater")}\s+{_case_insensitive("than")}(?!\w))',
+        rf'(?P<less_than>{_case_insensitive("is")}\s+{_case_insensitive("less")}\s+{_case_insensitive("than")}(?!\w))',
+        r'(?P<word>[^\W\d]\w*)',
+        r'(?P<number>\d+(?:\.\d+)?)',
+        r'(?P<period>\.)',
+        r'(?P<comma>,)',
+        r'(?P<invalid>.)',
+    ]), re.DOTALL)
+    
+    # Token code for each regex group, indexed by Match.lastindex
+    GROUP_CODES = [
+        None, TokenCode.SKIP, TokenCode.DIVIDED_BY, TokenCode.IS_GREATER_THAN, TokenCode.IS_LESS_THAN,
+        TokenCode.IDENTIFIER, TokenCode.NUMBER, TokenCode.PERIOD, TokenCode.COMMA, TokenCode.INVALID,
+    ]
+    
+    # The ASCII fast path matches the lowered source with the same rules as
+    # TOKEN_PATTERN but without groups, so findall() returns plain strings
+    PIECE_PATTERN = re.compile('|'.join([
+        r'(?:\s+|//[^\n]*)+',
+        r'divided\s+by(?!\w)',
+        r'is\s+greater\s+than(?!\w)',
+        r'is\s+less\s+than(?!\w)',
+        r'[^\W\d]\w*',
+        r'\d+(?:\.\d+)?',
+        r'\.',
+        ',',
+        '.',
+    ]), re.DOTALL)
+    
+    MULTI_WORD_PATTERN = re.compile(
+        r'(?:(divided\s+by)|(is\s+greater\s+than)|(is\s+less\s+than))(?!\w)')
+    
+    FIRST_CHAR_CODES = {
+        **dict.fromkeys(string.ascii_lowercase + '_', TokenCode.IDENTIFIER),
+        **dict.fromkeys(string.digits, TokenCode.NUMBER),
+        **dict.fromkeys([chr(code) for code in range(128) if chr(code).isspace()] + ['/'], TokenCode.SKIP),
+        '.': TokenCode.PERIOD,
+        ',': TokenCode.COMMA,
+    }
+    
+    # A lone "/" is not a comment
+    PIECE_CODES = {**KEYWORD_CODES, '/': TokenCode.INVALID}
+    
+    def __init__(self, text: str):
+        self.text = text
+        self.buffer: Optional[TokenBuffer] = None
+        self.index = 0
+    
+    def token_buffer(self) -> TokenBuffer:
+        if self.buffer is None:
+            self.buffer = self.scan_ascii() if self.text.isascii() else self.scan()
+        return self.buffer
+    
+    def get_next_token(self) -> Token:
+        buffer = self.token_buffer()
+        if self.index < len(buffer):
+            self.index += 1
+            return buffer.token(self.index - 1)
+        # Lexing errors surface only when the parser reaches them
+        raise buffer.error
+    
+    def tokenize(self) -> List[Token]:
+        """Return every token including the final EOF, raising on invalid input"""
+        buffer = self.token_buffer()
+        if buffer.error:
+            raise buffer.error
+        return [buffer.token(index) for index in range(len(buffer))]
+    
+    def scan_ascii(self) -> TokenBuffer:
+        """Tokenize an ASCII source without running Python code per token
+        
+        The lowered source is split into pieces by findall(), and every column
+        is then produced by map() over C-level callables: ends by summing piece
+        lengths, codes from the first character or a keyword lookup, and line
+        numbers by summing newline counts. Lowering ASCII keeps every offset,
+        so values are still sliced from the original text.
+        """
+        text = self.text
+        lowered = text.lower()
+        buffer = TokenBuffer(text)
+        
+        pieces = self.PIECE_PATTERN.findall(lowered)
+        ends = array('I', accumulate(map(len, pieces)))
+        starts = array('I', [0])
+        starts.extend(ends)
+        starts.pop()
+        defaults = map(self.FIRST_CHAR_CODES.get, map(itemgetter(0), pieces), repeat(TokenCode.INVALID))
+        codes = array('B', map(self.PIECE_CODES.get, pieces, defaults))
+        lines = array('I', accumulate(map(str.count, pieces, repeat('\n')), initial=1))
+        last_line = lines.pop()
+        
+        # Multi-word operators were split off as single pieces; only the
+        # matches that are whole pieces (not inside comments) are tokens
+        for match in self.MULTI_WORD_PATTERN.finditer(lowered):
+            index = bisect_left(starts, match.start())
+            if index < len(starts) and starts[index] == match.start():
+                codes[index] = self.GROUP_CODES[match.lastindex + 1]
+        
+        keep = bytes(map(TokenCode.SKIP.__ne__, codes))
+        buffer.types = array('B', compress(codes, keep))
+        buffer.starts = array('I', compress(starts, keep))
+        buffer.ends = array('I', compress(ends, keep))
+        buffer.lines = array('I', compress(lines, keep))
+        
+        if TokenCode.INVALID in buffer.types:
+            index = buffer.types.index(TokenCode.INVALID)
+            buffer.error = Exception(f"Invalid character '{text[buffer.starts[index]]}' at "
+                                     f"{buffer.lines[index]}:{buffer.column(index)}")
+            buffer.truncate(index)
+        else:
+            buffer.append(TokenCode.EOF, len(text), len(text), last_line)
+        return buffer
+    
+    def scan(self) -> TokenBuffer:
+        """Tokenize any source one regex match at a time
+        
+        Used outside ASCII, where a few digit and numeric characters need
+        the exact str predicates the language is defined by.
+        """
+        text = self.text
+        buffer = TokenBuffer(text)
+        line = 1
+        pos = 0
+        
+        while True:
+            for match in self.TOKEN_PATTERN.finditer(text, pos):
+                code = self.GROUP_CODES[match.lastindex]
+                start, end = match.span()
+                if code == TokenCode.SKIP:
+                    line += text.count('\n', start, end)
+                    continue
+                
+                if code == TokenCode.IDENTIFIER:
+                    word = match.group()
+                    if not (word[0].isalpha() or word[0] == '_'):
+                        break
+                    code = self.KEYWORD_CODES.get(word.lower(), TokenCode.IDENTIFIER)
+                elif code == TokenCode.NUMBER:
+                    if self.continues_number(end):
+                        break
+                elif code == TokenCode.INVALID:
+                    if text[start].isdigit():
+                        break
+                    column = start - text.rfind('\n', 0, start)
+                    buffer.error = Exception(f"Invalid character '{text[start]}' at {line}:{column}")
+                    return buffer
+                
+                buffer.append(code, start, end, line)
+                if code in TokenBuffer.MULTI_WORD_VALUES:
+                    line += text.count('\n', start, end)
+            else:
+                buffer.append(TokenCode.EOF, len(text), len(text), line)
+                return buffer
+            
+            # Only reached for numbers using digits that \d does not cover
+            try:
+                pos = self.read_unusual_number(buffer, start, line)
+            except Exception as e:
+                buffer.error = e
+                return buffer
+    
+    def continues_number(self, end: int) -> bool:
+        """Whether a non-decimal digit (such as a superscript) extends the number ending at end"""
+        following = self.text[end:end + 2]
+        return following[:1].isdigit() or (following[:1] == '.' and following[1:].isdigit())
+    
+    def read_unusual_number(self, buffer: TokenBuffer, start: int, line: int) -> int:
+        """Read a number containing digits that str.isdigit accepts but \\d does not
+        
+        Returns the position just after the number.
+        """
+        text = self.text
+        pos = start
+        while pos < len(text) and text[pos].isdigit():
+            pos += 1
+        if text[pos:pos + 1] == '.' and text[pos + 1:pos + 2].isdigit():
+            pos += 1
+            while pos < len(text) and text[pos].isdigit():
+                pos += 1
+        
+        if pos == start:
+            column = start - text.rfind('\n', 0, start)
+            raise Exception(f"Invalid character '{text[start]}' at {line}:{column}")
+        
+        # Convert once now so digits int() rejects fail where the parser would reach them
+        num_str = text[start:pos]
+        if '.' in num_str:
+            float(num_str)
+        else:
+            int(num_str)
+        buffer.append(TokenCode.NUMBER, start, pos, line)
+        return pos
+
+# ============================================================================
+# AST NODES
+# ============================================================================
+
+class ASTNode:
+    __slots__ = ()  # Expression nodes keep their fields in slots, statements in __dict__
+    has_call = False  # Set by the Resolver for nodes containing a function call
+    line: Optional[int] = None  # Set by the Parser on statements
+    
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # The names passes dispatch on, worked out once per class instead of
+        # per visit. Subclasses of a node class, like the specialized
+        # BinaryOp kinds, inherit them.
+        if not hasattr(cls, 'kind'):
+            cls.kind = cls.__name__
+            cls.visit_name = f'visit_{cls.__name__}'
+            cls.step_name = f'step_{cls.__name__}'
+            cls.fields = tuple(name for base in cls.__mro__ for name in vars(base).get('__slots__', ())
+                               if name not in ('has_call', 'line'))
+
+def node_values(node: ASTNode) -> Iterable[Any]:
+    """The fields of a node with __slots__, or everything in its __dict__"""
+    if node.fields:
+        return [getattr(node, name) for name in node.fields]
+    return vars(node).values()
+
+class Program(ASTNode):
+    def __init__(self, statements: List[ASTNode]):
+        self.statements = statements
+
+class SetStatement(ASTNode):
+    def __init__(self, var_name: str, value: ASTNode):
+        self.var_name = var_name
+        self.value = value
+        self.slot: Optional[int] = None  # Frame slot inside a function body
+
+class PrintStatement(ASTNode):
+    def __init__(self, expression: ASTNode):
+        self.expression = expression
+
+class AskStatement(ASTNode):
+    def __init__(self, prompt: str, var_name: str):
+        self.prompt = prompt
+        self.var_name = var_name
+        self.slot: Optional[int] = None
+
+class IfStatement(ASTNode):
+    def __init__(self, condition: ASTNode, then_body: List[ASTNode], else_body: Optional[List[ASTNode]]):
+        self.condition = condition
+        self.then_body = then_body
+        self.else_body = else_body
+
+class RepeatWhileStatement(ASTNode):
+    def __init__(self, condition: ASTNode, body: List[ASTNode]):
+        self.condition = condition
+        self.body = body
+        # Filled in by the LoopAnalyzer for the tree engine
+        self.counting: Optional['CountingLoop'] = None
+        self.invariants: List['Invariant'] = []
+        self.loop_analyzed = False
+
+class RepeatTimesStatement(ASTNode):
+    def __init__(self, count: ASTNode, body: List[ASTNode]):
+        self.count = count
+        self.body = body
+        self.invariants: List['Invariant'] = []
+        self.loop_analyzed = False
+
+class ForEachStatement(ASTNode):
+    def __init__(self, item_name: str, list_expr: ASTNode, body: List[ASTNode]):
+        self.item_name = item_name
+        self.list_expr = list_expr
+        self.body = body
+        self.slot: Optional[int] = None
+        # Filled in by the LoopAnalyzer for the tree engine
+        self.reduction: Optional['Reduction'] = None
+
+class FunctionDef(ASTNode):
+    def __init__(self, name: str, params: List[str], body: List[ASTNode]):
+        self.name = name
+        self.params = params
+        self.body = body
+        self.locals: Optional[Dict[str, int]] = None  # Slot of every name in the body
+        self.param_slots: List[int] = []
+        # What the body does directly, gathered by the Resolver for memoization
+        self.has_effects = False  # prints, asks or defines a function
+        self.callees: Set[str] = set()
+        self.free_names: Set[str] = set()
+
+class FunctionCall(ASTNode):
+    def __init__(self, name: str, args: List[ASTNode]):
+        self.name = name
+        self.args = args
+
+class ReturnStatement(ASTNode):
+    def __init__(self, value: Optional[ASTNode]):
+        self.value = value
+
+class BinaryOp(ASTNode):
+    """left op right
+    
+    The Resolver turns every BinaryOp into a specialized kind: a subclass of
+    its operand form (this class, VariableLiteralOp or LiteralVariableOp)
+    whose apply() is the operation itself.
+    """
+    __slots__ = ('left', 'op', 'right', 'has_call', 'line')
+    
+    def __init__(self, left: ASTNode, op: Token, right: ASTNode):
+        self.left = left
+        self.op = op
+        self.right = right
+        self.has_call = False
+        self.line = None
+    
+    def apply(self, left: Any, right: Any) -> Any:
+        return apply_binary_op(self.op.type, left, right)
+
+class VariableLiteralOp(BinaryOp):
+    """A Variable op a Literal, read without visiting either"""
+    __slots__ = ()
+    visit_name = 'visit_VariableLiteralOp'
+
+class LiteralVariableOp(BinaryOp):
+    """A Literal op a Variable, read without visiting either"""
+    __slots__ = ()
+    visit_name = 'visit_LiteralVariableOp'
+
+class UnaryOp(ASTNode):
+    def __init__(self, op: Token, expr: ASTNode):
+        self.op = op
+        self.expr = expr
+
+class Literal(ASTNode):
+    __slots__ = ('value', 'has_call', 'line')
+    
+    def __init__(self, value: Any):
+        self.value = value
+        self.has_call = False
+        self.line = None
+
+class Variable(ASTNode):
+    __slots__ = ('name', 'is_literal_if_undefined', 'slot', 'has_call', 'line')
+    
+    def __init__(self, name: str):
+        self.name = name
+        self.is_literal_if_undefined = False  # Flag for print context
+        self.slot: Optional[int] = None
+        self.has_call = False
+        self.line = None
+
+class ListLiteral(ASTNode):
+    def __init__(self, items: List[ASTNode]):
+        self.items = items
+
+# ============================================================================
+# PARSER
+# ============================================================================
+
+class Parser:
+    ARITHMETIC_OPS = (TokenCode.PLUS, TokenCode.MINUS, TokenCode.TIMES_OP, TokenCode.DIVIDED_BY)
+    COMPARISON_OPS = (TokenCode.EQUALS, TokenCode.IS_GREATER_THAN, TokenCode.IS_LESS_THAN)
+    BLOCK_END = (TokenCode.END, TokenCode.OTHERWISE, TokenCode.EOF)
+    
+    def __init__(self, lexer: Lexer):
+        self.lexer = lexer
+        self.tokens = lexer.token_buffer()
+        self.types = self.tokens.types
+        self.pos = -1
+        self.advance()
+    
+    @property
+    def current_token(self) -> Token:
+        return self.tokens.token(self.pos)
+    
+    def current_value(self) -> Any:
+        return self.tokens.value(self.pos)
+    
+    def advance(self):
+        self.pos += 1
+        if self.pos >= len(self.types):
+            # Lexing errors surface only when the parser reaches them
+            raise self.tokens.error
+        self.current_type = self.types[self.pos]
+    
+    def eat(self, token_code: int):
+        if self.current_type == token_code:
+            self.advance()
+        else:
+            raise Exception(f"Expected {TOKEN_TYPES[token_code]}, got {TOKEN_TYPES[self.current_type]}")
+    
+    def eat_identifier(self) -> str:
+        name = self.current_value()
+        self.eat(TokenCode.IDENTIFIER)
+        return name
+    
+    def parse(self) -> Program:
+        statements = []
+        while self.current_type != TokenCode.EOF:
+            statements.append(self.parse_statement())
+        return Program(statements)
+    
+    def parse_statement(self) -> ASTNode:
+        line = self.tokens.lines[self.pos]
+        stmt = self.parse_statement_node()
+        stmt.line = line
+        return stmt
+    
+    def parse_statement_node(self) -> ASTNode:
+        if self.current_type == TokenCode.SET:
+            return self.parse_set_statement()
+        elif self.current_type == TokenCode.PRINT:
+            return self.parse_print_statement()
+        elif self.current_type == TokenCode.WRITE:
+            return self.parse_print_statement()
+        elif self.current_type == TokenCode.ASK:
+            return self.parse_ask_statement()
+        elif self.current_type == TokenCode.IF:
+            return self.parse_if_statement()
+        elif self.current_type == TokenCode.REPEAT:
+            return self.parse_repeat_statement()
+        elif self.current_type == TokenCode.FOR:
+            return self.parse_for_statement()
+        elif self.current_type == TokenCode.DEFINE:
+            return self.parse_function_def()
+        elif self.current_type == TokenCode.CALL:
+            call = self.parse_function_call()
+            # A call used as a statement: call greet with name.
+            self.skip_period()
+            return call
+        elif self.current_type == TokenCode.RETURN:
+            return self.parse_return_statement()
+        else:
+            raise Exception(f"Unexpected token: {self.current_token}")
+    
+    def skip_period(self):
+        """Accept an optional period, as after a call statement or a block header"""
+        if self.current_type == TokenCode.PERIOD:
+            self.eat(TokenCode.PERIOD)
+    
+    def parse_set_statement(self) -> SetStatement:
+        self.eat(TokenCode.SET)
+        var_name = self.eat_identifier()
+        self.eat(TokenCode.TO)
+        value = self.parse_set_expression()
+        self.eat(TokenCode.PERIOD)
+        return SetStatement(var_name, value)
+    
+    def parse_set_expression(self) -> ASTNode:
+        """Parse expression in a set context, allowing undefined identifiers as literals
+        
+        Comma-separated expressions make a list: set numbers to 1, 2, 3.
+        """
+        expr = self.parse_expression()
+        if self.current_type == TokenCode.COMMA:
+            items = [expr]
+            while self.current_type == TokenCode.COMMA:
+                self.eat(TokenCode.COMMA)
+                items.append(self.parse_expression())
+            expr = ListLiteral(items)
+        # Enable literal fallback for all variables in this expression
+        self._mark_fallback_to_literal(expr)
+        return expr
+    
+    def _mark_fallback_to_literal(self, node: ASTNode):
+        """Recursively mark all Variable nodes to fallback to literal if undefined"""
+        if isinstance(node, Variable):
+            node.is_literal_if_undefined = True
+        elif isinstance(node, BinaryOp):
+            self._mark_fallback_to_literal(node.left)
+            self._mark_fallback_to_literal(node.right)
+        elif isinstance(node, UnaryOp):
+            self._mark_fallback_to_literal(node.expr)
+        elif isinstance(node, ListLiteral):
+            for item in node.items:
+                self._mark_fallback_to_literal(item)
+    
+    def parse_print_statement(self) -> PrintStatement:
+        self.eat(self.current_type)  # PRINT or WRITE
+        
+        # Collect everything until period, treating most things as a phrase
+        words = []
+        
+        while self.current_type != TokenCode.PERIOD and self.current_type != TokenCode.EOF:
+            # Stop at operators that would indicate this is an expression
+            if self.current_type in self.ARITHMETIC_OPS:
+                # This is an operation on previous words
+                if len(words) > 0:
+                    # Parse the first word as a variable/number and the rest as expression
+                    first_val = words[0]
+                    if first_val.isdigit() or (first_val[0].isdigit() if first_val else False):
+                        left = Literal(int(first_val))
+                    else:
+                        left = Variable(first_val)
+                        left.is_literal_if_undefined = True
+                    
+                    # Now parse operators
+                    while self.current_type in self.ARITHMETIC_OPS:
+                        op = self.current_token
+                        self.eat(self.current_type)
+                        
+                        if self.current_type == TokenCode.NUMBER:
+                            right = Literal(self.current_value())
+                            self.eat(TokenCode.NUMBER)
+                        elif self.current_type == TokenCode.IDENTIFIER:
+                            right = Variable(self.current_value())
+                            right.is_literal_if_undefined = True
+                            self.eat(TokenCode.IDENTIFIER)
+                        else:
+                            raise Exception(f"Expected operand after operator")
+                        
+                        left = BinaryOp(left, op, right)
+                    
+                    self.eat(TokenCode.PERIOD)
+                    return PrintStatement(left)
+                else:
+                    raise Exception("No left operand for expression")
+            elif self.current_type == TokenCode.IDENTIFIER or self.current_type == TokenCode.NUMBER:
+                words.append(str(self.current_value()))
+                self.eat(self.current_type)
+            else:
+                # It's some other keyword... treat it as part of the phrase
+                if self.current_type == TokenCode.TO:
+                    words.append('to')
+                    self.eat(TokenCode.TO)
+                elif self.current_type == TokenCode.AND_STORE_IN:
+                    words.append('and store in')
+                    self.eat(TokenCode.AND_STORE_IN)
+                else:
+                    # For other keywords, try to treat as part of phrase
+                    value = self.current_value()
+                    words.append(value if value else TOKEN_TYPES[self.current_type].name.lower())
+                    self.eat(self.current_type)
+        
+        self.eat(TokenCode.PERIOD)
+        
+        if len(words) == 0:
+            raise Exception("No expression after print statement")
+        elif len(words) == 1:
+            # Single word - could be variable or literal
+            token_val = words[0]
+            var_node = Variable(token_val)
+            var_node.is_literal_if_undefined = True
+            return PrintStatement(var_node)
+        else:
+            # Multiple words - treat as phrase
+            phrase = ' '.join(words)
+            return PrintStatement(Literal(phrase))
+    
+    def parse_ask_statement(self) -> AskStatement:
+        self.eat(TokenCode.ASK)
+        prompt = self.parse_string_phrase()
+        # "and store in name" and the short "store name" are both accepted
+        if self.current_type == TokenCode.OR:
+            self.eat(TokenCode.OR)
+        self.eat(TokenCode.AND_STORE_IN)
+        if self.current_type == TokenCode.IN:
+            self.eat(TokenCode.IN)
+        var_name = self.eat_identifier()
+        self.eat(TokenCode.PERIOD)
+        return AskStatement(prompt, var_name)
+    
+    def parse_if_statement(self) -> IfStatement:
+        self.eat(TokenCode.IF)
+        condition = self.parse_expression()
+        self.eat(TokenCode.THEN)
+        then_body = self.parse_block()
+        
+        else_body = None
+        if self.current_type == TokenCode.OTHERWISE:
+            self.eat(TokenCode.OTHERWISE)
+            else_body = self.parse_block()
+        
+        self.eat(TokenCode.END)
+        self.eat(TokenCode.PERIOD)
+        return IfStatement(condition, then_body, else_body)
+    
+    def parse_repeat_statement(self) -> Union[RepeatWhileStatement, RepeatTimesStatement]:
+        self.eat(TokenCode.REPEAT)
+        
+        if self.current_type == TokenCode.WHILE:
+            self.eat(TokenCode.WHILE)
+            condition = self.parse_expression()
+            self.skip_period()
+            body = self.parse_block()
+            self.eat(TokenCode.END)
+            self.eat(TokenCode.PERIOD)
+            return RepeatWhileStatement(condition, body)
+        else:
+            # Parse count - but be careful not to consume 'times'
+            # We only want primary expressions here, not multiplication
+            if self.current_type == TokenCode.NUMBER:
+                count = Literal(self.current_value())
+                self.eat(TokenCode.NUMBER)
+            elif self.current_type == TokenCode.IDENTIFIER:
+                count = Variable(self.eat_identifier())
+            else:
+                count = self.parse_primary()
+            
+            self.eat(TokenCode.TIMES_OP)  # 'times' keyword
+            self.skip_period()
+            body = self.parse_block()
+            self.eat(TokenCode.END)
+            self.eat(TokenCode.PERIOD)
+            return RepeatTimesStatement(count, body)
+    
+    def parse_for_statement(self) -> ForEachStatement:
+        self.eat(TokenCode.FOR)
+        self.eat(TokenCode.EACH)
+        item_name = self.eat_identifier()
+        self.eat(TokenCode.IN)
+        list_expr = self.parse_expression()
+        self.skip_period()
+        body = self.parse_block()
+        self.eat(TokenCode.END)
+        self.eat(TokenCode.PERIOD)
+        return ForEachStatement(item_name, list_expr, body)
+    
+    def parse_function_def(self) -> FunctionDef:
+        self.eat(TokenCode.DEFINE)
+        name = self.eat_identifier()
+        
+        params = []
+        if self.current_type == TokenCode.WITH:
+            self.eat(TokenCode.WITH)
+            params.append(self.eat_identifier())
+            
+            while self.current_type == TokenCode.COMMA:
+                self.eat(TokenCode.COMMA)
+                params.append(self.eat_identifier())
+        
+        self.skip_period()
+        body = self.parse_block()
+        self.eat(TokenCode.END)
+        self.eat(TokenCode.PERIOD)
+        return FunctionDef(name, params, body)
+    
+    def parse_function_call(self) -> FunctionCall:
+        self.eat(TokenCode.CALL)
+        name = self.eat_identifier()
+        
+        args = []
+        if self.current_type == TokenCode.WITH:
+            self.eat(TokenCode.WITH)
+            args.append(self.parse_expression())
+            
+            while self.current_type == TokenCode.COMMA:
+                self.eat(TokenCode.COMMA)
+                args.append(self.parse_expression())
+        
+        return FunctionCall(name, args)
+    
+    def parse_return_statement(self) -> ReturnStatement:
+        self.eat(TokenCode.RETURN)
+        value = None
+        if self.current_type != TokenCode.PERIOD:
+            value = self.parse_expression()
+        self.eat(TokenCode.PERIOD)
+        return ReturnStatement(value)
+    
+    def parse_block(self) -> List[ASTNode]:
+        statements = []
+        while self.current_type not in self.BLOCK_END:
+            statements.append(self.parse_statement())
+        return statements
+    
+    def parse_expression(self) -> ASTNode:
+        return self.parse_or_expr()
+    
+    def parse_or_expr(self) -> ASTNode:
+        left = self.parse_and_expr()
+        
+        while self.current_type == TokenCode.OR:
+            op = self.current_token
+            self.eat(TokenCode.OR)
+            right = self.parse_and_expr()
+            left = BinaryOp(left, op, right)
+        
+        return left
+    
+    def parse_and_expr(self) -> ASTNode:
+        left = self.parse_comparison()
+        
+        while self.current_type == TokenCode.OR and self.current_value().lower() == 'and':
+            op = self.current_token
+            self.eat(TokenCode.OR)
+            right = self.parse_comparison()
+            left = BinaryOp(left, op, right)
+        
+        return left
+    
+    def parse_comparison(self) -> ASTNode:
+        left = self.parse_addition()
+        
+        while self.current_type in self.COMPARISON_OPS:
+            op = self.current_token
+            self.eat(self.current_type)
+            right = self.parse_addition()
+            left = BinaryOp(left, op, right)
+        
+        return left
+    
+    def parse_addition(self) -> ASTNode:
+        left = self.parse_multiplication()
+        
+        while self.current_type == TokenCode.PLUS or self.current_type == TokenCode.MINUS:
+            op = self.current_token
+            self.eat(self.current_type)
+            right = self.parse_multiplication()
+            left = BinaryOp(left, op, right)
+        
+        return left
+    
+    def parse_multiplication(self) -> ASTNode:
+        left = self.parse_unary()
+        
+        while self.current_type == TokenCode.TIMES_OP or self.current_type == TokenCode.DIVIDED_BY:
+            op = self.current_token
+            self.eat(self.current_type)
+            right = self.parse_unary()
+            left = BinaryOp(left, op, right)
+        
+        return left
+    
+    def parse_unary(self) -> ASTNode:
+        if self.current_type == TokenCode.NOT:
+            op = self.current_token
+            self.eat(TokenCode.NOT)
+            expr = self.parse_unary()
+            return UnaryOp(op, expr)
+        
+        return self.parse_primary()
+    
+    def parse_primary(self) -> ASTNode:
+        if self.current_type == TokenCode.NUMBER:
+            value = self.current_value()
+            self.eat(TokenCode.NUMBER)
+            return Literal(value)
+        
+        elif self.current_type == TokenCode.IDENTIFIER:
+            return Variable(self.eat_identifier())
+        
+        elif self.current_type == TokenCode.CALL:
+            return self.parse_function_call()
+        
+        else:
+            raise Exception(f"Unexpected token: {self.current_token}")
+    
+    def parse_string_phrase(self) -> str:
+        words = []
+        while self.current_type == TokenCode.IDENTIFIER or self.current_type == TokenCode.NUMBER:
+            words.append(str(self.current_value()))
+            self.eat(self.current_type)
+        return ' '.join(words)
+
+# ============================================================================
+# INCREMENTAL FRONT END
+# ============================================================================
+
+class RecoveringParser(Parser):
+    """Parser that records a failed top-level statement and resumes after its period"""
+    @property
+    def current_token(self) -> Token:
+        # Errors get their position from the Document, as the buffer's goes stale after edits
+        return Token(TOKEN_TYPES[self.current_type], self.current_value(), None, None)
+    
+    def parse_segments(self) -> Tuple[List[tuple], bool]:
+        """Every top-level statement as (first token, end token, statement, error)
+        
+        A failed statement has statement None and error (offset, message);
+        its tokens run up to and including the next period. The flag says
+        whether the last statement ended by consuming a period, so that no
+        text after these tokens could have changed how they parsed.
+        """
+        segments = []
+        closed = True
+        while self.current_type != TokenCode.EOF:
+            first = self.pos
+            try:
+                statement, error = self.parse_statement(), None
+                hit_end = False
+            except Exception as e:
+                statement, error = None, (self.tokens.starts[self.pos], str(e))
+                hit_end = self.current_type == TokenCode.EOF
+                while self.current_type not in (TokenCode.PERIOD, TokenCode.EOF):
+                    self.advance()
+                if self.current_type == TokenCode.PERIOD:
+                    self.advance()
+            segments.append((first, self.pos, statement, error))
+            closed = not hit_end and self.types[self.pos - 1] == TokenCode.PERIOD
+        return segments, closed
+
+class Segment:
+    """One top-level statement of a Document, with the whitespace and
+    comments after it, or the tokens of a statement that failed to parse
+    
+    Offsets and lines are those of the TokenBuffer the segment was parsed
+    from; offset and line are where the segment starts in it, so the
+    segment stays valid however much text is edited before it.
+    """
+    __slots__ = ('buffer', 'first', 'end', 'offset', 'line', 'statement', 'errors')
+    
+    def __init__(self, buffer: TokenBuffer, first: int, end: int, offset: int, line: int,
+                 statement: Optional[ASTNode], errors: List[Tuple[int, str]]):
+        self.buffer = buffer
+        self.first = first  # Token indexes [first, end) in buffer
+        self.end = end
+        self.offset = offset
+        self.line = line
+        self.statement = statement
+        self.errors = errors  # (offset in buffer, message)
+
+class Document:
+    """S++ source kept lexed and parsed while an editor changes it
+    
+    The text is held as a list of Segments, one per top-level statement.
+    edit() re-lexes and re-parses only the segments the change touches,
+    growing that region while its last statement could still run into the
+    text after it (an unclosed block, a missing period, an open comment).
+    Every other segment keeps its tokens and AST. Invalid characters and
+    statements that fail to parse become errors on their segment instead
+    of stopping the parse, and the result always matches what parsing the
+    whole text from scratch would give.
+    
+    Segment starts and lines are stored in plain lists. An edit moves every
+    later segment, so that shift is stored once and only applied to the
+    segments between one edit and the next.
+    """
+    SKIP_PATTERN = re.compile(r'(?:\s+|//[^\n]*)*')
+    
+    def __init__(self, text: str = ''):
+        self.text = text
+        self.shift_index = 0  # Segments from here on are shift_chars and shift_lines further on
+        self.shift_chars = 0
+        self.shift_lines = 0
+        self.segments, self.starts, self.lines, _ = self.parse_region(0, len(text), 1)
+    
+    def edit(self, start: int, end: int, new_text: str):
+        """Replace text[start:end] with new_text"""
+        if not 0 <= start <= end <= len(self.text):
+            raise Exception(f"Edit range {start}:{end} is outside the document")
+        old_text = self.text
+        self.text = old_text[:start] + new_text + old_text[end:]
+        delta_chars = len(new_text) - (end - start)
+        delta_lines = new_text.count('\n') - old_text.count('\n', start, end)
+        
+        # A change at a segment's first character can join it to the end of the one before
+        first = self.segment_index(max(start - 1, 0))
+        last = self.segment_index(end)
+        count = len(self.segments)
+        while True:
+            region_end = self.start_of(last + 1) + delta_chars if last + 1 < count else len(self.text)
+            segments, starts, lines, closed = self.parse_region(self.start_of(first), region_end,
+                                                                self.line_of(first))
+            if segments[0].statement is None and segments[0].first == segments[0].end and count > 1:
+                # Text without tokens belongs to the segment before it, or to the first one
+                if first > 0:
+                    first -= 1
+                    continue
+                closed = False
+            if closed or last + 1 == count:
+                break
+            last = min(count - 1, last + (last - first + 1))
+        
+        self.move_shift(first)
+        self.segments[first:last + 1] = segments
+        self.starts[first:last + 1] = starts
+        self.lines[first:last + 1] = lines
+        self.shift_index = first + len(segments)
+        self.shift_chars += delta_chars
+        self.shift_lines += delta_lines
+    
+    def parse_region(self, start: int, end: int, line: int) -> Tuple[List[Segment], List[int], List[int], bool]:
+        """Segments for text[start:end], which starts on the given line
+        
+        Returns them with their starts and lines in the document, and
+        whether the text after end cannot affect them.
+        """
+        text = self.text[start:end]
+        lexer, lex_errors = self.lex(text)
+        buffer = lexer.buffer
+        parsed, closed = RecoveringParser(lexer).parse_segments()
+        
+        segments, starts, lines = [], [], []
+        for index, (first, stop, statement, error) in enumerate(parsed):
+            # The first segment also holds any whitespace and comments before its statement
+            offset = buffer.starts[first] if index else 0
+            segment_line = buffer.lines[first] if index else 1
+            segments.append(Segment(buffer, first, stop, offset, segment_line, statement,
+                                    [error] if error else []))
+            starts.append(start + offset)
+            lines.append(line + segment_line - 1)
+        if not segments:
+            segments.append(Segment(buffer, 0, 0, 0, 1, None, []))
+            starts.append(start)
+            lines.append(line)
+        for offset, message in lex_errors:
+            segment = segments[bisect_right(starts, start + offset) - 1]
+            segment.errors.append((offset, message))
+            segment.errors.sort()
+        
+        # A comment still open at the end, or a final period a digit could
+        # turn into a decimal point, would read differently with what follows
+        tail = text[buffer.ends[-2] if len(buffer) > 1 else 0:]
+        if '//' in tail[tail.rfind('\n') + 1:]:
+            closed = False
+        elif not tail and end < len(self.text) and self.text[end].isdigit():
+            closed = False
+        return segments, starts, lines, closed
+    
+    @classmethod
+    def lex(cls, text: str) -> Tuple[Lexer, List[Tuple[int, str]]]:
+        """A lexer over text with every invalid character recorded and read as a space"""
+        errors = []
+        while True:
+            lexer = Lexer(text)
+            buffer = lexer.token_buffer()
+            if buffer.error is None:
+                return lexer, errors
+            # The buffer stops at the token before the invalid character
+            pos = cls.SKIP_PATTERN.match(text, buffer.ends[-1] if len(buffer) else 0).end()
+            errors.append((pos, f"Invalid character '{text[pos]}'"))
+            text = text[:pos] + ' ' + text[pos + 1:]
+    
+    def segment_index(self, offset: int) -> int:
+        """Index of the segment holding offset"""
+        shifted = self.shift_index
+        if shifted < len(self.starts) and offset >= self.starts[shifted] + self.shift_chars:
+            return bisect_right(self.starts, offset - self.shift_chars, shifted) - 1
+        return bisect_right(self.starts, offset, 0, shifted) - 1
+    
+    def start_of(self, index: int) -> int:
+        return self.starts[index] + (self.shift_chars if index >= self.shift_index else 0)
+    
+    def line_of(self, index: int) -> int:
+        return self.lines[index] + (self.shift_lines if index >= self.shift_index else 0)
+    
+    def move_shift(self, index: int):
+        """Store exact positions for segments before index and shifted ones from it on"""
+        chars, lines = self.shift_chars, self.shift_lines
+        if chars or lines:
+            if index > self.shift_index:
+                for i in range(self.shift_index, index):
+                    self.starts[i] += chars
+                    self.lines[i] += lines
+            else:
+                for i in range(index, self.shift_index):
+                    self.starts[i] -= chars
+                    self.lines[i] -= lines
+        self.shift_index = index
+    
+    def statements(self) -> Iterable[Tuple[int, int, int, ASTNode]]:
+        """(start, end, line) in the document and AST of every top-level statement
+        
+        Lines inside the AST count from where its segment was parsed; program()
+        gives a copy with document lines.
+        """
+        for index, segment in enumerate(self.segments):
+            if segment.statement is not None:
+                end = self.start_of(index + 1) if index + 1 < len(self.segments) else len(self.text)
+                yield self.start_of(index), end, self.line_of(index), segment.statement
+    
+    def errors(self) -> List[Tuple[int, int, str]]:
+        """(line, column, message) of every invalid character and failed statement"""
+        errors = []
+        for index, segment in enumerate(self.segments):
+            for offset, message in segment.errors:
+                position = self.start_of(index) + offset - segment.offset
+                line = self.line_of(index) + segment.buffer.text.count('\n', segment.offset, offset)
+                errors.append((line, position - self.text.rfind('\n', 0, position), message))
+        return errors
+    
+    def tokens(self) -> Iterable[Token]:
+        """Every token, with its line and column in the document"""
+        for index, segment in enumerate(self.segments):
+            buffer, start, line = segment.buffer, self.start_of(index), self.line_of(index)
+            for token in range(segment.first, segment.end):
+                position = start + buffer.starts[token] - segment.offset
+                yield Token(TOKEN_TYPES[buffer.types[token]], buffer.value(token),
+                            line + buffer.lines[token] - segment.line,
+                            position - self.text.rfind('\n', 0, position))
+    
+    def program(self) -> Program:
+        """A copy of the AST with document lines, ready to run; raises the first error"""
+        errors = self.errors()
+        if errors:
+            line, column, message = errors[0]
+            raise Exception(f"{message} at {line}:{column}")
+        statements = []
+        for index, segment in enumerate(self.segments):
+            if segment.statement is not None:
+                statement = copy.deepcopy(segment.statement)
+                shift_lines([statement], self.line_of(index) - segment.line)
+                statements.append(statement)
+        return Program(statements)
+
+def shift_lines(statements: List[ASTNode], delta: int):
+    """Move the line of every statement, nested ones included, by delta"""
+    for stmt in statements:
+        stmt.line += delta
+        for field in ('body', 'then_body', 'else_body'):
+            shift_lines(getattr(stmt, field, None) or [], delta)
+
+# ============================================================================
+# OPTIMIZER
+# ============================================================================
+
+def count_nodes(node: Any) -> int:
+    """Number of AST nodes in a node, a list of nodes or neither"""
+    if isinstance(node, list):
+        return sum(count_nodes(item) for item in node)
+    if isinstance(node, ASTNode):
+        return 1 + sum(count_nodes(value) for value in node_values(node))
+    return 0
+
+class Optimizer:
+    """Simplifies a parsed program before any engine runs it
+    
+    - BinaryOp and UnaryOp nodes over Literals are folded into a Literal,
+      computed by the same rules the engines use (so x divided by 0 is 0).
+      Operations that would fail at run time are left for run time.
+    - Literal fallback Variables (single-word prints and set expressions)
+      become Literals when nothing in the program can ever define the name.
+      This needs the whole program, so it is skipped for whole_program=False.
+    - If statements with a constant condition are replaced by the branch
+      that runs; loops that can never run their body are dropped.
+    
+    removed holds how many nodes the last optimize() call took out.
+    """
+    # Folded strings longer than this, or ints wider in bits, stay expressions
+    MAX_FOLDED_SIZE = 1000
+    
+    def __init__(self, whole_program: bool = True):
+        self.whole_program = whole_program
+        self.assigned_names: Set[str] = set()
+        self.removed = 0
+    
+    def optimize(self, program: Program) -> Program:
+        before = count_nodes(program)
+        self.assigned_names = set()
+        self.collect_assigned(program.statements)
+        program.statements = self.optimize_block(program.statements)
+        self.removed = before - count_nodes(program)
+        return program
+    
+    def collect_assigned(self, statements: List[ASTNode]):
+        """Gather every name a statement could ever define"""
+        for stmt in statements:
+            if isinstance(stmt, (SetStatement, AskStatement)):
+                self.assigned_names.add(stmt.var_name)
+            elif isinstance(stmt, ForEachStatement):
+                self.assigned_names.add(stmt.item_name)
+                self.collect_assigned(stmt.body)
+            elif isinstance(stmt, FunctionDef):
+                self.assigned_names.update(stmt.params)
+                self.collect_assigned(stmt.body)
+            elif isinstance(stmt, IfStatement):
+                self.collect_assigned(stmt.then_body)
+                self.collect_assigned(stmt.else_body or [])
+            elif isinstance(stmt, (RepeatWhileStatement, RepeatTimesStatement)):
+                self.collect_assigned(stmt.body)
+    
+    def optimize_block(self, statements: List[ASTNode]) -> List[ASTNode]:
+        result = []
+        for stmt in statements:
+            method = getattr(self, f'optimize_{type(stmt).__name__}', None)
+            if method:
+                result.extend(method(stmt))
+            else:
+                result.append(self.expression(stmt))
+        return result
+    
+    def optimize_SetStatement(self, node: SetStatement) -> List[ASTNode]:
+        node.value = self.expression(node.value)
+        return [node]
+    
+    def optimize_PrintStatement(self, node: PrintStatement) -> List[ASTNode]:
+        node.expression = self.expression(node.expression)
+        return [node]
+    
+    def optimize_IfStatement(self, node: IfStatement) -> List[ASTNode]:
+        node.condition = self.expression(node.condition)
+        node.then_body = self.optimize_block(node.then_body)
+        if node.else_body:
+            node.else_body = self.optimize_block(node.else_body)
+        if isinstance(node.condition, Literal):
+            # Blocks have no scope of their own, so the branch can be inlined
+            return node.then_body if is_truthy(node.condition.value) else node.else_body or []
+        return [node]
+    
+    def optimize_RepeatWhileStatement(self, node: RepeatWhileStatement) -> List[ASTNode]:
+        node.condition = self.expression(node.condition)
+        node.body = self.optimize_block(node.body)
+        if isinstance(node.condition, Literal) and not is_truthy(node.condition.value):
+            return []
+        return [node]
+    
+    def optimize_RepeatTimesStatement(self, node: RepeatTimesStatement) -> List[ASTNode]:
+        node.count = self.expression(node.count)
+        node.body = self.optimize_block(node.body)
+        if isinstance(node.count, Literal):
+            try:
+                count = int(node.count.value)
+            except (TypeError, ValueError):
+                # Left in place to fail at run time
+                return [node]
+            if count <= 0 or not node.body:
+                return []
+        return [node]
+    
+    def optimize_ForEachStatement(self, node: ForEachStatement) -> List[ASTNode]:
+        node.list_expr = self.expression(node.list_expr)
+        node.body = self.optimize_block(node.body)
+        return [node]
+    
+    def optimize_FunctionDef(self, node: FunctionDef) -> List[ASTNode]:
+        node.body = self.optimize_block(node.body)
+        return [node]
+    
+    def optimize_ReturnStatement(self, node: ReturnStatement) -> List[ASTNode]:
+        if node.value:
+            node.value = self.expression(node.value)
+        return [node]
+    
+    def expression(self, node: ASTNode) -> ASTNode:
+        if isinstance(node, BinaryOp):
+            node.left = self.expression(node.left)
+            node.right = self.expression(node.right)
+            if isinstance(node.left, Literal) and isinstance(node.right, Literal):
+                try:
+                    value = apply_binary_op(node.op.type, node.left.value, node.right.value)
+                except Exception:
+                    return node
+                return self.fold(node, value)
+        elif isinstance(node, UnaryOp):
+            node.expr = self.expression(node.expr)
+            if isinstance(node.expr, Literal) and node.op.type == TokenType.NOT:
+                return Literal(not is_truthy(node.expr.value))
+        elif isinstance(node, Variable):
+            if (node.is_literal_if_undefined and self.whole_program
+                    and node.name not in self.assigned_names):
+                return Literal(node.name)
+        elif isinstance(node, FunctionCall):
+            node.args = [self.expression(arg) for arg in node.args]
+        elif isinstance(node, ListLiteral):
+            node.items = [self.expression(item) for item in node.items]
+        return node
+    
+    def fold(self, node: ASTNode, value: Any) -> ASTNode:
+        """Replace node by Literal(value) when the value is small and plain"""
+        if isinstance(value, bool):
+            return Literal(value)
+        if isinstance(value, int) and value.bit_length() <= self.MAX_FOLDED_SIZE:
+            return Literal(value)
+        if isinstance(value, float) and math.isfinite(value):
+            return Literal(value)
+        if isinstance(value, str) and len(value) <= self.MAX_FOLDED_SIZE:
+            return Literal(value)
+        return node
+
+# ============================================================================
+# INPUT AND OUTPUT
+# ============================================================================
+
+class StdoutSink:
+    """Writes to whatever sys.stdout is at the time of each write"""
+    def write(self, text: str):
+        sys.stdout.write(text)
+    
+    def flush(self):
+        sys.stdout.flush()
+    
+    def isatty(self) -> bool:
+        return sys.stdout.isatty()
+
+class OutputBuffer:
+    """Collects printed lines and hands them to a sink in large writes
+    
+    The sink is any object with write() and flush(): StdoutSink(), an open
+    file, or io.StringIO to capture output in memory. flush_every sets the
+    flush policy: 1 flushes after every line, N after every N lines, and 0
+    only on an explicit flush() (before every ask and when the program ends)
+    or once buffer_size characters are waiting. None picks 1 when the sink
+    is an interactive terminal and 0 otherwise.
+    """
+    BUFFER_SIZE = 1 << 16
+    
+    def __init__(self, sink: Any = None, flush_every: Optional[int] = None,
+                 buffer_size: int = BUFFER_SIZE):
+        self.sink = sink if sink is not None else StdoutSink()
+        if flush_every is None:
+            isatty = getattr(self.sink, 'isatty', None)
+            flush_every = 1 if isatty and isatty() else 0
+        self.flush_every = flush_every
+        self.buffer_size = buffer_size
+        self.lines: List[str] = []
+        self.size = 0
+    
+    def write_line(self, text: str):
+        self.lines.append(text)
+        self.size += len(text) + 1
+        if self.size >= self.buffer_size or len(self.lines) == self.flush_every:
+            self.flush()
+    
+    def flush(self):
+        if self.lines:
+            self.lines.append('')
+            self.sink.write('\n'.join(self.lines))
+            self.lines = []
+            self.size = 0
+        self.sink.flush()
+
+# Answers int() or float() would accept, so coerce_input never has to catch
+# a ValueError: optional sign, digit groups joined by single underscores,
+# an optional fraction and exponent, or inf/infinity/nan in any case. Both
+# strip the same whitespace as str.strip() except \x1c-\x1f.
+_INPUT_SPACE = r'[^\S\x1c-\x1f]*'
+INT_INPUT_PATTERN = re.compile(rf'{_INPUT_SPACE}[-+]?\d+(?:_\d+)*{_INPUT_SPACE}\Z')
+FLOAT_INPUT_PATTERN = re.compile(
+    rf'{_INPUT_SPACE}[-+]?(?:(?:\d+(?:_\d+)*(?:\.(?:\d+(?:_\d+)*)?)?|\.\d+(?:_\d+)*)'
+    rf'(?:[eE][-+]?\d+(?:_\d+)*)?|(?i:inf|infinity|nan)){_INPUT_SPACE}\Z')
+
+def coerce_input(value: str) -> Any:
+    """Convert an answer to an ask to an int or float when it reads as one"""
+    if value.isdecimal() or INT_INPUT_PATTERN.match(value):
+        try:
+            return int(value)
+        except ValueError:
+            # Longer than int()'s digit limit
+            return float(value)
+    if FLOAT_INPUT_PATTERN.match(value):
+        return float(value)
+    return value
+
+class PromptInput:
+    """Reads answers to ask statements from the terminal, one prompt at a time"""
+    def __init__(self, output: OutputBuffer):
+        self.output = output
+    
+    def ask(self, prompt: str) -> Any:
+        # The prompt must appear after everything printed so far
+        self.output.flush()
+        return coerce_input(input(prompt))
+
+class BatchInput:
+    """Reads answers to ask statements from a file, pipe or list, one per line
+    
+    Prompts are not shown and output is not flushed before each answer, so a
+    program asking thousands of questions runs at the speed of its prints.
+    """
+    def __init__(self, lines: Iterable[str]):
+        self.lines = iter(lines)
+    
+    def ask(self, prompt: str) -> Any:
+        line = next(self.lines, None)
+        if line is None:
+            raise Exception(f"No input left for ask '{prompt.strip()}'")
+        if line.endswith('\n'):
+            line = line[:-1]
+        return coerce_input(line)
+
+# ============================================================================
+# LISTS
+# ============================================================================
+
+# Shorter lists skip NumPy, whose per-call overhead outweighs the loop it saves
+NUMPY_MIN_LENGTH = 64
+NUMPY_TYPES = {'q': 'int64', 'd': 'float64'}
+INT64_LIMIT = 1 << 63
+# Largest integer magnitude a float64 holds exactly
+EXACT_FLOAT_LIMIT = 1 << 53
+
+def divide(left: Any, right: Any) -> Any:
+    """S++ division: dividing by zero yields 0, or a list of zeros for a NumberList"""
+    if right != 0 or isinstance(left, NumberList):
+        return left / right
+    return 0
+
+class NumberList:
+    """S++ list of numbers packed in an array
+    
+    The array has typecode 'q' when every item is an int and 'd' otherwise,
+    so 1, 2.5 holds 1.0 and 2.5. plus, minus, times and divided by with a
+    number, or with another list of the same length, work item by item in
+    one bulk operation: NumPy for lists of NUMPY_MIN_LENGTH items or more
+    when it is installed, otherwise map() over the arrays. Integer results
+    stay exact; NumPy is skipped whenever they could overflow 64 bits or
+    lose precision as floats, and results too large for array('q') come
+    back as a plain Python list.
+    """
+    __slots__ = ('items',)
+    # 1, 2 equals 1.0, 2.0 but prints differently, so lists stay out of memo keys
+    __hash__ = None
+    
+    def __init__(self, items: array):
+        self.items = items
+    
+    def __len__(self) -> int:
+        return len(self.items)
+    
+    def __iter__(self):
+        return iter(self.items)
+    
+    def __repr__(self) -> str:
+        return f'NumberList({self.items.tolist()!r})'
+    
+    def __str__(self) -> str:
+        return str(self.items.tolist())
+    
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, NumberList):
+            return self.items == other.items
+        return isinstance(other, list) and self.items.tolist() == other
+    
+    def __lt__(self, other: Any) -> bool:
+        return self.items.tolist() < as_python_list(other)
+    
+    def __gt__(self, other: Any) -> bool:
+        return self.items.tolist() > as_python_list(other)
+    
+    def __add__(self, other: Any) -> Any:
+        return self.apply(add, other, False)
+    
+    def __radd__(self, other: Any) -> Any:
+        return self.apply(add, other, True)
+    
+    def __sub__(self, other: Any) -> Any:
+        return self.apply(sub, other, False)
+    
+    def __rsub__(self, other: Any) -> Any:
+        return self.apply(sub, other, True)
+    
+    def __mul__(self, other: Any) -> Any:
+        return self.apply(mul, other, False)
+    
+    def __rmul__(self, other: Any) -> Any:
+        return self.apply(mul, other, True)
+    
+    def __truediv__(self, other: Any) -> Any:
+        return self.apply(divide, other, False)
+    
+    def __rtruediv__(self, other: Any) -> Any:
+        return self.apply(divide, other, True)
+    
+    def apply(self, op: Callable, other: Any, reflected: bool) -> Any:
+        """Combine with a number or NumberList item by item; reflected puts other on the left"""
+        items = self.items
+        if isinstance(other, NumberList):
+            if len(other.items) != len(items):
+                raise Exception(f"Cannot combine lists of {len(items)} and {len(other.items)} items")
+            other = other.items
+            float_result = items.typecode == 'd' or other.typecode == 'd'
+        elif isinstance(other, (int, float)):
+            float_result = items.typecode == 'd' or isinstance(other, float)
+        else:
+            return NotImplemented
+        typecode = 'd' if float_result or op is divide else 'q'
+        left, right = (other, items) if reflected else (items, other)
+        
+        if numpy is not None and len(items) >= NUMPY_MIN_LENGTH:
+            result = numpy_apply(op, left, right, typecode)
+            if result is not None:
+                return result
+        if op is divide and 0 not in (right if isinstance(right, array) else (right,)):
+            op = truediv
+        if not isinstance(left, array):
+            values = list(map(op, repeat(left), right))
+        elif not isinstance(right, array):
+            values = list(map(op, left, repeat(right)))
+        else:
+            values = list(map(op, left, right))
+        return pack_numbers(values, typecode)
+
+def as_python_list(value: Any) -> Any:
+    return value.items.tolist() if isinstance(value, NumberList) else value
+
+def pack_numbers(values: list, typecode: str) -> Any:
+    try:
+        return NumberList(array(typecode, values))
+    except OverflowError:
+        return values
+
+def make_list(items: list) -> Any:
+    """Value of a list expression: a NumberList when every item is an int or float"""
+    kinds = set(map(type, items))
+    if kinds <= {int}:
+        return pack_numbers(items, 'q')
+    if kinds <= {int, float}:
+        return pack_numbers(items, 'd')
+    return items
+
+def integer_bound(operand: Any) -> int:
+    """Largest magnitude among a NumPy operand's integers, 0 if it holds floats"""
+    if isinstance(operand, numpy.ndarray):
+        if operand.dtype.kind == 'f' or not len(operand):
+            return 0
+        return max(-int(operand.min()), int(operand.max()))
+    return abs(operand) if isinstance(operand, int) else 0
+
+def numpy_apply(op: Callable, left: Any, right: Any, typecode: str) -> Optional[NumberList]:
+    """NumPy version of NumberList.apply, or None where it could differ from Python's result"""
+    if isinstance(left, array):
+        left = numpy.frombuffer(left, NUMPY_TYPES[left.typecode])
+    if isinstance(right, array):
+        right = numpy.frombuffer(right, NUMPY_TYPES[right.typecode])
+    left_bound, right_bound = integer_bound(left), integer_bound(right)
+    if op is divide:
+        # Python divides ints exactly before rounding; NumPy converts them to floats first
+        limit_exceeded = max(left_bound, right_bound) > EXACT_FLOAT_LIMIT
+    elif op is mul:
+        limit_exceeded = left_bound * right_bound >= INT64_LIMIT
+    else:
+        limit_exceeded = left_bound + right_bound >= INT64_LIMIT
+    if limit_exceeded:
+        return None
+    
+    with numpy.errstate(all='ignore'):
+        if op is divide:
+            result = numpy.zeros(numpy.broadcast(left, right).size)
+            numpy.divide(left, right, out=result, where=numpy.not_equal(right, 0))
+        else:
+            result = {add: numpy.add, sub: numpy.subtract, mul: numpy.multiply}[op](left, right)
+    return NumberList(array(typecode, result.astype(NUMPY_TYPES[typecode], copy=False).tobytes()))
+
+def sum_integers(items: array) -> int:
+    """Exact sum of an array('q'), through NumPy when it cannot overflow int64"""
+    if numpy is not None and len(items) >= NUMPY_MIN_LENGTH:
+        view = numpy.frombuffer(items, NUMPY_TYPES['q'])
+        if max(-int(view.min()), int(view.max())) * len(items) < INT64_LIMIT:
+            return int(view.sum())
+    return sum(items)
+
+# Values for each loops over item by item; anything else is a one-item list
+LIST_TYPES = (list, NumberList)
+
+def value_size(value: Any) -> int:
+    """Bytes a value takes up, including the items of a list
+    
+    Nested lists are walked on an explicit stack, and a list held in
+    several places counts once, as it takes up memory once.
+    """
+    if type(value) is not list:
+        return shallow_size(value)
+    size = 0
+    seen = {id(value)}
+    pending = [value]
+    while pending:
+        items = pending.pop()
+        size += sys.getsizeof(items)
+        for item in items:
+            if type(item) is not list:
+                size += shallow_size(item)
+            elif id(item) not in seen:
+                seen.add(id(item))
+                pending.append(item)
+    return size
+
+def shallow_size(value: Any) -> int:
+    """value_size() without the items of a plain list, in constant time"""
+    if type(value) is NumberList:
+        return sys.getsizeof(value.items)
+    return sys.getsizeof(value)
+
+# ============================================================================
+# INTERPRETER
+# ============================================================================
+
+def is_truthy(value: Any) -> bool:
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        return value != 0
+    if isinstance(value, str):
+        return value.lower() not in ['', 'false', 'no']
+    if isinstance(value, LIST_TYPES):
+        return len(value) > 0
+    return bool(value)
+
+def format_output(value: Any) -> str:
+    if isinstance(value, LIST_TYPES):
+        return ', '.join(str(item) for item in value)
+    return str(value)
+
+def logical_or(left: Any, right: Any) -> bool:
+    """S++ or/and: both operands are evaluated before testing truthiness"""
+    return is_truthy(left) or is_truthy(right)
+
+# Name and operation of every binary operator
+BINARY_OPERATIONS: Dict[TokenType, Tuple[str, Callable[[Any, Any], Any]]] = {
+    TokenType.PLUS: ('Add', add),
+    TokenType.MINUS: ('Subtract', sub),
+    TokenType.TIMES_OP: ('Multiply', mul),
+    TokenType.DIVIDED_BY: ('Divide', divide),
+    TokenType.EQUALS: ('Equals', eq),
+    TokenType.IS_GREATER_THAN: ('GreaterThan', gt),
+    TokenType.IS_LESS_THAN: ('LessThan', lt),
+    TokenType.OR: ('Or', logical_or),
+}
+
+def apply_binary_op(op_type: TokenType, left: Any, right: Any) -> Any:
+    operation = BINARY_OPERATIONS.get(op_type)
+    return operation[1](left, right) if operation else None
+
+def binary_kind(form: type, name: str, operation: Callable[[Any, Any], Any]) -> type:
+    kind = type(f'{name}{form.__name__}', (form,),
+                {'__slots__': (), '__module__': __name__, 'apply': staticmethod(operation)})
+    # Bound at module level like the other node classes, so pickle finds it
+    globals()[kind.__name__] = kind
+    return kind
+
+# One BinaryOp subclass per operand form and operator, e.g. AddVariableLiteralOp
+BINARY_KINDS: Dict[Tuple[type, TokenType], type] = {
+    (form, op_type): binary_kind(form, name, operation)
+    for form in (BinaryOp, VariableLiteralOp, LiteralVariableOp)
+    for op_type, (name, operation) in BINARY_OPERATIONS.items()
+}
+
+def specialize(node: BinaryOp):
+    """Turn node into the kind for its operator and the shapes of its operands"""
+    left, right = type(node.left), type(node.right)
+    if left is Variable and right is Literal:
+        form = VariableLiteralOp
+    elif left is Literal and right is Variable:
+        form = LiteralVariableOp
+    else:
+        form = BinaryOp
+    node.__class__ = BINARY_KINDS.get((form, node.op.type), BinaryOp)
+
+class ReturnValue(Exception):
+    def __init__(self, value):
+        self.value = value
+
+# Marks a frame slot the running function has not assigned yet
+UNSET = object()
+
+class Frame:
+    """Locals of one function call, stored by slot number
+    
+    Slots that are still UNSET fall back to whatever the caller could see,
+    which gives the same view as copying the caller's variables at the call.
+    """
+    __slots__ = ('function', 'values', 'parent', 'depth')
+    
+    def __init__(self, function: FunctionDef, parent: Optional['Frame']):
+        self.function = function
+        self.values = [UNSET] * len(function.locals)
+        self.parent = parent
+        self.depth = parent.depth + 1 if parent else 1
+    
+    def lookup(self, name: str, variables: Dict[str, Any]) -> Any:
+        """Find name in the calling frames, then in the global variables"""
+        frame = self.parent
+        while frame is not None:
+            slot = frame.function.locals.get(name)
+            if slot is not None and frame.values[slot] is not UNSET:
+                return frame.values[slot]
+            frame = frame.parent
+        return variables.get(name, UNSET)
+
+class Invariant(ASTNode):
+    """An expression whose inputs its enclosing loop never assigns
+    
+    The value is computed the first time the loop needs it and reused for
+    the rest of that run of the loop, so errors still surface exactly when
+    the expression is first reached. Values are kept by the Interpreter,
+    not the node, so several runs can share one tree.
+    """
+    def __init__(self, expr: ASTNode):
+        self.expr = expr
+
+class CountingLoop:
+    """A repeat-while loop that steps one variable by a fixed int
+    
+    Matches "repeat while i is less than N" ending in "set i to i plus S"
+    (or "is greater than" with "minus"), where nothing else in the body
+    assigns i, N contains no calls and the body assigns none of its names.
+    """
+    __slots__ = ('counter', 'limit', 'op_type', 'step', 'update', 'body')
+    
+    def __init__(self, counter: Variable, limit: ASTNode, op_type: TokenType, step: int,
+                 update: SetStatement, body: List[ASTNode]):
+        self.counter = counter
+        self.limit = limit
+        self.op_type = op_type
+        self.step = step
+        self.update = update  # The final "set i to ..." statement
+        self.body = body  # Every statement before it
+    
+    def values(self, start: Any, limit: Any) -> Optional[range]:
+        """The counter values the loop runs with, or None when the original
+        comparison has to decide (the counter is not an int, or the limit is
+        not a finite number)"""
+        if type(start) is not int or type(limit) not in (int, float) or not math.isfinite(limit):
+            return None
+        # For an int i, i < N exactly when i < ceil(N), and i > N when i > floor(N)
+        if self.op_type == TokenType.IS_LESS_THAN:
+            return range(start, math.ceil(limit), self.step)
+        return range(start, math.floor(limit), self.step)
+
+class Reduction:
+    """A for each loop whose body only folds its items into accumulators
+    
+    Each statement of the body is one of these, for the loop's item x and
+    an accumulator a that no other statement of the body assigns:
+    
+        set a to a plus x.                              (sum, also x plus a)
+        set a to a times x.                             (product)
+        set a to a plus 1.                              (count, any number literal)
+        if x is greater than a then set a to x. end.    (maximum, also a is less than x)
+        if x is less than a then set a to x. end.       (minimum, also a is greater than x)
+    
+    steps holds (kind, accumulator, update, amount) per statement, where
+    accumulator is the Variable node the loop first reads a through, update
+    the "set a to ..." statement and amount the literal a count adds.
+    """
+    __slots__ = ('steps',)
+    
+    def __init__(self, steps: List[Tuple[str, Variable, SetStatement, Any]]):
+        self.steps = steps
+    
+    @staticmethod
+    def result(kind: str, start: Any, items: array, amount: Any) -> Any:
+        """The accumulator's value after the loop ran over items, computed in bulk"""
+        if kind == 'sum':
+            if type(start) is int and items.typecode == 'q':
+                return start + sum_integers(items)
+            # Floats are added one by one, in loop order, so rounding matches
+            return reduce(add, items, start)
+        if kind == 'product':
+            return reduce(mul, items, start)
+        if kind == 'count':
+            if type(start) is int and type(amount) is int:
+                return start + amount * len(items)
+            return reduce(add, repeat(amount, len(items)), start)
+        # The loop only replaces a on a strictly greater (or smaller) item, and so
+        # do max() and min(): both keep the first of equal items
+        best = max(items) if kind == 'max' else min(items)
+        if (best > start) if kind == 'max' else (best < start):
+            return best
+        return start
+
+class LoopAnalyzer:
+    """Finds counting loops, reductions and loop-invariant expressions for the tree engine
+    
+    Loops are annotated rather than replaced, so the other engines and
+    passes see the same tree. Only loops without calls get invariants:
+    a call could re-enter the loop and overwrite the cached values.
+    """
+    
+    def analyze(self, statements: List[ASTNode]):
+        for stmt in statements:
+            if isinstance(stmt, RepeatWhileStatement):
+                self.analyze_loop(stmt, [stmt.condition])
+                stmt.counting = stmt.counting or self.counting_loop(stmt)
+            elif isinstance(stmt, RepeatTimesStatement):
+                self.analyze_loop(stmt, [])
+            elif isinstance(stmt, IfStatement):
+                self.analyze(stmt.then_body)
+                self.analyze(stmt.else_body or [])
+            elif isinstance(stmt, ForEachStatement):
+                stmt.reduction = stmt.reduction or self.reduction_loop(stmt)
+                self.analyze(stmt.body)
+            elif isinstance(stmt, FunctionDef):
+                self.analyze(stmt.body)
+    
+    def analyze_loop(self, node: ASTNode, conditions: List[ASTNode]):
+        if not node.loop_analyzed:
+            node.loop_analyzed = True
+            if not any(self.contains_call(expr) for expr in conditions) and not self.contains_call(node.body):
+                assigned = self.assigned_names(node.body)
+                if isinstance(node, RepeatWhileStatement):
+                    node.condition = self.hoist(node.condition, assigned, node.invariants)
+                self.hoist_block(node.body, assigned, node.invariants)
+        # Inner loops come after, so they skip what the outer loop already hoisted
+        self.analyze(node.body)
+    
+    def counting_loop(self, node: RepeatWhileStatement) -> Optional[CountingLoop]:
+        condition = node.condition
+        if not (isinstance(condition, BinaryOp) and isinstance(condition.left, Variable)
+                and condition.op.type in (TokenType.IS_LESS_THAN, TokenType.IS_GREATER_THAN)):
+            return None
+        name = condition.left.name
+        update = node.body[-1] if node.body else None
+        if not (isinstance(update, SetStatement) and update.var_name == name
+                and isinstance(update.value, BinaryOp) and isinstance(update.value.left, Variable)
+                and update.value.left.name == name and isinstance(update.value.right, Literal)
+                and type(update.value.right.value) is int
+                and update.value.op.type in (TokenType.PLUS, TokenType.MINUS)):
+            return None
+        step = update.value.right.value
+        if update.value.op.type == TokenType.MINUS:
+            step = -step
+        # The counter must move towards the limit
+        if step == 0 or (step > 0) != (condition.op.type == TokenType.IS_LESS_THAN):
+            return None
+        body = node.body[:-1]
+        if name in self.assigned_names(body) or self.contains_call(condition.right):
+            return None
+        if self.variable_names(condition.right) & self.assigned_names(node.body):
+            return None
+        return CountingLoop(condition.left, condition.right, condition.op.type, step, update, body)
+    
+    def reduction_loop(self, node: ForEachStatement) -> Optional[Reduction]:
+        steps = []
+        accumulators = {node.item_name}
+        for stmt in node.body:
+            step = self.reduction_step(stmt, node.item_name)
+            if step is None or step[2].var_name in accumulators:
+                return None
+            accumulators.add(step[2].var_name)
+            steps.append(step)
+        return Reduction(steps) if steps else None
+    
+    def reduction_step(self, stmt: ASTNode, item: str) -> Optional[tuple]:
+        """(kind, accumulator, update, amount) when stmt is a Reduction step"""
+        def is_variable(node: ASTNode, name: str) -> bool:
+            return isinstance(node, Variable) and node.name == name
+        
+        if isinstance(stmt, SetStatement) and isinstance(stmt.value, BinaryOp):
+            name, value = stmt.var_name, stmt.value
+            if is_variable(value.left, name):
+                accumulator, other = value.left, value.right
+            elif is_variable(value.right, name):
+                accumulator, other = value.right, value.left
+            else:
+                return None
+            if is_variable(other, item):
+                if value.op.type == TokenType.PLUS:
+                    return 'sum', accumulator, stmt, None
+                if value.op.type == TokenType.TIMES_OP:
+                    return 'product', accumulator, stmt, None
+            elif (isinstance(other, Literal) and type(other.value) in (int, float)
+                    and value.op.type == TokenType.PLUS):
+                return 'count', accumulator, stmt, other.value
+            return None
+        
+        if not (isinstance(stmt, IfStatement) and not stmt.else_body and len(stmt.then_body) == 1):
+            return None
+        update, condition = stmt.then_body[0], stmt.condition
+        if not (isinstance(update, SetStatement) and is_variable(update.value, item)
+                and isinstance(condition, BinaryOp)
+                and condition.op.type in (TokenType.IS_GREATER_THAN, TokenType.IS_LESS_THAN)):
+            return None
+        name = update.var_name
+        greater = condition.op.type == TokenType.IS_GREATER_THAN
+        if is_variable(condition.left, item) and is_variable(condition.right, name):
+            return ('max' if greater else 'min'), condition.right, update, None
+        if is_variable(condition.left, name) and is_variable(condition.right, item):
+            return ('min' if greater else 'max'), condition.left, update, None
+        return None
+    
+    def assigned_names(self, statements: List[ASTNode]) -> Set[str]:
+        """Names the statements assign, not counting nested function bodies"""
+        names = set()
+        for stmt in statements:
+            if isinstance(stmt, (SetStatement, AskStatement)):
+                names.add(stmt.var_name)
+            elif isinstance(stmt, ForEachStatement):
+                names.add(stmt.item_name)
+                names |= self.assigned_names(stmt.body)
+            elif isinstance(stmt, IfStatement):
+                names |= self.assigned_names(stmt.then_body) | self.assigned_names(stmt.else_body or [])
+            elif isinstance(stmt, (RepeatWhileStatement, RepeatTimesStatement)):
+                names |= self.assigned_names(stmt.body)
+        return names
+    
+    def contains_call(self, node: Any) -> bool:
+        if isinstance(node, list):
+            return any(self.contains_call(item) for item in node)
+        if isinstance(node, FunctionCall):
+            return True
+        if isinstance(node, ASTNode) and not isinstance(node, FunctionDef):
+            return any(self.contains_call(value) for value in node_values(node))
+        return False
+    
+    def variable_names(self, node: Any) -> Set[str]:
+        if isinstance(node, Variable):
+            return {node.name}
+        if isinstance(node, BinaryOp):
+            return self.variable_names(node.left) | self.variable_names(node.right)
+        if isinstance(node, (UnaryOp, Invariant)):
+            return self.variable_names(node.expr)
+        if isinstance(node, ListLiteral):
+            return set().union(*map(self.variable_names, node.items))
+        return set()
+    
+    def hoist_block(self, statements: List[ASTNode], assigned: Set[str], invariants: List[Invariant]):
+        for stmt in statements:
+            if isinstance(stmt, SetStatement):
+                stmt.value = self.hoist(stmt.value, assigned, invariants)
+            elif isinstance(stmt, PrintStatement):
+                stmt.expression = self.hoist(stmt.expression, assigned, invariants)
+            elif isinstance(stmt, ReturnStatement) and stmt.value:
+                stmt.value = self.hoist(stmt.value, assigned, invariants)
+            elif isinstance(stmt, IfStatement):
+                stmt.condition = self.hoist(stmt.condition, assigned, invariants)
+                self.hoist_block(stmt.then_body, assigned, invariants)
+                self.hoist_block(stmt.else_body or [], assigned, invariants)
+            elif isinstance(stmt, RepeatWhileStatement):
+                stmt.condition = self.hoist(stmt.condition, assigned, invariants)
+                self.hoist_block(stmt.body, assigned, invariants)
+            elif isinstance(stmt, RepeatTimesStatement):
+                stmt.count = self.hoist(stmt.count, assigned, invariants)
+                self.hoist_block(stmt.body, assigned, invariants)
+            elif isinstance(stmt, ForEachStatement):
+                stmt.list_expr = self.hoist(stmt.list_expr, assigned, invariants)
+                self.hoist_block(stmt.body, assigned, invariants)
+    
+    def hoist(self, node: ASTNode, assigned: Set[str], invariants: List[Invariant]) -> ASTNode:
+        """Wrap the largest invariant operator expressions inside node"""
+        if isinstance(node, (BinaryOp, UnaryOp)):
+            names = self.variable_names(node)
+            if names and not names & assigned:
+                invariant = Invariant(node)
+                invariants.append(invariant)
+                return invariant
+            if isinstance(node, BinaryOp):
+                node.left = self.hoist(node.left, assigned, invariants)
+                node.right = self.hoist(node.right, assigned, invariants)
+            else:
+                node.expr = self.hoist(node.expr, assigned, invariants)
+        return node
+
+class Resolver:
+    """Prepares an AST for the Interpreter
+    
+    Every variable name used in a function body gets a numbered slot, with
+    the parameters first, in order. Top-level statements keep slot None and
+    use the global variable dict. Nested function bodies get their own slots.
+    Every node is also flagged with whether it contains a function call,
+    which decides how the Interpreter runs it, and every BinaryOp becomes
+    the specialized kind for its operator and operands.
+    
+    Each FunctionDef also records what memoization needs: whether it has
+    effects, the names it calls and the names it may read before surely
+    assigning them (which may come from the caller).
+    """
+    
+    def __init__(self):
+        self.locals: Optional[Dict[str, int]] = None
+        self.function: Optional[FunctionDef] = None
+        self.assigned: Set[str] = set()  # Names surely set at this point of the body
+    
+    def slot(self, name: str) -> Optional[int]:
+        if self.locals is None:
+            return None
+        return self.locals.setdefault(name, len(self.locals))
+    
+    def resolve(self, node: ASTNode) -> bool:
+        method = getattr(self, f'resolve_{node.kind}', None)
+        node.has_call = bool(method(node)) if method else False
+        return node.has_call
+    
+    def resolve_body(self, body: Optional[List[ASTNode]]) -> bool:
+        # Every statement is resolved, so no short-circuiting any()
+        return True in [self.resolve(stmt) for stmt in body or []]
+    
+    def resolve_Program(self, node: Program) -> bool:
+        return self.resolve_body(node.statements)
+    
+    def resolve_SetStatement(self, node: SetStatement) -> bool:
+        node.slot = self.slot(node.var_name)
+        has_call = self.resolve(node.value)
+        self.assigned.add(node.var_name)
+        return has_call
+    
+    def resolve_PrintStatement(self, node: PrintStatement) -> bool:
+        self.mark_effects()
+        return self.resolve(node.expression)
+    
+    def resolve_AskStatement(self, node: AskStatement) -> bool:
+        self.mark_effects()
+        node.slot = self.slot(node.var_name)
+        self.assigned.add(node.var_name)
+        return False
+    
+    def mark_effects(self):
+        if self.function:
+            self.function.has_effects = True
+    
+    def resolve_branch(self, body: Optional[List[ASTNode]]) -> Tuple[bool, Set[str]]:
+        """Resolve a body that may not run, returning what it surely assigns"""
+        before = self.assigned
+        self.assigned = set(before)
+        has_call = self.resolve_body(body)
+        assigned, self.assigned = self.assigned, before
+        return has_call, assigned
+    
+    def resolve_IfStatement(self, node: IfStatement) -> bool:
+        condition_call = self.resolve(node.condition)
+        then_call, then_assigned = self.resolve_branch(node.then_body)
+        else_call, else_assigned = self.resolve_branch(node.else_body)
+        self.assigned = then_assigned & else_assigned
+        return True in [condition_call, then_call, else_call]
+    
+    def resolve_RepeatWhileStatement(self, node: RepeatWhileStatement) -> bool:
+        return True in [self.resolve(node.condition), self.resolve_branch(node.body)[0]]
+    
+    def resolve_RepeatTimesStatement(self, node: RepeatTimesStatement) -> bool:
+        return True in [self.resolve(node.count), self.resolve_branch(node.body)[0]]
+    
+    def resolve_ForEachStatement(self, node: ForEachStatement) -> bool:
+        node.slot = self.slot(node.item_name)
+        list_call = self.resolve(node.list_expr)
+        before = self.assigned
+        self.assigned = before | {node.item_name}
+        body_call = self.resolve_body(node.body)
+        self.assigned = before
+        return list_call or body_call
+    
+    def resolve_FunctionDef(self, node: FunctionDef) -> bool:
+        # Defining a function calls nothing, whatever its body does
+        self.mark_effects()
+        outer = self.locals, self.function, self.assigned
+        self.locals, self.function, self.assigned = {}, node, set(node.params)
+        node.has_effects = False
+        node.callees, node.free_names = set(), set()
+        node.param_slots = [self.slot(param) for param in node.params]
+        self.resolve_body(node.body)
+        node.locals = self.locals
+        self.locals, self.function, self.assigned = outer
+        return False
+    
+    def resolve_FunctionCall(self, node: FunctionCall) -> bool:
+        if self.function:
+            self.function.callees.add(node.name)
+        self.resolve_body(node.args)
+        return True
+    
+    def resolve_ReturnStatement(self, node: ReturnStatement) -> bool:
+        return bool(node.value) and self.resolve(node.value)
+    
+    def resolve_BinaryOp(self, node: BinaryOp) -> bool:
+        has_call = True in [self.resolve(node.left), self.resolve(node.right)]
+        specialize(node)
+        return has_call
+    
+    def resolve_UnaryOp(self, node: UnaryOp) -> bool:
+        return self.resolve(node.expr)
+    
+    def resolve_Invariant(self, node: Invariant) -> bool:
+        return self.resolve(node.expr)
+    
+    def resolve_Variable(self, node: Variable) -> bool:
+        if self.function and node.name not in self.assigned:
+            self.function.free_names.add(node.name)
+        node.slot = self.slot(node.name)
+        return False
+    
+    def resolve_ListLiteral(self, node: ListLiteral) -> bool:
+        return self.resolve_body(node.items)
+
+# Calls deeper than this raise an error; None means only memory limits depth
+DEFAULT_MAX_CALL_DEPTH = 100000
+
+# Results kept per pure function before the least recently used is evicted
+DEFAULT_MEMO_SIZE = 256
+
+# Bytes of list items a loop or call re-measures per check, on average
+MEMORY_CHECK_BYTES = 1024
+
+class MemoCache:
+    """Least-recently-used cache of one pure function's results
+    
+    Keys are the argument values followed by the caller-visible values of
+    free_names, the names the function (or anything it calls) reads without
+    binding them as parameters.
+    """
+    def __init__(self, size: int, free_names: Tuple[str, ...]):
+        self.size = size
+        self.free_names = free_names
+        self.entries: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get(self, key: tuple) -> Any:
+        if key in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return self.entries[key]
+        self.misses += 1
+        return UNSET
+    
+    def put(self, key: tuple, value: Any):
+        self.entries[key] = value
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+class ReturnSignal:
+    """Result of a return statement, passed up through the enclosing blocks"""
+    __slots__ = ('value',)
+    
+    def __init__(self, value: Any):
+        self.value = value
+
+class Interpreter:
+    """Walks the AST, keeping S++ calls off the Python stack
+    
+    Nodes without calls are evaluated by plain recursive visit_* methods,
+    bounded by how deeply the source nests. Nodes that contain a call run
+    as step_* generators on an explicit stack: a generator yields a child
+    node to have it evaluated and receives the child's value back, so a
+    call pushes a generator instead of recursing. Returns travel back as
+    ReturnSignal values rather than exceptions.
+    """
+    # Subclasses that watch a call's arguments or statements as they are
+    # requested set this, so calls yield every one of them
+    step_every_child = False
+    
+    def __init__(self, max_call_depth: Optional[int] = DEFAULT_MAX_CALL_DEPTH,
+                 memo_size: Optional[int] = DEFAULT_MEMO_SIZE, optimize: bool = True,
+                 output: Optional[OutputBuffer] = None, input_source: Any = None,
+                 max_steps: Optional[int] = None, max_memory: Optional[int] = None):
+        self.variables = {}
+        # Unbuffered unless the caller decides otherwise, like the builtin print
+        self.output = output or OutputBuffer(flush_every=1)
+        self.input_source = input_source or PromptInput(self.output)
+        self.functions = {}
+        self.frame: Optional[Frame] = None  # None while running top-level code
+        self.max_call_depth = max_call_depth
+        # None or 0 turns memoization off
+        self.memo_size = memo_size
+        self.memo: Dict[FunctionDef, Optional[MemoCache]] = {}
+        # Run counting loops natively, reductions in bulk and cache loop invariants
+        self.optimize = optimize
+        self.invariant_values: Dict[Invariant, Any] = {}
+        self.statement: Optional[ASTNode] = None  # The top-level statement running
+        # Every loop iteration and call takes one step off countdown and only
+        # calls check_budget once it goes negative: at once with a memory
+        # limit, when the steps run out with just a step limit, and never
+        # (in practice) without either
+        self.max_steps = max_steps
+        self.max_memory = max_memory
+        self.steps_taken = 0
+        self.countdown = 0 if max_memory is not None else max_steps if max_steps is not None else sys.maxsize
+        self.checkpoint = self.countdown
+        self.loop_writes: Dict[ASTNode, Tuple[str, ...]] = {}
+        # Per loop or call: checks left before list items are measured
+        # again, and the size without them at the last measurement
+        self.memory_checks: Dict[ASTNode, Tuple[int, int]] = {}
+    
+    def visit(self, node: ASTNode) -> Any:
+        return getattr(self, node.visit_name, self.visit_generic)(node)
+    
+    def visit_generic(self, node):
+        raise Exception(f'No {node.visit_name} method')
+    
+    def run(self, node: ASTNode) -> Any:
+        """Evaluate a node containing calls on an explicit stack of generators"""
+        frame = self.frame
+        steps, visit = self.steps, self.visit
+        stack = [steps(node)]
+        value = None
+        try:
+            while True:
+                try:
+                    request = stack[-1].send(value)
+                except StopIteration as done:
+                    stack.pop()
+                    if not stack:
+                        return done.value
+                    value = done.value
+                    continue
+                if request.has_call:
+                    stack.append(steps(request))
+                    value = None
+                else:
+                    value = visit(request)
+        finally:
+            # Only differs from the current frame when an error aborted calls
+            self.frame = frame
+    
+    def steps(self, node: ASTNode):
+        return getattr(self, node.step_name)(node)
+    
+    # step_* methods evaluate call-free children in place: sending them
+    # through run() costs a generator round trip and gives the same value
+    
+    def visit_Program(self, node: Program) -> Any:
+        self.prepare(node, self.optimize)
+        return self.run_prepared(node)
+    
+    @staticmethod
+    def prepare(node: Program, optimize: bool = True):
+        """Annotate loops (when optimizing) and resolve slots, once per program"""
+        if optimize:
+            LoopAnalyzer().analyze(node.statements)
+        Resolver().resolve(node)
+    
+    def run_prepared(self, node: Program) -> Any:
+        result = None
+        for stmt in node.statements:
+            self.statement = stmt
+            result = self.run(stmt) if stmt.has_call else self.visit(stmt)
+            if type(result) is ReturnSignal:
+                # A return outside any function ends the program as an error
+                raise ReturnValue(result.value)
+        return result
+    
+    def visit_block(self, body: List[ASTNode]) -> Optional[ReturnSignal]:
+        for stmt in body:
+            result = self.visit(stmt)
+            if type(result) is ReturnSignal:
+                return result
+        return None
+    
+    def visit_SetStatement(self, node: SetStatement) -> Any:
+        value = self.visit(node.value)
+        self.assign(node.var_name, node.slot, value)
+        return value
+    
+    def step_SetStatement(self, node: SetStatement):
+        value = yield node.value
+        self.assign(node.var_name, node.slot, value)
+        return value
+    
+    def visit_PrintStatement(self, node: PrintStatement) -> Any:
+        value = self.visit(node.expression)
+        self.output.write_line(self.format_output(value))
+        return value
+    
+    def step_PrintStatement(self, node: PrintStatement):
+        value = yield node.expression
+        self.output.write_line(self.format_output(value))
+        return value
+    
+    def visit_AskStatement(self, node: AskStatement) -> Any:
+        value = self.input_source.ask(node.prompt + " ")
+        self.assign(node.var_name, node.slot, value)
+        return value
+    
+    def visit_IfStatement(self, node: IfStatement) -> Any:
+        condition = self.visit(node.condition)
+        if self.is_truthy(condition):
+            return self.visit_block(node.then_body)
+        elif node.else_body:
+            return self.visit_block(node.else_body)
+    
+    def step_IfStatement(self, node: IfStatement):
+        condition = (yield node.condition) if node.condition.has_call else self.visit(node.condition)
+        body = node.then_body if self.is_truthy(condition) else node.else_body or []
+        for stmt in body:
+            result = yield stmt
+            if type(result) is ReturnSignal:
+                return result
+    
+    def forget_invariants(self, node: ASTNode):
+        """Drop the loop's invariant values, which hold for one run of the loop only"""
+        for invariant in node.invariants:
+            self.invariant_values.pop(invariant, None)
+    
+    def visit_RepeatWhileStatement(self, node: RepeatWhileStatement) -> Any:
+        self.forget_invariants(node)
+        loop = node.counting
+        if loop:
+            # Same operand order as the first evaluation of the condition
+            start = self.visit(loop.counter)
+            values = loop.values(start, self.visit(loop.limit))
+            if values is not None:
+                name, slot = loop.update.var_name, loop.update.slot
+                for value in values:
+                    self.countdown -= 1
+                    if self.countdown < 0:
+                        self.check_budget(node)
+                    self.assign(name, slot, value)
+                    result = self.visit_block(loop.body)
+                    if result:
+                        return result
+                self.assign(name, slot, start + len(values) * loop.step)
+                return None
+        
+        while self.is_truthy(self.visit(node.condition)):
+            self.countdown -= 1
+            if self.countdown < 0:
+                self.check_budget(node)
+            result = self.visit_block(node.body)
+            if result:
+                return result
+    
+    def step_RepeatWhileStatement(self, node: RepeatWhileStatement):
+        self.forget_invariants(node)
+        loop = node.counting
+        if loop:
+            start = (yield loop.counter) if loop.counter.has_call else self.visit(loop.counter)
+            values = loop.values(start, (yield loop.limit) if loop.limit.has_call else self.visit(loop.limit))
+            if values is not None:
+                name, slot = loop.update.var_name, loop.update.slot
+                for value in values:
+                    self.countdown -= 1
+                    if self.countdown < 0:
+                        self.check_budget(node)
+                    self.assign(name, slot, value)
+                    for stmt in loop.body:
+                        result = yield stmt
+                        if type(result) is ReturnSignal:
+                            return result
+                self.assign(name, slot, start + len(values) * loop.step)
+                return None
+        
+        condition = node.condition
+        while self.is_truthy((yield condition) if condition.has_call else self.visit(condition)):
+            self.countdown -= 1
+            if self.countdown < 0:
+                self.check_budget(node)
+            for stmt in node.body:
+                result = yield stmt
+                if type(result) is ReturnSignal:
+                    return result
+    
+    def visit_RepeatTimesStatement(self, node: RepeatTimesStatement) -> Any:
+        self.forget_invariants(node)
+        count = int(self.visit(node.count))
+        for _ in range(count):
+            self.countdown -= 1
+            if self.countdown < 0:
+                self.check_budget(node)
+            result = self.visit_block(node.body)
+            if result:
+                return result
+    
+    def step_RepeatTimesStatement(self, node: RepeatTimesStatement):
+        self.forget_invariants(node)
+        count = int((yield node.count) if node.count.has_call else self.visit(node.count))
+        for _ in range(count):
+            self.countdown -= 1
+            if self.countdown < 0:
+                self.check_budget(node)
+            for stmt in node.body:
+                result = yield stmt
+                if type(result) is ReturnSignal:
+                    return result
+    
+    def visit_ForEachStatement(self, node: ForEachStatement) -> Any:
+        items = self.visit(node.list_expr)
+        if node.reduction and self.run_reduction(node, items):
+            return None
+        if not isinstance(items, LIST_TYPES):
+            items = [items]
+        
+        for item in items:
+            self.countdown -= 1
+            if self.countdown < 0:
+                self.check_budget(node)
+            self.assign(node.item_name, node.slot, item)
+            result = self.visit_block(node.body)
+            if result:
+                return result
+    
+    def step_ForEachStatement(self, node: ForEachStatement):
+        items = (yield node.list_expr) if node.list_expr.has_call else self.visit(node.list_expr)
+        if node.reduction and self.run_reduction(node, items):
+            return None
+        if not isinstance(items, LIST_TYPES):
+            items = [items]
+        
+        for item in items:
+            self.countdown -= 1
+            if self.countdown < 0:
+                self.check_budget(node)
+            self.assign(node.item_name, node.slot, item)
+            for stmt in node.body:
+                result = yield stmt
+                if type(result) is ReturnSignal:
+                    return result
+    
+    def run_reduction(self, node: ForEachStatement, items: Any) -> bool:
+        """Run a Reduction loop in bulk, leaving the variables as the loop would
+        
+        Returns False, having changed nothing, when the loop has to run
+        instead: the items are not a non-empty NumberList, an accumulator
+        does not start as a number, or a maximum or minimum meets a NaN.
+        """
+        if type(items) is not NumberList or not items.items:
+            return False
+        items = items.items
+        steps = node.reduction.steps
+        starts = []
+        # Read in loop order, so an undefined accumulator fails as the loop would
+        for _, accumulator, _, _ in steps:
+            start = self.visit(accumulator)
+            if type(start) not in (int, float):
+                return False
+            starts.append(start)
+        if items.typecode == 'd' and any(kind in ('max', 'min') for kind, _, _, _ in steps):
+            if any(map(math.isnan, items)):
+                return False
+        # Every iteration the loop skips still counts as a step
+        self.countdown -= len(items)
+        if self.countdown < 0:
+            self.check_budget(node)
+        for (kind, _, update, amount), start in zip(steps, starts):
+            self.assign(update.var_name, update.slot, Reduction.result(kind, start, items, amount))
+        self.assign(node.item_name, node.slot, items[-1])
+        return True
+    
+    def check_budget(self, node: ASTNode, written: Optional[Iterable[Tuple[str, Any]]] = None):
+        """Enforce max_steps and max_memory at a loop iteration or a call
+        
+        The memory limit applies to each variable the loop assigns, or to
+        each parameter of the call, as value_size() measures it.
+        """
+        self.steps_taken += self.checkpoint - self.countdown
+        if isinstance(node, FunctionCall):
+            where = f"in call to '{node.name}' (defined on line {self.functions[node.name].line})"
+        else:
+            where = f"in the loop on line {node.line}"
+        if self.max_steps is not None and self.steps_taken > self.max_steps:
+            raise Exception(f"Step limit of {self.max_steps} exceeded {where}")
+        if self.max_memory is not None:
+            self.check_memory(node, list(self.written_by_loop(node) if written is None else written), where)
+            self.countdown = 0
+        else:
+            self.countdown = self.max_steps - self.steps_taken
+        self.checkpoint = self.countdown
+    
+    def check_memory(self, node: ASTNode, written: List[Tuple[str, Any]], where: str):
+        """Enforce max_memory on the values a loop or call writes
+        
+        Strings, numbers and list lengths are measured at every check.
+        Measuring the items of lists takes time in proportion to their
+        number, so a node measures them again only after a check for every
+        MEMORY_CHECK_BYTES it last measured, or once the rest has doubled.
+        A loop building a longer list each iteration then stays linear.
+        """
+        sizes = [shallow_size(value) for _, value in written]
+        total = sum(sizes)
+        skip, last = self.memory_checks.get(node, (0, 0))
+        if skip and total <= 2 * last:
+            self.memory_checks[node] = (skip - 1, last)
+        else:
+            sizes = [value_size(value) for _, value in written]
+            self.memory_checks[node] = (sum(sizes) // MEMORY_CHECK_BYTES, total)
+        for (name, value), size in zip(written, sizes):
+            if size > self.max_memory:
+                raise Exception(f"Memory limit of {self.max_memory} bytes exceeded {where}: "
+                                f"'{name}' holds {value_size(value)} bytes")
+    
+    def written_by_loop(self, node: ASTNode):
+        """The current value of every variable the loop assigns"""
+        names = self.loop_writes.get(node)
+        if names is None:
+            names = self.loop_writes[node] = tuple(sorted(LoopAnalyzer().assigned_names([node])))
+        slots = self.frame.function.locals if self.frame else {}
+        for name in names:
+            slot = slots.get(name)
+            value = self.variables.get(name, UNSET) if slot is None else self.frame.values[slot]
+            if value is not UNSET:
+                yield name, value
+    
+    def visit_FunctionDef(self, node: FunctionDef) -> Any:
+        if self.functions.get(node.name) is not node:
+            # Purity depends on what every called name refers to
+            self.memo.clear()
+        self.functions[node.name] = node
+    
+    def memo_cache(self, func_def: FunctionDef) -> Optional[MemoCache]:
+        """The result cache of a pure function, or None when it is not pure
+        
+        A function is pure when neither it nor any function it can reach
+        prints, asks or defines a function. Assignments never leave a call,
+        so they do not count.
+        """
+        if func_def in self.memo:
+            return self.memo[func_def]
+        
+        cache = None
+        if self.memo_size:
+            reached = {func_def}
+            pending = [func_def]
+            free_names = set()
+            while pending:
+                function = pending.pop()
+                if function.has_effects:
+                    break
+                free_names |= function.free_names
+                if function is not func_def:
+                    # A call may leave parameters unbound, so they are read too
+                    free_names.update(function.params)
+                callees = [self.functions.get(name) for name in function.callees]
+                if None in callees:
+                    break
+                for callee in callees:
+                    if callee not in reached:
+                        reached.add(callee)
+                        pending.append(callee)
+            else:
+                cache = MemoCache(self.memo_size, tuple(sorted(free_names)))
+        
+        self.memo[func_def] = cache
+        return cache
+    
+    def memo_key(self, func_def: FunctionDef, cache: MemoCache, args: list) -> Optional[tuple]:
+        # Parameters left without an argument read the caller's variable
+        unbound = func_def.params[len(args):]
+        values = args + [self.visible(name) for name in (*unbound, *cache.free_names)]
+        # Types are part of the key so 2 and 2.0 (or 1 and True) stay apart
+        key = (*values, *map(type, values))
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+    
+    def visible(self, name: str) -> Any:
+        """Value of name as the running code sees it, or UNSET"""
+        frame = self.frame
+        if frame is None:
+            return self.variables.get(name, UNSET)
+        slot = frame.function.locals.get(name)
+        if slot is not None and frame.values[slot] is not UNSET:
+            return frame.values[slot]
+        return frame.lookup(name, self.variables)
+    
+    def memo_stats(self) -> Dict[str, Dict[str, int]]:
+        """Hit, miss and eviction counts per memoized function name"""
+        stats: Dict[str, Dict[str, int]] = {}
+        for function, cache in self.memo.items():
+            if cache:
+                stats[function.name] = {'hits': cache.hits, 'misses': cache.misses,
+                                        'evictions': cache.evictions, 'entries': len(cache.entries)}
+        return stats
+    
+    def visit_FunctionCall(self, node: FunctionCall) -> Any:
+        return self.run(node)
+    
+    def step_FunctionCall(self, node: FunctionCall):
+        if node.name not in self.functions:
+            raise Exception(f"Function '{node.name}' not defined")
+        
+        func_def = self.functions[node.name]
+        in_place = not self.step_every_child
+        args = []
+        for arg in node.args:
+            args.append(self.visit(arg) if in_place and not arg.has_call else (yield arg))
+        
+        cache = self.memo_cache(func_def)
+        key = self.memo_key(func_def, cache, args) if cache else None
+        if key is not None:
+            result = cache.get(key)
+            if result is not UNSET:
+                return result
+        
+        # Create local scope; the caller's variables stay visible through it
+        frame = Frame(func_def, self.frame)
+        if self.max_call_depth is not None and frame.depth > self.max_call_depth:
+            raise Exception(f"Maximum call depth of {self.max_call_depth} exceeded "
+                            f"in call to '{node.name}'")
+        
+        self.countdown -= 1
+        if self.countdown < 0:
+            self.check_budget(node, zip(func_def.params, args))
+        
+        # Bind parameters
+        for slot, arg in zip(func_def.param_slots, args):
+            frame.values[slot] = arg
+        
+        # Execute function body
+        result = None
+        self.frame = frame
+        for stmt in func_def.body:
+            value = self.visit(stmt) if in_place and not stmt.has_call else (yield stmt)
+            if type(value) is ReturnSignal:
+                result = value.value
+                break
+        
+        # Restore scope
+        self.frame = frame.parent
+        if key is not None:
+            cache.put(key, result)
+        return result
+    
+    def visit_ReturnStatement(self, node: ReturnStatement) -> Any:
+        value = self.visit(node.value) if node.value else None
+        return ReturnSignal(value)
+    
+    def step_ReturnStatement(self, node: ReturnStatement):
+        return ReturnSignal((yield node.value))
+    
+    def visit_BinaryOp(self, node: BinaryOp) -> Any:
+        left = self.visit(node.left)
+        return node.apply(left, self.visit(node.right))
+    
+    def visit_VariableLiteralOp(self, node: VariableLiteralOp) -> Any:
+        return node.apply(self.visit_Variable(node.left), node.right.value)
+    
+    def visit_LiteralVariableOp(self, node: LiteralVariableOp) -> Any:
+        return node.apply(node.left.value, self.visit_Variable(node.right))
+    
+    def step_BinaryOp(self, node: BinaryOp):
+        left = (yield node.left) if node.left.has_call else self.visit(node.left)
+        right = (yield node.right) if node.right.has_call else self.visit(node.right)
+        return node.apply(left, right)
+    
+    def visit_UnaryOp(self, node: UnaryOp) -> Any:
+        expr = self.visit(node.expr)
+        
+        if node.op.type == TokenType.NOT:
+            return not self.is_truthy(expr)
+    
+    def step_UnaryOp(self, node: UnaryOp):
+        expr = (yield node.expr) if node.expr.has_call else self.visit(node.expr)
+        
+        if node.op.type == TokenType.NOT:
+            return not self.is_truthy(expr)
+    
+    def visit_Literal(self, node: Literal) -> Any:
+        return node.value
+    
+    def visit_Invariant(self, node: Invariant) -> Any:
+        value = self.invariant_values.get(node, UNSET)
+        if value is UNSET:
+            value = self.invariant_values[node] = self.visit(node.expr)
+        return value
+    
+    def visit_Variable(self, node: Variable) -> Any:
+        if node.slot is None:
+            value = self.variables.get(node.name, UNSET)
+        else:
+            value = self.frame.values[node.slot]
+            if value is UNSET:
+                # The caller's view cannot change during this call, so the
+                # value is kept in the slot and deeper calls stop here too
+                value = self.frame.lookup(node.name, self.variables)
+                if value is not UNSET:
+                    self.frame.values[node.slot] = value
+        if value is UNSET:
+            # If this is a print context and variable is undefined, treat as literal
+            if node.is_literal_if_undefined:
+                return node.name
+            raise Exception(f"Variable '{node.name}' not defined")
+        return value
+    
+    def assign(self, name: str, slot: Optional[int], value: Any):
+        if slot is None:
+            self.variables[name] = value
+        else:
+            self.frame.values[slot] = value
+    
+    def visit_ListLiteral(self, node: ListLiteral) -> Any:
+        return make_list([self.visit(item) for item in node.items])
+    
+    def step_ListLiteral(self, node: ListLiteral):
+        items = []
+        for item in node.items:
+            items.append((yield item) if item.has_call else self.visit(item))
+        return make_list(items)
+    
+    def is_truthy(self, value: Any) -> bool:
+        return is_truthy(value)
+    
+    def format_output(self, value: Any) -> str:
+        return format_output(value)
+
+# ============================================================================
+# PROFILER
+# ============================================================================
+
+class Profiler:
+    """Execution counts and times per source line and per S++ function
+    
+    Cumulative time covers everything a line or function ran, including
+    nested statements and calls. Self time leaves out nested statements
+    (for lines) or nested calls (for functions). As in cProfile, a line or
+    function that is already running when it starts again adds its time
+    to the cumulative total only once.
+    """
+    ROOT = '<program>'
+    ROWS = 20
+    
+    def __init__(self):
+        # Per line or function name: [count, cumulative time, self time]
+        self.lines: Dict[int, List] = {}
+        self.functions: Dict[str, List] = {}
+        # Running entries: [line or name, start time, time spent nested]
+        self.open_lines: List[list] = []
+        self.open_calls: List[list] = []
+        self.active_lines: Dict[int, int] = {}
+        self.active_calls: Dict[str, int] = {}
+        # Self time per call stack, for flame graphs
+        self.stacks: Dict[Tuple[str, ...], float] = {}
+        self.started = 0.0
+        self.elapsed = 0.0
+        self.top_level_calls = 0.0
+    
+    def start(self):
+        self.started = time.perf_counter()
+    
+    def stop(self):
+        """Close whatever an error left running and record the program's own time"""
+        while self.open_calls:
+            self.exit_function()
+        while self.open_lines:
+            self.exit_line()
+        self.elapsed = time.perf_counter() - self.started
+        self.stacks[(self.ROOT,)] = self.elapsed - self.top_level_calls
+    
+    def enter_line(self, line: int):
+        self.active_lines[line] = self.active_lines.get(line, 0) + 1
+        self.open_lines.append([line, time.perf_counter(), 0.0])
+    
+    def exit_line(self):
+        self.close(self.open_lines, self.active_lines, self.lines)
+    
+    def enter_function(self, name: str):
+        self.active_calls[name] = self.active_calls.get(name, 0) + 1
+        self.open_calls.append([name, time.perf_counter(), 0.0])
+    
+    def exit_function(self):
+        name, elapsed, self_time = self.close(self.open_calls, self.active_calls, self.functions)
+        stack = (self.ROOT, *(entry[0] for entry in self.open_calls), name)
+        self.stacks[stack] = self.stacks.get(stack, 0.0) + self_time
+        if not self.open_calls:
+            self.top_level_calls += elapsed
+    
+    def close(self, open_entries: List[list], active: Dict[Any, int], stats: Dict[Any, List]) -> tuple:
+        key, start, nested = open_entries.pop()
+        elapsed = time.perf_counter() - start
+        entry = stats.get(key)
+        if entry is None:
+            entry = stats[key] = [0, 0.0, 0.0]
+        entry[0] += 1
+        entry[2] += elapsed - nested
+        active[key] -= 1
+        if not active[key]:
+            entry[1] += elapsed
+        if open_entries:
+            open_entries[-1][2] += elapsed
+        return key, elapsed, elapsed - nested
+    
+    def report(self, source: str, file: Any = None):
+        """Print the hottest lines and every function, by self time"""
+        file = file or sys.stderr
+        source_lines = source.splitlines()
+        print(f"profile: {self.elapsed:.3f}s total", file=file)
+        print(f"{'line':>6} {'count':>10} {'cumulative':>11} {'self':>9}  source", file=file)
+        for line, (count, cumulative, self_time) in self.hottest(self.lines)[:self.ROWS]:
+            text = source_lines[line - 1].strip() if line <= len(source_lines) else ''
+            print(f"{line:>6} {count:>10} {cumulative:>10.3f}s {self_time:>8.3f}s  {text}", file=file)
+        if self.functions:
+            print(f"{'function':<20} {'calls':>10} {'cumulative':>11} {'self':>9}", file=file)
+            for name, (count, cumulative, self_time) in self.hottest(self.functions):
+                print(f"{name:<20} {count:>10} {cumulative:>10.3f}s {self_time:>8.3f}s", file=file)
+    
+    @staticmethod
+    def hottest(stats: Dict[Any, List]) -> List[tuple]:
+        return sorted(stats.items(), key=lambda item: item[1][2], reverse=True)
+    
+    def write_stacks(self, path: str):
+        """Write self time per call stack in microseconds, in the collapsed
+        format flamegraph.pl, speedscope and inferno read"""
+        with open(path, 'w') as f:
+            for stack, self_time in sorted(self.stacks.items()):
+                microseconds = round(self_time * 1e6)
+                if microseconds > 0:
+                    f.write(f"{';'.join(stack)} {microseconds}\n")
+
+class ProfilingInterpreter(Interpreter):
+    """Interpreter that reports every statement and call to a Profiler
+    
+    Statements are timed around visit() or, when they contain calls, around
+    their step generator. A call's own time starts when its body does, so
+    evaluating the arguments stays with the caller.
+    """
+    step_every_child = True
+    
+    def __init__(self, profiler: Profiler, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.profiler = profiler
+    
+    def visit(self, node: ASTNode) -> Any:
+        line = node.line
+        if line is None:
+            return super().visit(node)
+        self.profiler.enter_line(line)
+        result = super().visit(node)
+        self.profiler.exit_line()
+        return result
+    
+    def steps(self, node: ASTNode):
+        steps = super().steps(node)
+        if isinstance(node, FunctionCall):
+            steps = self.profile_call(node, steps)
+        if node.line is not None:
+            steps = self.profile_line(node.line, steps)
+        return steps
+    
+    def profile_line(self, line: int, steps):
+        self.profiler.enter_line(line)
+        result = yield from steps
+        self.profiler.exit_line()
+        return result
+    
+    def profile_call(self, node: FunctionCall, steps):
+        caller = self.frame
+        in_body = False
+        value = None
+        while True:
+            try:
+                request = steps.send(value)
+            except StopIteration as done:
+                if in_body:
+                    self.profiler.exit_function()
+                return done.value
+            # The first request after the callee's frame is entered is its first statement
+            if not in_body and self.frame is not caller:
+                in_body = True
+                self.profiler.enter_function(node.name)
+            value = yield request
+
+# ============================================================================
+# HOOKS
+# ============================================================================
+
+class Hooks:
+    """Python callbacks for events in a tree-engine run
+    
+        on_statement(line, node)  before a statement runs
+        on_call(name, args)       when a call's arguments are evaluated
+        on_return(name, value)    when a call returns
+        on_print(text)            for every printed line
+        on_ask(prompt, value)     after an ask statement reads its answer
+        on_assign(name, value)    when a variable is set
+    
+    Register callbacks before the program starts. Only events with a
+    callback are instrumented, and runs without any use the plain
+    Interpreter.
+    """
+    EVENTS = ('on_statement', 'on_call', 'on_return', 'on_print', 'on_ask', 'on_assign')
+    
+    def __init__(self):
+        for event in self.EVENTS:
+            setattr(self, event, [])
+    
+    def add(self, event: str, callback: Callable) -> Callable:
+        if event not in self.EVENTS:
+            raise Exception(f"Unknown hook event '{event}'")
+        getattr(self, event).append(callback)
+        return callback
+    
+    def remove(self, event: str, callback: Callable):
+        getattr(self, event).remove(callback)
+    
+    def __bool__(self) -> bool:
+        return any(getattr(self, event) for event in self.EVENTS)
+
+class HookedInterpreter(Interpreter):
+    """Interpreter that calls Hooks around statements, calls, output, input and writes
+    
+    Events without callbacks keep the base class methods, so registering
+    only on_print leaves statement dispatch untouched.
+    """
+    
+    def __init__(self, hooks: Hooks, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.hooks = hooks
+        if not hooks.on_statement:
+            self.visit = super().visit
+        if hooks.on_statement or hooks.on_call or hooks.on_return:
+            # hook_call reads a call's arguments as one request each
+            self.step_every_child = True
+        else:
+            self.steps = super().steps
+        if not hooks.on_print:
+            self.visit_PrintStatement = super().visit_PrintStatement
+            self.step_PrintStatement = super().step_PrintStatement
+        if not hooks.on_ask:
+            self.visit_AskStatement = super().visit_AskStatement
+        if not hooks.on_assign:
+            self.assign = super().assign
+    
+    def visit(self, node: ASTNode) -> Any:
+        if node.line is not None:
+            for callback in self.hooks.on_statement:
+                callback(node.line, node)
+        return super().visit(node)
+    
+    def steps(self, node: ASTNode):
+        if node.line is not None:
+            for callback in self.hooks.on_statement:
+                callback(node.line, node)
+        steps = super().steps(node)
+        if isinstance(node, FunctionCall) and (self.hooks.on_call or self.hooks.on_return):
+            steps = self.hook_call(node, steps)
+        return steps
+    
+    def hook_call(self, node: FunctionCall, steps):
+        # The call's first requests are its arguments, one per request
+        args = []
+        for _ in node.args:
+            args.append((yield steps.send(args[-1] if args else None)))
+        if node.name in self.functions:
+            for callback in self.hooks.on_call:
+                callback(node.name, args)
+        value = args[-1] if args else None
+        while True:
+            try:
+                request = steps.send(value)
+            except StopIteration as done:
+                for callback in self.hooks.on_return:
+                    callback(node.name, done.value)
+                return done.value
+            value = yield request
+    
+    def visit_PrintStatement(self, node: PrintStatement) -> Any:
+        value = self.visit(node.expression)
+        self.write_line(self.format_output(value))
+        return value
+    
+    def step_PrintStatement(self, node: PrintStatement):
+        value = yield node.expression
+        self.write_line(self.format_output(value))
+        return value
+    
+    def write_line(self, text: str):
+        for callback in self.hooks.on_print:
+            callback(text)
+        self.output.write_line(text)
+    
+    def visit_AskStatement(self, node: AskStatement) -> Any:
+        value = super().visit_AskStatement(node)
+        for callback in self.hooks.on_ask:
+            callback(node.prompt, value)
+        return value
+    
+    def assign(self, name: str, slot: Optional[int], value: Any):
+        super().assign(name, slot, value)
+        for callback in self.hooks.on_assign:
+            callback(name, value)
+
+# ============================================================================
+# ASYNC EXECUTION
+# ============================================================================
+
+# Statements an async program runs before letting other tasks have the event loop
+DEFAULT_YIELD_EVERY = 100
+
+class AsyncSink:
+    """OutputBuffer sink writing to an asyncio StreamWriter, or to any object
+    with write(str) and, optionally, an async drain()"""
+    def __init__(self, writer: Any):
+        import asyncio
+        self.writer = writer
+        self.encode = isinstance(writer, asyncio.StreamWriter)
+    
+    def write(self, text: str):
+        self.writer.write(text.encode() if self.encode else text)
+    
+    def flush(self):
+        pass
+    
+    async def drain(self):
+        drain = getattr(self.writer, 'drain', None)
+        if drain is not None:
+            await drain()
+
+class AsyncInput:
+    """Awaits answers to ask statements from an asyncio StreamReader, or any
+    object with an async readline() returning str or bytes"""
+    def __init__(self, reader: Any, output: OutputBuffer):
+        self.reader = reader
+        self.output = output
+    
+    async def ask(self, prompt: str) -> Any:
+        # The prompt must appear after everything printed so far
+        self.output.flush()
+        self.output.sink.write(prompt)
+        await self.output.sink.drain()
+        line = await self.reader.readline() if self.reader is not None else ''
+        if isinstance(line, bytes):
+            line = line.decode()
+        if not line:
+            raise Exception(f"No input left for ask '{prompt.strip()}'")
+        return coerce_input(line.rstrip('\r\n'))
+
+class AskRequest:
+    """Yielded by AsyncInterpreter.step_AskStatement for the driver to await the answer"""
+    __slots__ = ('prompt',)
+    
+    def __init__(self, prompt: str):
+        self.prompt = prompt
+
+class AsyncInterpreter(Interpreter):
+    """Interpreter whose programs run as asyncio coroutines
+    
+    Every statement goes through the step_* generators, not only those
+    with calls, so the driver regains control between any two statements.
+    An ask yields an AskRequest that the driver awaits, and after every
+    yield_every statements the driver drains the output and lets the event
+    loop run other tasks. Expressions without calls are still evaluated in
+    one go by visit().
+    """
+    step_every_child = True
+    
+    def __init__(self, *args, yield_every: int = DEFAULT_YIELD_EVERY, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.yield_every = yield_every
+        self.until_yield = yield_every
+    
+    async def execute(self, node: Program) -> Any:
+        self.prepare(node, self.optimize)
+        result = None
+        for stmt in node.statements:
+            await self.count_statement()
+            result = await self.run_async(stmt)
+            if type(result) is ReturnSignal:
+                # A return outside any function ends the program as an error
+                raise ReturnValue(result.value)
+        return result
+    
+    async def run_async(self, node: ASTNode) -> Any:
+        """run() for a statement, awaiting asks and pausing between statements"""
+        frame = self.frame
+        stack = [self.steps(node)]
+        value = None
+        try:
+            while True:
+                try:
+                    request = stack[-1].send(value)
+                except StopIteration as done:
+                    stack.pop()
+                    if not stack:
+                        return done.value
+                    value = done.value
+                    continue
+                if type(request) is AskRequest:
+                    value = await self.input_source.ask(request.prompt)
+                elif request.has_call or request.line is not None and type(request) is not FunctionDef:
+                    if request.line is not None:
+                        await self.count_statement()
+                    stack.append(self.steps(request))
+                    value = None
+                else:
+                    value = self.visit(request)
+        finally:
+            self.frame = frame
+    
+    def steps(self, node: ASTNode):
+        if type(node) is FunctionDef:
+            return self.step_FunctionDef(node)
+        return super().steps(node)
+    
+    async def count_statement(self):
+        """Count one statement, pausing after every yield_every of them"""
+        self.until_yield -= 1
+        if not self.until_yield:
+            await self.pause()
+    
+    async def pause(self):
+        import asyncio
+        self.until_yield = self.yield_every
+        self.output.flush()
+        await self.output.sink.drain()
+        await asyncio.sleep(0)
+    
+    def step_FunctionDef(self, node: FunctionDef):
+        return self.visit_FunctionDef(node)
+        yield
+    
+    def step_AskStatement(self, node: AskStatement):
+        value = yield AskRequest(node.prompt + " ")
+        self.assign(node.var_name, node.slot, value)
+        return value
+
+async def run_program_async(code: str, stdin: Any = None, stdout: Any = None, stderr: Any = None,
+                            yield_every: int = DEFAULT_YIELD_EVERY, optimize: bool = True, **options):
+    """Run S++ source as a coroutine on the tree engine
+    
+    Answers to ask statements are awaited from stdin, an asyncio
+    StreamReader or any object with an async readline(); without one, an
+    ask fails as if the input had ended. Output goes to stdout, a
+    StreamWriter or any object with write() and an optional async drain(),
+    by default sys.stdout. The program lets other tasks run after every
+    yield_every statements and while it waits for input. Errors are
+    written as "Error: ..." lines to stderr, which defaults to stdout.
+    Other options are those of the tree engine, such as max_steps.
+    """
+    sink = AsyncSink(stdout if stdout is not None else sys.stdout)
+    output = OutputBuffer(sink, 0)
+    try:
+        try:
+            ast, _, _ = parse_program(code, optimize)
+            interpreter = AsyncInterpreter(output=output, input_source=AsyncInput(stdin, output),
+                                           optimize=optimize, yield_every=yield_every, **options)
+            await interpreter.execute(ast)
+        finally:
+            # Everything printed appears before any error message
+            output.flush()
+            await sink.drain()
+    except Exception as e:
+        errors = AsyncSink(stderr) if stderr is not None else sink
+        errors.write(f"Error: {e}\n")
+        await errors.drain()
+
+# ============================================================================
+# CLOSURE COMPILER
+# ============================================================================
+
+class ClosureCompiler:
+    """Converts AST nodes into nested Python closures ahead of time
+    
+    Every expression becomes a callable taking the current variable scope,
+    with its operator and operand shapes resolved while the closure is built.
+    Statements return None, or a one-element tuple holding the value of an
+    executed return statement, so returns never raise inside a function.
+    """
+    def __init__(self, output: Optional[OutputBuffer] = None, input_source: Any = None):
+        self.functions = {}
+        self.output = output or OutputBuffer(flush_every=1)
+        self.input_source = input_source or PromptInput(self.output)
+    
+    def compile_program(self, program: Program) -> Callable[[Dict[str, Any]], None]:
+        body = self.build_block(program.statements)
+        
+        def run(variables: Dict[str, Any]):
+            result = body(variables)
+            if result is not None:
+                raise ReturnValue(result[0])
+        return run
+    
+    def build(self, node: ASTNode) -> Callable:
+        method_name = f'build_{type(node).__name__}'
+        method = getattr(self, method_name, self.build_generic)
+        return method(node)
+    
+    def build_generic(self, node):
+        raise Exception(f'No build_{type(node).__name__} method')
+    
+    def contains_return(self, statements: List[ASTNode]) -> bool:
+        """Whether a block can produce a return signal (function bodies excluded)"""
+        for stmt in statements:
+            if isinstance(stmt, ReturnStatement):
+                return True
+            if isinstance(stmt, IfStatement):
+                if self.contains_return(stmt.then_body) or self.contains_return(stmt.else_body or []):
+                    return True
+            elif isinstance(stmt, (RepeatWhileStatement, RepeatTimesStatement, ForEachStatement)):
+                if self.contains_return(stmt.body):
+                    return True
+        return False
+    
+    def build_block(self, statements: List[ASTNode]) -> Callable:
+        steps = []
+        for stmt in statements:
+            step = self.build(stmt)
+            if isinstance(stmt, FunctionCall):
+                steps.append(self.discard_result(step))
+            else:
+                steps.append(step)
+        
+        if not self.contains_return(statements):
+            def block(variables):
+                for step in steps:
+                    step(variables)
+            return block
+        
+        def block_with_return(variables):
+            for step in steps:
+                result = step(variables)
+                if result is not None:
+                    return result
+        return block_with_return
+    
+    def discard_result(self, call: Callable) -> Callable:
+        def statement(variables):
+            call(variables)
+        return statement
+    
+    def build_condition(self, node: ASTNode) -> Callable:
+        # Comparisons already produce booleans, so truthiness can be skipped
+        if isinstance(node, BinaryOp) and node.op.type in (TokenType.EQUALS, TokenType.IS_GREATER_THAN,
+                                                           TokenType.IS_LESS_THAN):
+            return self.build(node)
+        expr = self.build(node)
+        
+        def condition(variables):
+            return is_truthy(expr(variables))
+        return condition
+    
+    def build_SetStatement(self, node: SetStatement) -> Callable:
+        name = node.var_name
+        value = self.build(node.value)
+        
+        def set_statement(variables):
+            variables[name] = value(variables)
+        return set_statement
+    
+    def build_PrintStatement(self, node: PrintStatement) -> Callable:
+        expr = self.build(node.expression)
+        write_line = self.output.write_line
+        
+        def print_statement(variables):
+            write_line(format_output(expr(variables)))
+        return print_statement
+    
+    def build_AskStatement(self, node: AskStatement) -> Callable:
+        prompt = node.prompt + " "
+        name = node.var_name
+        ask = self.input_source.ask
+        
+        def ask_statement(variables):
+            variables[name] = ask(prompt)
+        return ask_statement
+    
+    def build_IfStatement(self, node: IfStatement) -> Callable:
+        condition = self.build_condition(node.condition)
+        then_body = self.build_block(node.then_body)
+        
+        if not node.else_body:
+            def if_statement(variables):
+                if condition(variables):
+                    return then_body(variables)
+            return if_statement
+        
+        else_body = self.build_block(node.else_body)
+        
+        def if_else_statement(variables):
+            if condition(variables):
+                return then_body(variables)
+            return else_body(variables)
+        return if_else_statement
+    
+    def build_RepeatWhileStatement(self, node: RepeatWhileStatement) -> Callable:
+        condition = self.build_condition(node.condition)
+        body = self.build_block(node.body)
+        
+        if not self.contains_return(node.body):
+            def repeat_while(variables):
+                while condition(variables):
+                    body(variables)
+            return repeat_while
+        
+        def repeat_while_with_return(variables):
+            while condition(variables):
+                result = body(variables)
+                if result is not None:
+                    return result
+        return repeat_while_with_return
+    
+    def build_RepeatTimesStatement(self, node: RepeatTimesStatement) -> Callable:
+        count = self.build(node.count)
+        body = self.build_block(node.body)
+        
+        if not self.contains_return(node.body):
+            def repeat_times(variables):
+                for _ in range(int(count(variables))):
+                    body(variables)
+            return repeat_times
+        
+        def repeat_times_with_return(variables):
+            for _ in range(int(count(variables))):
+                result = body(variables)
+                if result is not None:
+                    return result
+        return repeat_times_with_return
+    
+    def build_ForEachStatement(self, node: ForEachStatement) -> Callable:
+        name = node.item_name
+        list_expr = self.build(node.list_expr)
+        body = self.build_block(node.body)
+        
+        def for_each(variables):
+            items = list_expr(variables)
+            if not isinstance(items, LIST_TYPES):
+                items = [items]
+            for item in items:
+                variables[name] = item
+                result = body(variables)
+                if result is not None:
+                    return result
+        return for_each
+    
+    def build_FunctionDef(self, node: FunctionDef) -> Callable:
+        functions = self.functions
+        name = node.name
+        function = (node.params, self.build_block(node.body))
+        
+        def function_def(variables):
+            functions[name] = function
+        return function_def
+    
+    def build_FunctionCall(self, node: FunctionCall) -> Callable:
+        functions = self.functions
+        name = node.name
+        arg_exprs = [self.build(arg) for arg in node.args]
+        
+        def function_call(variables):
+            if name not in functions:
+                raise Exception(f"Function '{name}' not defined")
+            params, body = functions[name]
+            args = [arg(variables) for arg in arg_exprs]
+            
+            # Callees see a copy of the caller's scope; nothing they set leaks back
+            local_vars = variables.copy()
+            for param, value in zip(params, args):
+                local_vars[param] = value
+            
+            result = body(local_vars)
+            return result[0] if result is not None else None
+        return function_call
+    
+    def build_ReturnStatement(self, node: ReturnStatement) -> Callable:
+        if not node.value:
+            def return_none(variables):
+                return (None,)
+            return return_none
+        
+        value = self.build(node.value)
+        
+        def return_statement(variables):
+            return (value(variables),)
+        return return_statement
+    
+    def build_BinaryOp(self, node: BinaryOp) -> Callable:
+        op_type = node.op.type
+        left = self.build(node.left)
+        
+        if isinstance(node.right, Literal) and op_type != TokenType.DIVIDED_BY and op_type != TokenType.OR:
+            return self.build_binary_with_constant(op_type, left, node.right.value)
+        
+        right = self.build(node.right)
+        
+        if op_type == TokenType.PLUS:
+            return lambda variables: left(variables) + right(variables)
+        if op_type == TokenType.MINUS:
+            return lambda variables: left(variables) - right(variables)
+        if op_type == TokenType.TIMES_OP:
+            return lambda variables: left(variables) * right(variables)
+        if op_type == TokenType.DIVIDED_BY:
+            def divide(variables):
+                dividend = left(variables)
+                divisor = right(variables)
+                if divisor != 0 or isinstance(dividend, NumberList):
+                    return dividend / divisor
+                return 0
+            return divide
+        if op_type == TokenType.EQUALS:
+            return lambda variables: left(variables) == right(variables)
+        if op_type == TokenType.IS_GREATER_THAN:
+            return lambda variables: left(variables) > right(variables)
+        if op_type == TokenType.IS_LESS_THAN:
+            return lambda variables: left(variables) < right(variables)
+        if op_type == TokenType.OR:
+            def logical_or(variables):
+                left_value = left(variables)
+                right_value = right(variables)
+                return is_truthy(left_value) or is_truthy(right_value)
+            return logical_or
+        raise Exception(f"Unknown operator {op_type}")
+    
+    def build_binary_with_constant(self, op_type: TokenType, left: Callable, constant: Any) -> Callable:
+        """Specialize arithmetic and comparisons whose right operand is a literal"""
+        if op_type == TokenType.PLUS:
+            return lambda variables: left(variables) + constant
+        if op_type == TokenType.MINUS:
+            return lambda variables: left(variables) - constant
+        if op_type == TokenType.TIMES_OP:
+            return lambda variables: left(variables) * constant
+        if op_type == TokenType.EQUALS:
+            return lambda variables: left(variables) == constant
+        if op_type == TokenType.IS_GREATER_THAN:
+            return lambda variables: left(variables) > constant
+        if op_type == TokenType.IS_LESS_THAN:
+            return lambda variables: left(variables) < constant
+        raise Exception(f"Unknown operator {op_type}")
+    
+    def build_UnaryOp(self, node: UnaryOp) -> Callable:
+        expr = self.build(node.expr)
+        return lambda variables: not is_truthy(expr(variables))
+    
+    def build_Literal(self, node: Literal) -> Callable:
+        value = node.value
+        return lambda variables: value
+    
+    def build_Variable(self, node: Variable) -> Callable:
+        name = node.name
+        if node.is_literal_if_undefined:
+            return lambda variables: variables.get(name, name)
+        
+        def variable(variables):
+            if name not in variables:
+                raise Exception(f"Variable '{name}' not defined")
+            return variables[name]
+        return variable
+    
+    def build_ListLiteral(self, node: ListLiteral) -> Callable:
+        items = [self.build(item) for item in node.items]
+        return lambda variables: make_list([item(variables) for item in items])
+
+# ============================================================================
+# BYTECODE COMPILER
+# ============================================================================
+
+class Op:
+    """Opcodes of the stack-based virtual machine.
+    
+    Compiled code is a flat list alternating opcode and argument, so every
+    instruction occupies two slots and jump targets are list indices.
+    """
+    LOAD_CONST = 0
+    LOAD_VAR = 1
+    LOAD_NAME = 2           # Variable that falls back to its own name if undefined
+    STORE_VAR = 3
+    ADD = 4
+    SUB = 5
+    MUL = 6
+    DIV = 7
+    EQ = 8
+    GT = 9
+    LT = 10
+    OR = 11
+    NOT = 12
+    JUMP = 13
+    JUMP_IF_FALSE = 14
+    JUMP_IF_NOT_LT = 15     # Fused comparison and conditional jump
+    JUMP_IF_NOT_GT = 16
+    JUMP_IF_NOT_EQ = 17
+    POP = 18
+    PRINT = 19
+    ASK = 20
+    REPEAT_SETUP = 21
+    REPEAT_NEXT = 22
+    ITER_SETUP = 23
+    FOR_ITER = 24
+    BUILD_LIST = 25
+    DEFINE = 26
+    LOAD_FUNC = 27
+    CALL = 28
+    RETURN = 29
+    HALT = 30
+
+class CodeObject:
+    """Compiled bytecode for the main program or a single function"""
+    def __init__(self, name: str, params: List[str]):
+        self.name = name
+        self.params = params
+        self.code: List[Any] = []
+    
+    def emit(self, op: int, arg: Any = None) -> int:
+        self.code.append(op)
+        self.code.append(arg)
+        return len(self.code) - 2
+    
+    def patch(self, position: int, target: int):
+        self.code[position + 1] = target
+    
+    def here(self) -> int:
+        return len(self.code)
+
+class Compiler:
+    """Compiles a parsed Program into bytecode for the VirtualMachine"""
+    
+    BINARY_OPS = {
+        TokenType.PLUS: Op.ADD,
+        TokenType.MINUS: Op.SUB,
+        TokenType.TIMES_OP: Op.MUL,
+        TokenType.DIVIDED_BY: Op.DIV,
+        TokenType.EQUALS: Op.EQ,
+        TokenType.IS_GREATER_THAN: Op.GT,
+        TokenType.IS_LESS_THAN: Op.LT,
+        TokenType.OR: Op.OR,
+    }
+    
+    CONDITIONAL_JUMPS = {
+        TokenType.IS_LESS_THAN: Op.JUMP_IF_NOT_LT,
+        TokenType.IS_GREATER_THAN: Op.JUMP_IF_NOT_GT,
+        TokenType.EQUALS: Op.JUMP_IF_NOT_EQ,
+    }
+    
+    def __init__(self):
+        self.code_object: Optional[CodeObject] = None
+    
+    def compile_program(self, program: Program) -> CodeObject:
+        self.code_object = CodeObject('<program>', [])
+        self.compile_block(program.statements)
+        self.code_object.emit(Op.HALT)
+        return self.code_object
+    
+    def compile(self, node: ASTNode):
+        method_name = f'compile_{type(node).__name__}'
+        method = getattr(self, method_name, self.compile_generic)
+        method(node)
+    
+    def compile_generic(self, node):
+        raise Exception(f'No compile_{type(node).__name__} method')
+    
+    def compile_block(self, statements: List[ASTNode]):
+        for stmt in statements:
+            self.compile(stmt)
+            if isinstance(stmt, FunctionCall):
+                # A call used as a statement discards its return value
+                self.code_object.emit(Op.POP)
+    
+    def compile_condition(self, condition: ASTNode) -> int:
+        """Emit a jump taken when the condition is false; return its position for patching"""
+        if isinstance(condition, BinaryOp) and condition.op.type in self.CONDITIONAL_JUMPS:
+            self.compile(condition.left)
+            self.compile(condition.right)
+            return self.code_object.emit(self.CONDITIONAL_JUMPS[condition.op.type])
+        self.compile(condition)
+        return self.code_object.emit(Op.JUMP_IF_FALSE)
+    
+    def compile_SetStatement(self, node: SetStatement):
+        self.compile(node.value)
+        self.code_object.emit(Op.STORE_VAR, node.var_name)
+    
+    def compile_PrintStatement(self, node: PrintStatement):
+        self.compile(node.expression)
+        self.code_object.emit(Op.PRINT)
+    
+    def compile_AskStatement(self, node: AskStatement):
+        self.code_object.emit(Op.ASK, node.prompt)
+        self.code_object.emit(Op.STORE_VAR, node.var_name)
+    
+    def compile_IfStatement(self, node: IfStatement):
+        skip_then = self.compile_condition(node.condition)
+        self.compile_block(node.then_body)
+        if node.else_body:
+            skip_else = self.code_object.emit(Op.JUMP)
+            self.code_object.patch(skip_then, self.code_object.here())
+            self.compile_block(node.else_body)
+            self.code_object.patch(skip_else, self.code_object.here())
+        else:
+            self.code_object.patch(skip_then, self.code_object.here())
+    
+    def compile_RepeatWhileStatement(self, node: RepeatWhileStatement):
+        loop_start = self.code_object.here()
+        exit_jump = self.compile_condition(node.condition)
+        self.compile_block(node.body)
+        self.code_object.emit(Op.JUMP, loop_start)
+        self.code_object.patch(exit_jump, self.code_object.here())
+    
+    def compile_RepeatTimesStatement(self, node: RepeatTimesStatement):
+        self.compile(node.count)
+        self.code_object.emit(Op.REPEAT_SETUP)
+        loop_start = self.code_object.emit(Op.REPEAT_NEXT)
+        self.compile_block(node.body)
+        self.code_object.emit(Op.JUMP, loop_start)
+        self.code_object.patch(loop_start, self.code_object.here())
+    
+    def compile_ForEachStatement(self, node: ForEachStatement):
+        self.compile(node.list_expr)
+        self.code_object.emit(Op.ITER_SETUP)
+        loop_start = self.code_object.emit(Op.FOR_ITER)
+        self.code_object.emit(Op.STORE_VAR, node.item_name)
+        self.compile_block(node.body)
+        self.code_object.emit(Op.JUMP, loop_start)
+        self.code_object.patch(loop_start, self.code_object.here())
+    
+    def compile_FunctionDef(self, node: FunctionDef):
+        outer = self.code_object
+        self.code_object = CodeObject(node.name, node.params)
+        self.compile_block(node.body)
+        self.code_object.emit(Op.LOAD_CONST, None)
+        self.code_object.emit(Op.RETURN)
+        function = self.code_object
+        self.code_object = outer
+        self.code_object.emit(Op.DEFINE, function)
+    
+    def compile_FunctionCall(self, node: FunctionCall):
+        # The function is looked up before its arguments are evaluated,
+        # matching the tree-walking interpreter's error order
+        self.code_object.emit(Op.LOAD_FUNC, node.name)
+        for arg in node.args:
+            self.compile(arg)
+        self.code_object.emit(Op.CALL, len(node.args))
+    
+    def compile_ReturnStatement(self, node: ReturnStatement):
+        if node.value:
+            self.compile(node.value)
+        else:
+            self.code_object.emit(Op.LOAD_CONST, None)
+        self.code_object.emit(Op.RETURN)
+    
+    def compile_BinaryOp(self, node: BinaryOp):
+        self.compile(node.left)
+        self.compile(node.right)
+        self.code_object.emit(self.BINARY_OPS[node.op.type])
+    
+    def compile_UnaryOp(self, node: UnaryOp):
+        self.compile(node.expr)
+        self.code_object.emit(Op.NOT)
+    
+    def compile_Literal(self, node: Literal):
+        self.code_object.emit(Op.LOAD_CONST, node.value)
+    
+    def compile_Variable(self, node: Variable):
+        if node.is_literal_if_undefined:
+            self.code_object.emit(Op.LOAD_NAME, node.name)
+        else:
+            self.code_object.emit(Op.LOAD_VAR, node.name)
+    
+    def compile_ListLiteral(self, node: ListLiteral):
+        for item in node.items:
+            self.compile(item)
+        self.code_object.emit(Op.BUILD_LIST, len(node.items))
+
+# ============================================================================
+# VIRTUAL MACHINE
+# ============================================================================
+
+class VirtualMachine:
+    """Stack-based virtual machine executing CodeObjects produced by the Compiler
+    
+    Function calls push a heap-allocated frame instead of recursing in Python,
+    and returns are plain jumps rather than exceptions.
+    """
+    def __init__(self, max_call_depth: Optional[int] = DEFAULT_MAX_CALL_DEPTH,
+                 output: Optional[OutputBuffer] = None, input_source: Any = None):
+        self.variables = {}
+        self.functions = {}
+        self.max_call_depth = max_call_depth
+        self.output = output or OutputBuffer(flush_every=1)
+        self.input_source = input_source or PromptInput(self.output)
+    
+    def run(self, program: CodeObject) -> Any:
+        # Opcodes are bound to locals so the dispatch chain avoids global lookups
+        LOAD_CONST, LOAD_VAR, LOAD_NAME, STORE_VAR = Op.LOAD_CONST, Op.LOAD_VAR, Op.LOAD_NAME, Op.STORE_VAR
+        ADD, SUB, MUL, DIV = Op.ADD, Op.SUB, Op.MUL, Op.DIV
+        EQ, GT, LT, OR, NOT = Op.EQ, Op.GT, Op.LT, Op.OR, Op.NOT
+        JUMP, JUMP_IF_FALSE = Op.JUMP, Op.JUMP_IF_FALSE
+        JUMP_IF_NOT_LT, JUMP_IF_NOT_GT, JUMP_IF_NOT_EQ = Op.JUMP_IF_NOT_LT, Op.JUMP_IF_NOT_GT, Op.JUMP_IF_NOT_EQ
+        POP, PRINT, ASK = Op.POP, Op.PRINT, Op.ASK
+        REPEAT_SETUP, REPEAT_NEXT, ITER_SETUP, FOR_ITER = Op.REPEAT_SETUP, Op.REPEAT_NEXT, Op.ITER_SETUP, Op.FOR_ITER
+        BUILD_LIST, DEFINE, LOAD_FUNC, CALL, RETURN = Op.BUILD_LIST, Op.DEFINE, Op.LOAD_FUNC, Op.CALL, Op.RETURN
+        
+        functions = self.functions
+        max_call_depth = self.max_call_depth
+        write_line = self.output.write_line
+        ask = self.input_source.ask
+        frames = []
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        code = program.code
+        variables = self.variables
+        base = 0
+        pc = 0
+        
+        while True:
+            op = code[pc]
+            arg = code[pc + 1]
+            pc += 2
+            
+            # Opcodes are tested in order of how often the bench/bench.py
+            # workloads execute them, so the common ones match early
+            if op == LOAD_CONST:
+                push(arg)
+            elif op == LOAD_NAME:
+                push(variables[arg] if arg in variables else arg)
+            elif op == STORE_VAR:
+                variables[arg] = pop()
+            elif op == ADD:
+                right = pop()
+                stack[-1] = stack[-1] + right
+            elif op == LOAD_VAR:
+                if arg not in variables:
+                    raise Exception(f"Variable '{arg}' not defined")
+                push(variables[arg])
+            elif op == JUMP:
+                pc = arg
+            elif op == JUMP_IF_NOT_LT:
+                right = pop()
+                if not pop() < right:
+                    pc = arg
+            elif op == MUL:
+                right = pop()
+                stack[-1] = stack[-1] * right
+            elif op == PRINT:
+                write_line(format_output(pop()))
+            elif op == LOAD_FUNC:
+                if arg not in functions:
+                    raise Exception(f"Function '{arg}' not defined")
+                push(functions[arg])
+            elif op == CALL:
+                if arg:
+                    args = stack[-arg:]
+                    del stack[-arg:]
+                else:
+                    args = ()
+                function = pop()
+                if max_call_depth is not None and len(frames) >= max_call_depth:
+                    raise Exception(f"Maximum call depth of {max_call_depth} exceeded "
+                                    f"in call to '{function.name}'")
+                frames.append((code, pc, variables, base))
+                # Callees see a copy of the caller's scope; nothing they set leaks back
+                variables = variables.copy()
+                for param, value in zip(function.params, args):
+                    variables[param] = value
+                code = function.code
+                pc = 0
+                base = len(stack)
+            elif op == RETURN:
+                value = pop()
+                if not frames:
+                    raise ReturnValue(value)
+                del stack[base:]
+                code, pc, variables, base = frames.pop()
+                push(value)
+            elif op == SUB:
+                right = pop()
+                stack[-1] = stack[-1] - right
+            elif op == REPEAT_NEXT:
+                if stack[-1] > 0:
+                    stack[-1] -= 1
+                else:
+                    pop()
+                    pc = arg
+            elif op == JUMP_IF_NOT_GT:
+                right = pop()
+                if not pop() > right:
+                    pc = arg
+            elif op == JUMP_IF_FALSE:
+                if not is_truthy(pop()):
+                    pc = arg
+            elif op == JUMP_IF_NOT_EQ:
+                right = pop()
+                if not pop() == right:
+                    pc = arg
+            elif op == LT:
+                right = pop()
+                stack[-1] = stack[-1] < right
+            elif op == GT:
+                right = pop()
+                stack[-1] = stack[-1] > right
+            elif op == EQ:
+                right = pop()
+                stack[-1] = stack[-1] == right
+            elif op == OR:
+                right = pop()
+                stack[-1] = is_truthy(stack[-1]) or is_truthy(right)
+            elif op == NOT:
+                stack[-1] = not is_truthy(stack[-1])
+            elif op == DIV:
+                right = pop()
+                stack[-1] = stack[-1] / right if right != 0 or isinstance(stack[-1], NumberList) else 0
+            elif op == FOR_ITER:
+                for item in stack[-1]:
+                    push(item)
+                    break
+                else:
+                    pop()
+                    pc = arg
+            elif op == ITER_SETUP:
+                items = stack[-1]
+                if not isinstance(items, LIST_TYPES):
+                    items = [items]
+                stack[-1] = iter(items)
+            elif op == REPEAT_SETUP:
+                stack[-1] = int(stack[-1])
+            elif op == BUILD_LIST:
+                if arg:
+                    items = stack[-arg:]
+                    del stack[-arg:]
+                else:
+                    items = []
+                push(make_list(items))
+            elif op == ASK:
+                push(ask(arg + " "))
+            elif op == POP:
+                pop()
+            elif op == DEFINE:
+                functions[arg.name] = arg
+            else:  # HALT
+                self.variables = variables
+                return None
+
+# ============================================================================
+# PYTHON BACKEND
+# ============================================================================
+
+PYTHON_BACKEND_VERSION = 3
+
+class PythonScope(dict):
+    """Variable scope of transpiled programs; undefined reads fail like the Interpreter"""
+    def __missing__(self, name: str):
+        raise Exception(f"Variable '{name}' not defined")
+
+class PythonFunctions(dict):
+    """Function table of transpiled programs"""
+    def __missing__(self, name: str):
+        raise Exception(f"Function '{name}' not defined")
+
+def call_transpiled(function: tuple, caller_scope: Dict[str, Any], args: tuple) -> Any:
+    params, body = function
+    # Callees see a copy of the caller's scope; nothing they set leaks back
+    scope = PythonScope(caller_scope)
+    for param, value in zip(params, args):
+        scope[param] = value
+    return body(scope)
+
+def iterate_items(items: Any) -> list:
+    return items if isinstance(items, LIST_TYPES) else [items]
+
+class PythonTranspiler:
+    """Generates equivalent Python source from a parsed Program
+    
+    S++ variables live in a PythonScope dict named _v so that dynamic scope,
+    undefined-name fallbacks and error messages behave as in the Interpreter.
+    Every S++ function becomes a module-level Python function.
+    """
+    
+    # Python precedence levels used to avoid redundant parentheses
+    ATOM, MULTIPLY, ADD, COMPARE = 3, 2, 1, 0
+    
+    ARITHMETIC = {
+        TokenType.PLUS: ('+', ADD),
+        TokenType.MINUS: ('-', ADD),
+        TokenType.TIMES_OP: ('*', MULTIPLY),
+    }
+    
+    COMPARISONS = {
+        TokenType.EQUALS: '==',
+        TokenType.IS_GREATER_THAN: '>',
+        TokenType.IS_LESS_THAN: '<',
+    }
+    
+    RUNTIME = {
+        '_Functions': PythonFunctions,
+        '_ReturnValue': ReturnValue,
+        '_call': call_transpiled,
+        '_divide': divide,
+        '_format': format_output,
+        '_iterate': iterate_items,
+        '_list': make_list,
+        '_or': logical_or,
+        '_truthy': is_truthy,
+    }
+    
+    def __init__(self):
+        self.functions: List[str] = []
+        self.lines: List[str] = []
+        self.indent = 0
+        self.in_function = False
+    
+    def transpile(self, program: Program) -> str:
+        main = self.emit_function('_main', program.statements, is_function=False)
+        header = [
+            f'# S++ program transpiled to Python (backend version {PYTHON_BACKEND_VERSION})',
+            '_f = _Functions()',
+            '',
+        ]
+        return '\n'.join(header + self.functions + [main]) + '\n'
+    
+    def emit_function(self, name: str, body: List[ASTNode], is_function: bool = True) -> str:
+        outer_lines, outer_indent, outer_in_function = self.lines, self.indent, self.in_function
+        self.lines, self.indent, self.in_function = [f'def {name}(_v):'], 1, is_function
+        self.emit_block(body)
+        if is_function:
+            self.emit('return None')
+        source = '\n'.join(self.lines) + '\n'
+        self.lines, self.indent, self.in_function = outer_lines, outer_indent, outer_in_function
+        return source
+    
+    def emit(self, line: str):
+        self.lines.append('    ' * self.indent + line)
+    
+    def emit_block(self, statements: List[ASTNode]):
+        if not statements:
+            self.emit('pass')
+        for stmt in statements:
+            self.statement(stmt)
+    
+    def emit_nested(self, header: str, statements: List[ASTNode]):
+        self.emit(header)
+        self.indent += 1
+        self.emit_block(statements)
+        self.indent -= 1
+    
+    def statement(self, node: ASTNode):
+        method_name = f'statement_{type(node).__name__}'
+        method = getattr(self, method_name, None)
+        if method is None:
+            raise Exception(f'No statement_{type(node).__name__} method')
+        method(node)
+    
+    def statement_SetStatement(self, node: SetStatement):
+        self.emit(f'_v[{node.var_name!r}] = {self.expression(node.value)}')
+    
+    def statement_PrintStatement(self, node: PrintStatement):
+        self.emit(f'_write(_format({self.expression(node.expression)}))')
+    
+    def statement_AskStatement(self, node: AskStatement):
+        self.emit(f'_v[{node.var_name!r}] = _ask({node.prompt + " "!r})')
+    
+    def statement_IfStatement(self, node: IfStatement):
+        self.emit_nested(f'if {self.condition(node.condition)}:', node.then_body)
+        if node.else_body:
+            self.emit_nested('else:', node.else_body)
+    
+    def statement_RepeatWhileStatement(self, node: RepeatWhileStatement):
+        self.emit_nested(f'while {self.condition(node.condition)}:', node.body)
+    
+    def statement_RepeatTimesStatement(self, node: RepeatTimesStatement):
+        self.emit_nested(f'for _ in range(int({self.expression(node.count)})):', node.body)
+    
+    def statement_ForEachStatement(self, node: ForEachStatement):
+        self.emit_nested(f'for _v[{node.item_name!r}] in _iterate({self.expression(node.list_expr)}):', node.body)
+    
+    def statement_FunctionDef(self, node: FunctionDef):
+        python_name = f'_fn{len(self.functions) + 1}'
+        # Reserve the name before emitting so nested definitions get their own
+        self.functions.append('')
+        index = len(self.functions) - 1
+        self.functions[index] = self.emit_function(python_name, node.body)
+        self.emit(f'_f[{node.name!r}] = ({tuple(node.params)!r}, {python_name})')
+    
+    def statement_FunctionCall(self, node: FunctionCall):
+        self.emit(self.expression(node))
+    
+    def statement_ReturnStatement(self, node: ReturnStatement):
+        value = self.expression(node.value) if node.value else 'None'
+        if self.in_function:
+            self.emit(f'return {value}')
+        else:
+            self.emit(f'raise _ReturnValue({value})')
+    
+    def condition(self, node: ASTNode) -> str:
+        source, precedence = self.operand(node)
+        if precedence == self.COMPARE:
+            return source
+        return f'_truthy({source})'
+    
+    def expression(self, node: ASTNode) -> str:
+        return self.operand(node)[0]
+    
+    def operand(self, node: ASTNode) -> tuple:
+        """Return Python source for an expression and its precedence level"""
+        if isinstance(node, Literal):
+            return repr(node.value), self.ATOM
+        if isinstance(node, Variable):
+            if node.is_literal_if_undefined:
+                return f'_v.get({node.name!r}, {node.name!r})', self.ATOM
+            return f'_v[{node.name!r}]', self.ATOM
+        if isinstance(node, BinaryOp):
+            return self.binary_operand(node)
+        if isinstance(node, UnaryOp):
+            return f'(not _truthy({self.expression(node.expr)}))', self.ATOM
+        if isinstance(node, FunctionCall):
+            args = ''.join(f'{self.expression(arg)}, ' for arg in node.args)
+            return f'_call(_f[{node.name!r}], _v, ({args}))', self.ATOM
+        if isinstance(node, ListLiteral):
+            return f'_list([{", ".join(self.expression(item) for item in node.items)}])', self.ATOM
+        raise Exception(f'Cannot transpile {type(node).__name__}')
+    
+    def binary_operand(self, node: BinaryOp) -> tuple:
+        op_type = node.op.type
+        left, left_precedence = self.operand(node.left)
+        right, right_precedence = self.operand(node.right)
+        
+        if op_type == TokenType.DIVIDED_BY:
+            return f'_divide({left}, {right})', self.ATOM
+        if op_type == TokenType.OR:
+            return f'_or({left}, {right})', self.ATOM
+        
+        if op_type in self.COMPARISONS:
+            symbol, precedence = self.COMPARISONS[op_type], self.COMPARE
+            # Python would chain a < b < c, so nested comparisons always get parentheses
+            if left_precedence <= self.COMPARE:
+                left = f'({left})'
+        else:
+            symbol, precedence = self.ARITHMETIC[op_type]
+            if left_precedence < precedence:
+                left = f'({left})'
+        if right_precedence <= precedence:
+            right = f'({right})'
+        return f'{left} {symbol} {right}', precedence
+
+def transpile_to_python(code: str, cache_dir: Optional[str] = None, optimize: bool = True) -> tuple:
+    """Transpile S++ source, reusing a cached module for unchanged sources
+    
+    Returns the generated Python source and the filename to compile it under.
+    """
+    def transpile() -> str:
+        ast = Parser(Lexer(code)).parse()
+        if optimize:
+            ast = Optimizer().optimize(ast)
+        return PythonTranspiler().transpile(ast)
+    
+    if cache_dir is None:
+        return transpile(), '<spp-python>'
+    
+    key = hashlib.sha256(f'{PYTHON_BACKEND_VERSION}\n{optimize}\n{code}'.encode('utf-8')).hexdigest()
+    path = os.path.join(cache_dir, f'spp_{key[:32]}.py')
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read(), path
+    except OSError:
+        pass
+    
+    source = transpile()
+    os.makedirs(cache_dir, exist_ok=True)
+    # Write to a temporary file first so concurrent runs never read a partial module
+    fd, temp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(source)
+    os.replace(temp_path, path)
+    return source, path
+
+def run_python_source(source: str, filename: str = '<spp-python>', output: Optional[OutputBuffer] = None,
+                      input_source: Any = None):
+    output = output or OutputBuffer(flush_every=1)
+    namespace = dict(PythonTranspiler.RUNTIME)
+    namespace['_write'] = output.write_line
+    namespace['_ask'] = (input_source or PromptInput(output)).ask
+    exec(compile(source, filename, 'exec'), namespace)
+    namespace['_main'](PythonScope())
+
+# ============================================================================
+# PROGRAM CACHE
+# ============================================================================
+
+# Bump whenever the AST classes or the passes that run before caching change
+PROGRAM_CACHE_VERSION = 5
+PROGRAM_CACHE_SECRET_SIZE = 32
+
+def parse_program(code: str, optimize: bool = True) -> Tuple[Program, int, int]:
+    """Lex, parse and optionally optimize a program
+    
+    Returns the program, the number of nodes the optimizer removed and the
+    number of nodes the parser produced.
+    """
+    ast = Parser(Lexer(code)).parse()
+    total = count_nodes(ast)
+    removed = 0
+    if optimize:
+        optimizer = Optimizer()
+        ast = optimizer.optimize(ast)
+        removed = optimizer.removed
+    return ast, removed, total
+
+def program_cache_dir() -> str:
+    """Directory of the current user's program cache
+    
+    $SPP_CACHE_DIR when set, otherwise spp under $XDG_CACHE_HOME or ~/.cache.
+    """
+    directory = os.environ.get('SPP_CACHE_DIR')
+    if not directory:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+        directory = os.path.join(base, 'spp')
+    return directory
+
+def program_cache_secret(directory: Optional[str] = None) -> bytes:
+    """Secret key of a program cache, created with the directory if needed
+    
+    Cache entries are unpickled, so only a directory that belongs to the
+    current user and that nobody else can write to is used.
+    """
+    directory = directory or program_cache_dir()
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    if hasattr(os, 'getuid'):
+        info = os.stat(directory)
+        if info.st_uid != os.getuid() or info.st_mode & 0o077:
+            raise OSError(f"Program cache {directory} is not private to the current user")
+    
+    key_path = os.path.join(directory, 'key')
+    try:
+        with open(key_path, 'rb') as f:
+            secret = f.read()
+        if len(secret) == PROGRAM_CACHE_SECRET_SIZE:
+            return secret
+    except FileNotFoundError:
+        pass
+    # Runs racing to create the key each replace it whole; entries written
+    # under a replaced key are misses for everyone else
+    secret = os.urandom(PROGRAM_CACHE_SECRET_SIZE)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(secret)
+        os.replace(temp_path, key_path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return secret
+
+def program_cache_path(code: str, path: str, optimize: bool, secret: Optional[bytes] = None) -> str:
+    """Cache file for a source file's current content
+    
+    Names are keyed with the cache's secret, so other users can neither
+    predict nor plant them. The first hash stands for the source file and
+    the optimize flag, the second for everything the pickled program
+    depends on. The module name is part of it because pickles refer to
+    classes by module, which is __main__ when the interpreter runs as a
+    script.
+    """
+    secret = secret or program_cache_secret()
+    source = hmac.new(secret, os.fsencode(os.path.abspath(path)) + f'\n{optimize}'.encode('utf-8'),
+                      'sha256').hexdigest()
+    content = hmac.new(secret, f'{PROGRAM_CACHE_VERSION}\n{__name__}\n{sys.version_info[:2]}\n'
+                               f'{code}'.encode('utf-8'), 'sha256').hexdigest()
+    return os.path.join(program_cache_dir(), f'{os.path.basename(path)}.{source[:16]}.{content[:32]}.ast')
+
+def load_program(code: str, path: Optional[str] = None, optimize: bool = True) -> Tuple[Program, int, int]:
+    """parse_program() with an on-disk cache for programs read from a file
+    
+    An unchanged file is unpickled from the user's program cache without
+    lexing or parsing. Entries carry an HMAC of their content and are only
+    unpickled when it matches. Any unreadable entry is treated as a miss,
+    and a cache that cannot be used or written never fails the run.
+    """
+    if path is None:
+        return parse_program(code, optimize)
+    
+    try:
+        secret = program_cache_secret()
+        cache_path = program_cache_path(code, path, optimize, secret)
+    except OSError:
+        return parse_program(code, optimize)
+    try:
+        with open(cache_path, 'rb') as f:
+            data = f.read()
+        mac, payload = data[:32], data[32:]
+        if hmac.compare_digest(mac, hmac.new(secret, payload, 'sha256').digest()):
+            version, cached = pickle.loads(payload)
+            if version == PROGRAM_CACHE_VERSION:
+                return cached
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError, ValueError, TypeError):
+        pass
+    
+    result = parse_program(code, optimize)
+    try:
+        write_program_cache(cache_path, secret, result)
+    except (OSError, pickle.PicklingError, RecursionError):
+        pass
+    return result
+
+def write_program_cache(cache_path: str, secret: bytes, result: Tuple[Program, int, int]):
+    directory = os.path.dirname(cache_path)
+    payload = pickle.dumps((PROGRAM_CACHE_VERSION, result), pickle.HIGHEST_PROTOCOL)
+    # Write to a temporary file first so concurrent runs never read a partial entry
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(hmac.new(secret, payload, 'sha256').digest() + payload)
+        os.replace(temp_path, cache_path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    
+    # Earlier entries for the same file and optimize flag can never be hit again
+    file_name = os.path.basename(cache_path)
+    stale = re.compile(re.escape(file_name.rsplit('.', 2)[0]) + r'\.[0-9a-f]{32}\.ast')
+    for name in os.listdir(directory):
+        if name != file_name and stale.fullmatch(name):
+            try:
+                os.unlink(os.path.join(directory, name))
+            except OSError:
+                pass
+
+# ============================================================================
+# INTERACTIVE SESSION
+# ============================================================================
+
+class Session:
+    """Runs each statement or block typed at the prompt as soon as it is complete
+    
+    One Interpreter lives for the whole session, so variables and functions
+    carry over from entry to entry. An entry is complete once it parses; if
+    parsing runs out of input inside a statement or an if, repeat, for each
+    or define block, more lines are read. Each entry is optimized on its own,
+    so single-word prints of names that are undefined so far still read the
+    variable should a later entry define it.
+    """
+    PROMPT = 'spp> '
+    CONTINUATION_PROMPT = '...  '
+    COMMANDS = {
+        ':time': "show how long the last entry took to parse and to run",
+        ':load FILE': "run FILE in this session",
+        ':reload': "run the last loaded file again, redefining its functions",
+        ':vars': "list the global variables",
+        ':cancel': "drop the lines of an unfinished entry",
+        ':reset': "forget every variable and function",
+        ':quit': "end the session (also STOP. or end of input)",
+    }
+    
+    def __init__(self, **options):
+        self.options = options
+        self.interpreter = Interpreter(**options)
+        self.lines: List[str] = []
+        self.timings: Optional[Tuple[float, float]] = None  # Parsing and running the last entry
+        self.loaded: Optional[str] = None
+    
+    def run(self):
+        print("S++ Language Interpreter")
+        print("Statements run as soon as they are complete. Type :help for commands.")
+        while True:
+            try:
+                line = input(self.CONTINUATION_PROMPT if self.lines else self.PROMPT)
+            except EOFError:
+                if self.lines:
+                    self.execute('\n'.join(self.lines), force=True)
+                print()
+                return
+            except KeyboardInterrupt:
+                self.lines = []
+                print()
+                continue
+            if not self.feed(line):
+                return
+    
+    def feed(self, line: str) -> bool:
+        """Take one line of input; returns False once the session should end"""
+        stripped = line.strip()
+        if stripped == 'STOP.' and not self.lines:
+            return False
+        if stripped.startswith(':'):
+            return self.command(stripped)
+        if not self.lines and not stripped:
+            return True
+        self.lines.append(line)
+        if self.execute('\n'.join(self.lines)):
+            self.lines = []
+        return True
+    
+    def execute(self, code: str, force: bool = False) -> bool:
+        """Run code if it is a complete entry and report any error
+        
+        Returns False, having run nothing, when the code ends inside a
+        statement or block, unless force is set.
+        """
+        output = self.interpreter.output
+        try:
+            start = time.perf_counter()
+            program = self.parse(code, force)
+            if program is None:
+                return False
+            if self.options.get('optimize', True):
+                program = Optimizer(whole_program=False).optimize(program)
+            parsed = time.perf_counter()
+            try:
+                self.interpreter.visit(program)
+            finally:
+                self.timings = (parsed - start, time.perf_counter() - parsed)
+                output.flush()
+        except KeyboardInterrupt:
+            print("Interrupted", file=sys.stderr)
+        except Exception as e:
+            print(f"Error: {e}", file=sys.stderr)
+        return True
+    
+    @staticmethod
+    def parse(code: str, force: bool = False) -> Optional[Program]:
+        """The parsed code, or None when parsing ran out of input before it ended"""
+        parser = Parser(Lexer(code))
+        try:
+            return parser.parse()
+        except Exception:
+            if not force and parser.tokens.error is None and parser.current_type == TokenCode.EOF:
+                return None
+            raise
+    
+    def command(self, line: str) -> bool:
+        name, _, argument = line.partition(' ')
+        argument = argument.strip()
+        if name == ':quit':
+            return False
+        if name == ':help':
+            for usage, description in self.COMMANDS.items():
+                print(f"  {usage:<12} {description}")
+        elif name == ':time':
+            if self.timings is None:
+                print("Nothing has run yet")
+            else:
+                parse_time, run_time = self.timings
+                print(f"parse {parse_time * 1000:.3f} ms, run {run_time * 1000:.3f} ms")
+        elif name == ':load' and argument or name == ':reload':
+            path = argument or self.loaded
+            if path is None:
+                print("No file loaded yet; use :load FILE")
+                return True
+            try:
+                with open(path, 'r') as f:
+                    code = f.read()
+            except OSError as e:
+                print(f"Error: {e}", file=sys.stderr)
+                return True
+            self.loaded = path
+            self.lines = []
+            self.execute(code, force=True)
+        elif name == ':vars':
+            for variable, value in self.interpreter.variables.items():
+                print(f"  {variable} = {self.interpreter.format_output(value)}")
+        elif name == ':cancel':
+            self.lines = []
+        elif name == ':reset':
+            self.interpreter = Interpreter(**self.options)
+            self.lines = []
+        else:
+            print(f"Unknown command {line}; type :help for commands")
+        return True
+
+# ============================================================================
+# EMBEDDING
+# ============================================================================
+
+class RunError:
+    """Why a CompiledProgram run stopped early
+    
+    kind is 'return' for a return outside any function and 'error' for
+    everything else. line is that of the top-level statement that was
+    running, which for an error inside a function is the statement that
+    called it.
+    """
+    __slots__ = ('message', 'line', 'kind')
+    
+    def __init__(self, message: str, line: Optional[int], kind: str = 'error'):
+        self.message = message
+        self.line = line
+        self.kind = kind
+    
+    def __str__(self) -> str:
+        return self.message
+    
+    def __repr__(self) -> str:
+        return f"RunError({self.message!r}, line={self.line}, kind={self.kind!r})"
+
+class RunResult:
+    """Output, final global variables and error (or None) of one run"""
+    __slots__ = ('output', 'variables', 'error')
+    
+    def __init__(self, output: Optional[str], variables: Dict[str, Any], error: Optional[RunError]):
+        self.output = output  # None unless the run captured it
+        self.variables = variables
+        self.error = error
+    
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+    
+    def __repr__(self) -> str:
+        return f"RunResult(output={self.output!r}, variables={self.variables!r}, error={self.error!r})"
+
+class CompiledProgram:
+    """A program parsed, optimized and resolved once, to run any number of times
+    
+    The tree is never changed by a run: variables, frames, result caches
+    and loop-invariant values all live in each run's own Interpreter, so
+    one CompiledProgram can run on several threads at once.
+    """
+    def __init__(self, program: Program, optimize: bool = True):
+        self.program = program
+        self.optimize = optimize
+    
+    def run(self, inputs: Optional[Iterable[str]] = None, capture: bool = True, **options) -> RunResult:
+        """Run with inputs answering the ask statements in order
+        
+        With capture, printed output is returned in the result instead of
+        written to stdout. Errors never propagate; they are returned as
+        result.error. options are Interpreter options such as max_steps,
+        max_memory, max_call_depth and memo_size.
+        """
+        sink = io.StringIO() if capture else None
+        output = OutputBuffer(sink, 0 if capture else None)
+        interpreter = Interpreter(optimize=self.optimize, output=output,
+                                  input_source=BatchInput(inputs if inputs is not None else ()), **options)
+        error = None
+        try:
+            interpreter.run_prepared(self.program)
+        except ReturnValue as e:
+            error = RunError(str(e), interpreter.statement.line, 'return')
+        except Exception as e:
+            line = interpreter.statement.line if interpreter.statement else None
+            error = RunError(str(e), line)
+        finally:
+            output.flush()
+        variables = {name: as_python_list(value) for name, value in interpreter.variables.items()}
+        return RunResult(sink.getvalue() if capture else None, variables, error)
+
+def compile_program(source: str, optimize: bool = True) -> CompiledProgram:
+    """Parse source once for CompiledProgram.run(); raises on syntax errors
+    
+    Not named compile, which would shadow the builtin in this module and
+    for anyone who star-imports it.
+    """
+    program, _, _ = parse_program(source, optimize)
+    Interpreter.prepare(program, optimize)
+    return CompiledProgram(program, optimize)
+
+# ============================================================================
+# BATCH RUNNER
+# ============================================================================
+
+# A program's answers come from a file next to it with this suffix, if any
+BATCH_ANSWERS_SUFFIX = '.in'
+DEFAULT_BATCH_TIMEOUT = 10.0
+# Characters of output kept per program, so a runaway print loop cannot fill memory
+BATCH_OUTPUT_LIMIT = 1 << 16
+BATCH_STATUSES = ('ok', 'error', 'timeout', 'crashed')
+BATCH_REPORT_FIELDS = ('file', 'status', 'seconds', 'stdout', 'stderr')
+# Seconds past its timeout after which a program is stuck where the timer
+# cannot interrupt it, inside one long operation, and its worker is killed
+BATCH_KILL_GRACE = 5.0
+# Seconds between checks on the running programs
+BATCH_POLL_INTERVAL = 0.1
+
+class BatchTimeout(BaseException):
+    """Raised inside a batch program whose time is up
+    
+    Not an Exception, so the interpreter's own error handling, which
+    catches Exception, cannot swallow it.
+    """
+
+# In a batch worker, the queue it announces every program it starts on
+batch_worker_started = None
+
+def init_batch_worker(started):
+    global batch_worker_started
+    batch_worker_started = started
+
+class CaptureSink:
+    """Keeps the first limit characters written and drops the rest"""
+    def __init__(self, limit: int = BATCH_OUTPUT_LIMIT):
+        self.parts: List[str] = []
+        self.room = limit
+        self.truncated = False
+    
+    def write(self, text: str):
+        if len(text) > self.room:
+            text = text[:self.room]
+            self.truncated = True
+        self.parts.append(text)
+        self.room -= len(text)
+    
+    def flush(self):
+        pass
+    
+    def getvalue(self) -> str:
+        text = ''.join(self.parts)
+        return text + '[output truncated]\n' if self.truncated else text
+
+def run_batch_program(path: str, name: str, answers: List[str], timeout: Optional[float],
+                      engine: str, options: Dict[str, Any]) -> Dict[str, Any]:
+    """Run one program inside a pool worker and describe how it went
+    
+    The timeout is a SIGALRM timer that raises BatchTimeout inside the
+    running program, so the worker survives it and moves on to the next
+    file. Without SIGALRM, only run_batch() stops a program that runs too
+    long, by killing its worker.
+    """
+    import signal
+    from contextlib import redirect_stderr
+    if batch_worker_started is not None:
+        batch_worker_started.put((name, os.getpid()))
+    answers_path = os.path.splitext(path)[0] + BATCH_ANSWERS_SUFFIX
+    if os.path.exists(answers_path):
+        with open(answers_path, 'r') as f:
+            answers = f.read().splitlines()
+    with open(path, 'r') as f:
+        code = f.read()
+    
+    stdout, stderr = CaptureSink(), CaptureSink()
+    timed_out = False
+    def expire(signum, frame):
+        raise BatchTimeout(f"Timed out after {timeout:g}s")
+    
+    timer = timeout and hasattr(signal, 'setitimer')
+    if timer:
+        signal.signal(signal.SIGALRM, expire)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    start = time.perf_counter()
+    try:
+        try:
+            with redirect_stderr(stderr):
+                run_program(code, engine, output=OutputBuffer(stdout, 0),
+                            input_source=BatchInput(answers), **options)
+        finally:
+            if timer:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+    except BatchTimeout as e:
+        timed_out = True
+        stderr.write(f"Error: {e}\n")
+    seconds = time.perf_counter() - start
+    
+    errors = stderr.getvalue()
+    if timed_out:
+        status = 'timeout'
+    elif errors.startswith('Error: ') or '\nError: ' in errors:
+        status = 'error'
+    else:
+        status = 'ok'
+    return {'file': name, 'status': status, 'seconds': round(seconds, 4),
+            'stdout': stdout.getvalue(), 'stderr': errors}
+
+def run_batch(directory: str, answers: List[str] = (), workers: Optional[int] = None,
+              timeout: Optional[float] = DEFAULT_BATCH_TIMEOUT, engine: str = 'tree',
+              **options) -> List[Dict[str, Any]]:
+    """Run every .spp file under directory on a pool of worker processes
+    
+    Workers are reused from file to file, so each imports the interpreter
+    once. A program reads its answers from a .in file next to it when
+    there is one and from answers otherwise. Results come back in file
+    name order, one dictionary per program with BATCH_REPORT_FIELDS.
+    
+    A worker that dies breaks the whole pool. The programs it took down
+    with it run again on a new pool, and those that were running in any
+    worker when it died run again one at a time, to find the one that
+    crashed it.
+    """
+    import glob
+    paths = sorted(glob.glob(os.path.join(directory, '**', '*.spp'), recursive=True))
+    jobs = [(os.path.relpath(path, directory), path) for path in paths]
+    results: Dict[str, Dict[str, Any]] = {}
+    pending, suspects = jobs, []
+    while pending or suspects:
+        if pending:
+            pending, crashed = run_batch_pool(pending, results, workers, list(answers), timeout, engine, options)
+            suspects += crashed
+        else:
+            run_batch_pool([suspects.pop(0)], results, 1, list(answers), timeout, engine, options)
+    return [results[name] for name, _ in jobs]
+
+def run_batch_pool(jobs: List[Tuple[str, str]], results: Dict[str, Dict[str, Any]], workers: Optional[int],
+                   answers: List[str], timeout: Optional[float], engine: str,
+                   options: Dict[str, Any]) -> Tuple[list, list]:
+    """Run (name, path) jobs on a new pool until they finish or it breaks
+    
+    Adds a result for every job it can account for and returns the jobs to
+    run again and those that may have crashed a worker. A worker still on
+    a program BATCH_KILL_GRACE seconds after its timeout is killed, and the
+    program timed out.
+    """
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+    from concurrent.futures.process import BrokenProcessPool
+    import multiprocessing
+    import signal
+    started = multiprocessing.SimpleQueue()
+    running: Dict[str, Tuple[int, float]] = {}
+    killed: Dict[str, float] = {}
+    broken = False
+    
+    def note_started():
+        while not started.empty():
+            name, pid = started.get()
+            running[name] = (pid, time.monotonic())
+    
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=init_batch_worker, initargs=(started,))
+    try:
+        pending = {pool.submit(run_batch_program, path, name, answers, timeout, engine, options): (name, path)
+                   for name, path in jobs}
+        while pending and not broken:
+            done, _ = wait(pending, timeout=BATCH_POLL_INTERVAL, return_when=FIRST_COMPLETED)
+            note_started()
+            for future in done:
+                if isinstance(future.exception(), BrokenProcessPool):
+                    # Every unfinished future fails once the pool has shut down
+                    broken = True
+                else:
+                    name, _ = pending.pop(future)
+                    results[name] = batch_result(name, future)
+            
+            if timeout and not broken:
+                now = time.monotonic()
+                for name, _ in pending.values():
+                    if name in running and name not in killed:
+                        pid, start = running[name]
+                        if now - start > timeout + BATCH_KILL_GRACE:
+                            killed[name] = now - start
+                            try:
+                                os.kill(pid, getattr(signal, 'SIGKILL', signal.SIGTERM))
+                            except OSError:
+                                pass
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+    # The worker that died may have started its program after the last look
+    note_started()
+    
+    unfinished = []
+    for future, (name, path) in pending.items():
+        error = future.exception()
+        if error is not None and name in killed:
+            results[name] = batch_failure(name, 'timeout', f"Timed out after {timeout:g}s", killed[name])
+        elif isinstance(error, BrokenProcessPool):
+            unfinished.append((name, path))
+        else:
+            results[name] = batch_result(name, future)
+    if not unfinished or killed:
+        # Killing a stuck worker broke the pool, so the others are innocent
+        return unfinished, []
+    suspects = [job for job in unfinished if job[0] in running] or unfinished
+    if len(suspects) == 1:
+        name = suspects[0][0]
+        results[name] = batch_failure(name, 'crashed', "The worker process running the program died")
+        unfinished.remove(suspects[0])
+        suspects = []
+    return [job for job in unfinished if job not in suspects], suspects
+
+def batch_result(name: str, future) -> Dict[str, Any]:
+    error = future.exception()
+    if error is None:
+        return future.result()
+    # The program never ran, say because its file could not be read
+    return batch_failure(name, 'crashed', str(error) or type(error).__name__)
+
+def batch_failure(name: str, status: str, message: str, seconds: float = 0.0) -> Dict[str, Any]:
+    return {'file': name, 'status': status, 'seconds': round(seconds, 4),
+            'stdout': '', 'stderr': f"Error: {message}\n"}
+
+def batch_summary(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    summary = {'programs': len(results)}
+    for status in BATCH_STATUSES:
+        summary[status] = sum(1 for result in results if result['status'] == status)
+    summary['seconds'] = round(sum(result['seconds'] for result in results), 4)
+    return summary
+
+def write_batch_report(results: List[Dict[str, Any]], path: str):
+    """Write results as CSV when path ends in .csv and as JSON otherwise"""
+    if path.lower().endswith('.csv'):
+        import csv
+        with open(path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=BATCH_REPORT_FIELDS)
+            writer.writeheader()
+            writer.writerows(results)
+    else:
+        import json
+        with open(path, 'w') as f:
+            json.dump({'summary': batch_summary(results), 'programs': results}, f, indent=2)
+            f.write('\n')
+
+def print_batch_results(results: List[Dict[str, Any]]):
+    for result in results:
+        print(f"{result['status']:<8} {result['seconds']:>9.3f}s  {result['file']}")
+    summary = batch_summary(results)
+    print(f"{summary['programs']} programs: "
+          + ', '.join(f"{summary[status]} {status}" for status in BATCH_STATUSES)
+          + f" ({summary['seconds']:.3f}s of run time)")
+
+# ============================================================================
+# MAIN
+# ============================================================================
+
+def run_tree(ast: Program, max_call_depth: Optional[int] = DEFAULT_MAX_CALL_DEPTH,
+             memo_size: Optional[int] = DEFAULT_MEMO_SIZE, memo_stats: bool = False, optimize: bool = True,
+             output: Optional[OutputBuffer] = None, input_source: Any = None,
+             profiler: Optional[Profiler] = None, hooks: Optional[Hooks] = None,
+             max_steps: Optional[int] = None, max_memory: Optional[int] = None):
+    if profiler and hooks:
+        raise Exception("Profiling and hooks cannot be combined")
+    args = (max_call_depth, memo_size, optimize, output, input_source, max_steps, max_memory)
+    if hooks:
+        interpreter = HookedInterpreter(hooks, *args)
+    elif profiler:
+        interpreter = ProfilingInterpreter(profiler, *args)
+        profiler.start()
+    else:
+        interpreter = Interpreter(*args)
+    try:
+        interpreter.visit(ast)
+    finally:
+        if profiler:
+            profiler.stop()
+        if memo_stats:
+            for name, stats in interpreter.memo_stats().items():
+                counts = ' '.join(f'{key}={value}' for key, value in stats.items())
+                print(f"memo {name}: {counts}", file=sys.stderr)
+
+def run_closure(ast: Program, output: Optional[OutputBuffer] = None, input_source: Any = None):
+    ClosureCompiler(output, input_source).compile_program(ast)({})
+
+def run_vm(ast: Program, max_call_depth: Optional[int] = DEFAULT_MAX_CALL_DEPTH,
+           output: Optional[OutputBuffer] = None, input_source: Any = None):
+    VirtualMachine(max_call_depth, output, input_source).run(Compiler().compile_program(ast))
+
+def run_python(ast: Program, output: Optional[OutputBuffer] = None, input_source: Any = None):
+    run_python_source(PythonTranspiler().transpile(ast), output=output, input_source=input_source)
+
+ENGINES = {
+    'tree': run_tree,
+    'closure': run_closure,
+    'vm': run_vm,
+    'python': run_python,
+}
+
+# Keyword options each engine accepts; run_program drops the rest
+ENGINE_OPTIONS = {
+    'tree': {'max_call_depth', 'memo_size', 'memo_stats', 'optimize', 'output', 'input_source',
+             'profiler', 'hooks', 'max_steps', 'max_memory'},
+    'closure': {'output', 'input_source'},
+    'vm': {'max_call_depth', 'output', 'input_source'},
+    'python': {'output', 'input_source'},
+}
+# Options other engines would silently drop, so run_program refuses them instead
+TREE_ONLY_OPTIONS = ('profiler', 'hooks', 'max_steps', 'max_memory')
+# Interpreter options an interactive Session passes on
+SESSION_OPTIONS = ('max_call_depth', 'memo_size', 'optimize', 'output', 'input_source', 'max_steps', 'max_memory')
+
+def run_program(code: str, engine: str = 'tree', python_cache: Optional[str] = None,
+                optimize: bool = True, optimize_stats: bool = False, path: Optional[str] = None,
+                output: Optional[OutputBuffer] = None, input_source: Any = None, **options):
+    """Run S++ source; when path is given, the parsed program is cached under program_cache_dir()
+    
+    Printed lines go through output, by default a buffer on stdout that is
+    flushed per line on a terminal and otherwise when the program ends.
+    Answers to ask statements come from input_source, by default a
+    PromptInput that shows each prompt and reads stdin; pass a BatchInput to
+    read them from a file or list without prompts.
+    
+    Pass hooks, a Hooks object, to have Python callbacks see statements,
+    calls, output, input and variable writes. max_steps stops the program
+    after that many loop iterations and calls, and max_memory when a
+    variable a loop assigns or a call receives grows past that many bytes.
+    These options need the tree engine.
+    """
+    output = output or OutputBuffer()
+    try:
+        try:
+            for name in TREE_ONLY_OPTIONS:
+                if options.get(name) is not None and engine != 'tree':
+                    raise Exception(f"{name} needs the tree engine, not '{engine}'")
+            if engine == 'python' and python_cache:
+                run_python_source(*transpile_to_python(code, python_cache, optimize), output=output,
+                                  input_source=input_source)
+                return
+            ast, removed, total = load_program(code, path, optimize)
+            if optimize and optimize_stats:
+                print(f"optimizer: removed {removed} of {total} nodes", file=sys.stderr)
+            options.update(optimize=optimize, output=output, input_source=input_source)
+            ENGINES[engine](ast, **{name: value for name, value in options.items()
+                                    if name in ENGINE_OPTIONS[engine]})
+        finally:
+            # Everything printed appears before any error message
+            output.flush()
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+
+def main(argv: Optional[List[str]] = None):
+    import argparse
+    arg_parser = argparse.ArgumentParser(description="S++ Language Interpreter")
+    arg_parser.add_argument('file', nargs='?', help="S++ program to run; starts an interactive session if omitted")
+    arg_parser.add_argument('--engine', choices=sorted(ENGINES), default='tree',
+                            help="execution engine: 'tree' walks the AST, 'closure' runs pre-built Python "
+                                 "closures, 'vm' runs compiled bytecode, 'python' transpiles to Python")
+    arg_parser.add_argument('--python-cache', metavar='DIR',
+                            help="with --engine=python, keep generated Python modules in DIR and "
+                                 "reuse them while the source is unchanged")
+    arg_parser.add_argument('--max-call-depth', type=int, default=DEFAULT_MAX_CALL_DEPTH, metavar='N',
+                            help="with the tree or vm engine, stop with an error when calls nest deeper "
+                                 f"than N (default {DEFAULT_MAX_CALL_DEPTH}; 0 for no limit)")
+    arg_parser.add_argument('--memo-size', type=int, default=DEFAULT_MEMO_SIZE, metavar='N',
+                            help="with the tree engine, cache up to N results per pure function "
+                                 f"(default {DEFAULT_MEMO_SIZE})")
+    arg_parser.add_argument('--no-memo', action='store_true',
+                            help="turn off result caching of pure functions")
+    arg_parser.add_argument('--memo-stats', action='store_true',
+                            help="print cache hits, misses and evictions per function to stderr")
+    arg_parser.add_argument('--no-optimize', action='store_true',
+                            help="run the program as parsed, without constant folding and dead-branch removal")
+    arg_parser.add_argument('--optimize-stats', action='store_true',
+                            help="print how many AST nodes the optimizer removed to stderr")
+    arg_parser.add_argument('--output', metavar='FILE',
+                            help="write the program's output to FILE instead of stdout")
+    arg_parser.add_argument('--input', metavar='FILE',
+                            help="read answers to ask statements from FILE, one per line, without showing "
+                                 "prompts; '-' reads them from stdin")
+    arg_parser.add_argument('--flush-every', type=int, metavar='N',
+                            help="pass output on after every N printed lines; 0 holds it until the program "
+                                 "ends or asks (default: 1 on a terminal, otherwise 0)")
+    arg_parser.add_argument('--max-steps', type=int, metavar='N',
+                            help="with the tree engine, stop with an error after N loop iterations and "
+                                 "function calls")
+    arg_parser.add_argument('--max-memory', type=float, metavar='MB',
+                            help="with the tree engine, stop with an error when a variable that a loop "
+                                 "assigns or a call receives holds more than MB megabytes")
+    arg_parser.add_argument('--profile', action='store_true',
+                            help="with the tree engine, print execution counts and times per source line "
+                                 "and per function to stderr")
+    arg_parser.add_argument('--profile-stacks', metavar='FILE',
+                            help="with --profile, also write time per call stack to FILE in the collapsed "
+                                 "format flame graph tools read")
+    arg_parser.add_argument('--batch', metavar='DIR',
+                            help="run every .spp file under DIR on a pool of worker processes and report "
+                                 "each one's status and output; answers come from a .in file next to each "
+                                 "program, or else from --input")
+    arg_parser.add_argument('--workers', type=int, metavar='N',
+                            help="with --batch, the number of worker processes (default: one per CPU)")
+    arg_parser.add_argument('--timeout', type=float, default=DEFAULT_BATCH_TIMEOUT, metavar='SECONDS',
+                            help=f"with --batch, stop a program that runs longer than this "
+                                 f"(default {DEFAULT_BATCH_TIMEOUT:g}; 0 for no limit)")
+    arg_parser.add_argument('--report', metavar='FILE',
+                            help="with --batch, also write the results to FILE, as CSV if it ends in .csv "
+                                 "and otherwise as JSON")
+    arg_parser.add_argument('--no-cache', action='store_true',
+                            help="always lex and parse the file instead of reusing the program saved in "
+                                 "the user's program cache")
+    args = arg_parser.parse_args(argv)
+    if (args.profile or args.profile_stacks) and args.engine != 'tree':
+        arg_parser.error("--profile needs --engine=tree")
+    if (args.max_steps is not None or args.max_memory is not None) and args.engine != 'tree':
+        arg_parser.error("--max-steps and --max-memory need --engine=tree")
+    if not args.file and not args.batch:
+        if args.engine != 'tree':
+            arg_parser.error("interactive sessions run on the tree engine")
+        if args.profile or args.profile_stacks:
+            arg_parser.error("--profile needs a program file")
+    options = {
+        'optimize': not args.no_optimize,
+        'optimize_stats': args.optimize_stats,
+        'max_call_depth': args.max_call_depth or None,
+        'memo_size': 0 if args.no_memo else args.memo_size,
+        'memo_stats': args.memo_stats,
+    }
+    if args.max_steps is not None:
+        options['max_steps'] = args.max_steps
+    if args.max_memory is not None:
+        options['max_memory'] = int(args.max_memory * (1 << 20))
+    if args.batch:
+        if args.file:
+            arg_parser.error("--batch runs a directory of programs; do not also give a file")
+        if args.profile or args.profile_stacks:
+            arg_parser.error("--profile cannot be used with --batch")
+        answers = []
+        if args.input == '-':
+            answers = sys.stdin.read().splitlines()
+        elif args.input:
+            with open(args.input, 'r') as f:
+                answers = f.read().splitlines()
+        results = run_batch(args.batch, answers, args.workers, args.timeout or None, args.engine,
+                            python_cache=args.python_cache, **options)
+        print_batch_results(results)
+        if args.report:
+            write_batch_report(results, args.report)
+        return
+    
+    sink = open(args.output, 'w') if args.output else None
+    options['output'] = OutputBuffer(sink, args.flush_every)
+    answers = None
+    if args.input:
+        answers = sys.stdin if args.input == '-' else open(args.input, 'r')
+        options['input_source'] = BatchInput(answers)
+    profiler = Profiler() if args.profile or args.profile_stacks else None
+    if profiler:
+        options['profiler'] = profiler
+    try:
+        if args.file:
+            with open(args.file, 'r') as f:
+                code = f.read()
+            path = None if args.no_cache else args.file
+            run_program(code, args.engine, args.python_cache, path=path, **options)
+        else:
+            Session(**{name: value for name, value in options.items() if name in SESSION_OPTIONS}).run()
+        if profiler:
+            profiler.report(code)
+            if args.profile_stacks:
+                profiler.write_stacks(args.profile_stacks)
+    finally:
+        if sink:
+            sink.close()
+        if answers and answers is not sys.stdin:
+            answers.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""Helpers shared by the test modules"""
+
+import contextlib
+import glob
+import io
+import os
+import sys
+from typing import Iterable, List, Tuple
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(TESTS_DIR)
+sys.path.insert(0, REPO_DIR)
+
+import interpreter as spp
+
+ENGINES = ('tree', 'closure', 'vm', 'python')
+
+# Answers for example programs that ask for input
+EXAMPLE_ANSWERS = {
+    '08_calculator.spp': ['10', '5', '7', '0', '2.5', '2'],
+}
+
+def examples() -> List[Tuple[str, str, List[str]]]:
+    """Name, source and ask answers of every example program"""
+    result = []
+    for path in sorted(glob.glob(os.path.join(REPO_DIR, 'examples', '*.spp'))):
+        name = os.path.basename(path)
+        with open(path, 'r') as f:
+            result.append((name, f.read(), EXAMPLE_ANSWERS.get(name, [])))
+    return result
+
+def run(source: str, engine: str = 'tree', inputs: Iterable[str] = (), **options) -> str:
+    """What run_program prints, with any error line after the output"""
+    sink = io.StringIO()
+    with contextlib.redirect_stderr(sink):
+        spp.run_program(source, engine, output=spp.OutputBuffer(sink, 0),
+                        input_source=spp.BatchInput(list(inputs)), **options)
+    return sink.getvalue()
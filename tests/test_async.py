@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+
+from support import examples, run, spp
+from test_engines import PROGRAMS
+
+class Reader:
+    """Answers readline() from a list, letting other tasks run first"""
+    def __init__(self, lines):
+        self.lines = list(lines)
+
+    async def readline(self):
+        await asyncio.sleep(0)
+        return self.lines.pop(0) + '\n' if self.lines else ''
+
+class Writer:
+    def __init__(self):
+        self.parts = []
+
+    def write(self, text):
+        self.parts.append(text)
+
+    async def drain(self):
+        pass
+
+    def getvalue(self):
+        return ''.join(self.parts)
+
+def run_async(source, inputs=(), **options):
+    writer = Writer()
+    asyncio.run(spp.run_program_async(source, Reader(inputs), writer, **options))
+    return writer.getvalue()
+
+@pytest.mark.parametrize('name, source, answers', examples(), ids=lambda value: value if isinstance(value, str) else '')
+def test_examples_match_sync(name, source, answers):
+    output = run_async(source, answers)
+    # Async runs show the ask prompts, as an interactive run would
+    for prompt in ('enter first number ', 'enter second number '):
+        output = output.replace(prompt, '')
+    assert output == run(source, inputs=answers)
+
+@pytest.mark.parametrize('optimize', [True, False])
+@pytest.mark.parametrize('name', PROGRAMS)
+def test_programs_match_sync(name, optimize):
+    assert run_async(PROGRAMS[name], optimize=optimize) == run(PROGRAMS[name], optimize=optimize)
+
+# Loop invariants hold for one run of their loop, here one outer iteration
+NESTED_LOOPS = {
+    'repeat while in repeat times': 'set n to 0.\nrepeat 3 times\n  set n to n plus 1.\n  set k to n.\n  set j to 0.\n'
+                                    '  repeat while j is less than k times 2\n    set j to j plus 1.\n  end.\n'
+                                    '  print j.\nend.\n',
+    'repeat times in repeat while': 'set n to 0.\nrepeat while n is less than 3\n  set n to n plus 1.\n  set t to 0.\n'
+                                    '  set m to n plus 1.\n  repeat m times\n    set t to t plus n times 10.\n  end.\n'
+                                    '  print t.\nend.\n',
+}
+
+@pytest.mark.parametrize('name', NESTED_LOOPS)
+def test_nested_loop_invariants_match_sync(name):
+    source = NESTED_LOOPS[name]
+    assert run_async(source) == run(source) == run(source, optimize=False)
+
+def test_ask_awaits_the_reader():
+    assert run_async('ask your name and store in n.\nprint n.\n', ['Ada']) == 'your name Ada\n'
+    assert run_async('ask q and store in n.\n') == "q Error: No input left for ask 'q'\n"
+
+def test_options_reach_the_interpreter():
+    source = 'set i to 0.\nrepeat while 1 equals 1\n  set i to i plus 1.\nend.\n'
+    assert run_async(source, max_steps=100) == run(source, max_steps=100)
+
+def test_programs_run_concurrently():
+    source = 'set i to 0.\nrepeat while i is less than 300\n  set i to i plus 1.\nend.\nask q and store in a.\nprint a.\n'
+
+    async def main():
+        writers = [Writer() for _ in range(50)]
+        await asyncio.gather(*(spp.run_program_async(source, Reader([str(k)]), writer, yield_every=10)
+                               for k, writer in enumerate(writers)))
+        return [writer.getvalue() for writer in writers]
+    assert asyncio.run(main()) == [f'q {k}\n' for k in range(50)]
+
+def test_flat_programs_let_other_tasks_run():
+    source = 'print 1.\n' * 1000
+
+    async def main():
+        ticks = 0
+        task = asyncio.ensure_future(spp.run_program_async(source, Reader([]), Writer(), yield_every=10))
+        while not task.done():
+            ticks += 1
+            await asyncio.sleep(0)
+        return ticks
+    assert asyncio.run(main()) >= 100
@@ -0,0 +1,84 @@
+import csv
+import json
+import multiprocessing
+import os
+import signal
+
+import pytest
+
+from support import spp
+
+# The hang and crash tests patch the interpreter, which workers only see when forked
+needs_fork = pytest.mark.skipif(multiprocessing.get_start_method() != 'fork',
+                                reason='needs fork workers')
+
+LOOP = 'set i to 0.\nrepeat while 1 equals 1\n  set i to i plus 1.\nend.\n'
+run_batch_program = spp.run_batch_program
+
+def crash_or_run(path, name, *args):
+    if name.startswith('crash'):
+        # Die the way a crash inside the program would, after the start is noted
+        spp.batch_worker_started.put((name, os.getpid()))
+        os._exit(1)
+    return run_batch_program(path, name, *args)
+
+def write(directory, files):
+    for name, source in files.items():
+        path = directory / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(source)
+    return str(directory)
+
+def statuses(results):
+    return {result['file']: result['status'] for result in results}
+
+def test_statuses_and_answers(tmp_path):
+    directory = write(tmp_path, {'ok.spp': 'print 1.\n', 'error.spp': 'set x to call missing.\n',
+                                 'loop.spp': LOOP, 'sub/ask.spp': 'ask q and store in a.\nprint a.\n',
+                                 'sub/ask.in': 'hi\n'})
+    results = spp.run_batch(directory, workers=2, timeout=0.5)
+    assert statuses(results) == {'error.spp': 'error', 'loop.spp': 'timeout', 'ok.spp': 'ok',
+                                 os.path.join('sub', 'ask.spp'): 'ok'}
+    assert results[1]['stderr'] == 'Error: Timed out after 0.5s\n'
+    assert results[3]['stdout'].endswith('hi\n')
+
+def test_reports(tmp_path):
+    directory = write(tmp_path / 'programs', {'a.spp': 'ask q and store in a.\nprint a.\n', 'b.spp': 'print b.\n'})
+    results = spp.run_batch(directory, answers=['7'], workers=1)
+    summary = spp.batch_summary(results)
+    assert (summary['programs'], summary['ok']) == (2, 2)
+    assert results[0]['stdout'] == '7\n'
+    spp.write_batch_report(results, str(tmp_path / 'report.json'))
+    assert json.loads((tmp_path / 'report.json').read_text())['summary'] == summary
+    spp.write_batch_report(results, str(tmp_path / 'report.csv'))
+    with open(tmp_path / 'report.csv', newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert [(row['file'], row['status'], row['stdout']) for row in rows] == [('a.spp', 'ok', '7\n'),
+                                                                              ('b.spp', 'ok', 'b\n')]
+
+def test_timeout_is_not_an_exception():
+    # The interpreter's handlers catch Exception and must not swallow it
+    assert issubclass(spp.BatchTimeout, BaseException)
+    assert not issubclass(spp.BatchTimeout, Exception)
+
+@needs_fork
+def test_stuck_worker_is_killed(tmp_path, monkeypatch):
+    # Without the timer, the loop is as stuck as one long C-level operation
+    monkeypatch.setattr(signal, 'setitimer', lambda *args: (0.0, 0.0))
+    monkeypatch.setattr(spp, 'BATCH_KILL_GRACE', 0.3)
+    files = {f'ok{k}.spp': f'print {k}.\n' for k in range(4)}
+    directory = write(tmp_path, {**files, 'loop.spp': LOOP})
+    results = spp.run_batch(directory, workers=2, timeout=0.3)
+    assert statuses(results) == {'loop.spp': 'timeout', **{name: 'ok' for name in files}}
+    assert [result['stdout'] for result in results if result['file'] != 'loop.spp'] == \
+        ['0\n', '1\n', '2\n', '3\n']
+
+@needs_fork
+@pytest.mark.parametrize('crashes', [1, 2])
+def test_crash_only_fails_its_program(tmp_path, monkeypatch, crashes):
+    monkeypatch.setattr(spp, 'run_batch_program', crash_or_run)
+    files = {f'ok{k}.spp': f'print {k}.\n' for k in range(6)}
+    crashed = {f'crash{k}.spp': 'print 1.\n' for k in range(crashes)}
+    directory = write(tmp_path, {**files, **crashed})
+    results = spp.run_batch(directory, workers=2, timeout=5)
+    assert statuses(results) == {**{name: 'crashed' for name in crashed}, **{name: 'ok' for name in files}}
@@ -0,0 +1,106 @@
+import os
+import pickle
+
+import pytest
+
+from support import run, spp
+
+SOURCE = 'set x to 2 plus 3.\nprint x.\n'
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    directory = tmp_path / 'cache'
+    monkeypatch.setenv('SPP_CACHE_DIR', str(directory))
+    return str(directory)
+
+@pytest.fixture
+def source_file(tmp_path):
+    path = tmp_path / 'program.spp'
+    path.write_text(SOURCE)
+    return str(path)
+
+def test_writes_and_reuses_entry(source_file, monkeypatch):
+    program, removed, total = spp.load_program(SOURCE, source_file)
+    assert os.path.exists(spp.program_cache_path(SOURCE, source_file, True))
+
+    def fail(*args, **kwargs):
+        raise AssertionError('parsed although the entry is cached')
+    monkeypatch.setattr(spp, 'parse_program', fail)
+    cached, cached_removed, cached_total = spp.load_program(SOURCE, source_file)
+    assert (cached_removed, cached_total) == (removed, total)
+    assert run(SOURCE, path=source_file) == '5\n'
+
+def test_key_covers_source_and_optimize(source_file):
+    path = spp.program_cache_path(SOURCE, source_file, True)
+    assert path != spp.program_cache_path(SOURCE, source_file, False)
+    assert path != spp.program_cache_path(SOURCE + 'print 1.\n', source_file, True)
+
+def test_entries_live_in_the_private_cache(source_file, cache_dir, tmp_path):
+    spp.load_program(SOURCE, source_file)
+    assert os.path.dirname(spp.program_cache_path(SOURCE, source_file, True)) == cache_dir
+    assert sorted(os.listdir(tmp_path)) == ['cache', 'program.spp']
+    if hasattr(os, 'getuid'):
+        assert os.stat(cache_dir).st_mode & 0o777 == 0o700
+
+def test_names_depend_on_the_secret(source_file, cache_dir):
+    path = spp.program_cache_path(SOURCE, source_file, True)
+    with open(os.path.join(cache_dir, 'key'), 'wb') as f:
+        f.write(os.urandom(spp.PROGRAM_CACHE_SECRET_SIZE))
+    assert spp.program_cache_path(SOURCE, source_file, True) != path
+
+def test_unsigned_entry_is_not_unpickled(source_file, monkeypatch):
+    cache_path = spp.program_cache_path(SOURCE, source_file, True)
+    program = spp.parse_program('print planted.\n')
+    with open(cache_path, 'wb') as f:
+        f.write(bytes(32) + pickle.dumps((spp.PROGRAM_CACHE_VERSION, program)))
+
+    def fail(*args, **kwargs):
+        raise AssertionError('unpickled an unsigned entry')
+    monkeypatch.setattr(spp.pickle, 'loads', fail)
+    assert run(SOURCE, path=source_file) == '5\n'
+
+@pytest.mark.skipif(not hasattr(os, 'getuid'), reason='needs POSIX permissions')
+def test_shared_cache_is_not_used(source_file, cache_dir, monkeypatch):
+    os.makedirs(cache_dir, mode=0o700)
+    os.chmod(cache_dir, 0o777)
+
+    def fail(*args, **kwargs):
+        raise AssertionError('read the shared cache')
+    monkeypatch.setattr(spp.pickle, 'loads', fail)
+    assert run(SOURCE, path=source_file) == run(SOURCE, path=source_file) == '5\n'
+    assert os.listdir(cache_dir) == []
+
+def test_unreadable_entry_is_a_miss(source_file):
+    cache_path = spp.program_cache_path(SOURCE, source_file, True)
+    spp.load_program(SOURCE, source_file)
+    with open(cache_path, 'wb') as f:
+        f.write(b'not a cache entry')
+    program, _, _ = spp.load_program(SOURCE, source_file)
+    assert isinstance(program, spp.Program)
+
+def test_editing_the_file_replaces_its_entry(source_file):
+    spp.load_program(SOURCE, source_file)
+    edited = SOURCE + 'print 1.\n'
+    spp.load_program(edited, source_file)
+    assert not os.path.exists(spp.program_cache_path(SOURCE, source_file, True))
+    assert os.path.exists(spp.program_cache_path(edited, source_file, True))
+
+def test_cleanup_keeps_other_files_and_flags(source_file, tmp_path):
+    other_dir = tmp_path / 'other'
+    other_dir.mkdir()
+    same_name = str(other_dir / 'program.spp')
+    sibling = str(tmp_path / 'program.spp2')
+    kept = [(SOURCE, source_file, False), (SOURCE, same_name, True), (SOURCE, sibling, True)]
+    for code, path, optimize in kept:
+        spp.load_program(code, path, optimize)
+    spp.load_program(SOURCE + 'print 1.\n', source_file)
+    for code, path, optimize in kept:
+        assert os.path.exists(spp.program_cache_path(code, path, optimize))
+
+def test_cached_program_runs_like_a_parsed_one(source_file):
+    source = 'define f with n\n  return n times 2.\nend.\nset i to 0.\nrepeat while i is less than 3\n' \
+             '  set y to call f with i.\n  print y.\n  set i to i plus 1.\nend.\n'
+    with open(source_file, 'w') as f:
+        f.write(source)
+    first = run(source, path=source_file)
+    assert run(source, path=source_file) == first == run(source)
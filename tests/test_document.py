@@ -0,0 +1,64 @@
+import copy
+import random
+
+import pytest
+
+from support import examples, spp
+
+SNIPPETS = ['.', ' ', '\n', 'end.', 'end', 'if x then\n', 'otherwise\n', '//', '// c\n', '5', '1.', '$',
+            'print a.', 'set y to 2', 'define g with a\n', 'repeat 3 times\n', 'call f with 1', ',', 'plus',
+            'divided', ' by', 'is', ' greater than ', 'é']
+
+def dump(value):
+    """Comparable form of tokens and trees"""
+    if isinstance(value, list):
+        return [dump(item) for item in value]
+    if isinstance(value, spp.Token):
+        return (value.type, value.value)
+    if isinstance(value, spp.ASTNode):
+        fields = {name: getattr(value, name) for name in value.fields} if value.fields else vars(value)
+        return (type(value).__name__, value.line, {name: dump(field) for name, field in sorted(fields.items())})
+    return value
+
+def state(document: spp.Document):
+    """Tokens, errors and positioned statements of a document"""
+    tokens = [(token.type, token.value, token.line, token.column) for token in document.tokens()]
+    statements = []
+    for index, segment in enumerate(document.segments):
+        if segment.statement is not None:
+            statement = copy.deepcopy(segment.statement)
+            spp.shift_lines([statement], document.line_of(index) - segment.line)
+            statements.append((document.start_of(index), dump(statement)))
+    return tokens, document.errors(), statements
+
+def test_fresh_document_matches_parser():
+    for name, source, _ in examples():
+        document = spp.Document(source)
+        assert document.errors() == []
+        assert dump(document.program().statements) == dump(spp.Parser(spp.Lexer(source)).parse().statements)
+
+def test_errors_are_reported_not_raised():
+    document = spp.Document('set x to 1.\nset y to .\nprint x.\n$\n')
+    lines = [line for line, _, _ in document.errors()]
+    assert lines == [2, 4]
+    assert len(list(document.statements())) == 2
+
+@pytest.mark.parametrize('seed', range(6))
+def test_random_edits_match_full_parse(seed):
+    rng = random.Random(seed)
+    sources = [source for _, source, _ in examples()]
+    for _ in range(25):
+        text = rng.choice(sources)
+        if rng.random() < 0.5:
+            text = text[rng.randrange(len(text)):][:rng.randint(0, 2000)]
+        document = spp.Document(text)
+        for _ in range(rng.randint(1, 12)):
+            length = len(document.text)
+            start = rng.randint(0, length)
+            end = min(length, start + rng.choice([0, 0, 1, 2, 5, 30]))
+            if rng.random() < 0.9:
+                new = ''.join(rng.choice(SNIPPETS) for _ in range(rng.choice([0, 1, 1, 2])))
+            else:
+                new = document.text[rng.randint(0, length):][:rng.randint(0, 50)]
+            document.edit(start, end, new)
+            assert state(document) == state(spp.Document(document.text))
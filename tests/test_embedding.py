@@ -0,0 +1,62 @@
+import threading
+
+import pytest
+
+from support import examples, run, spp
+from test_engines import PROGRAMS
+
+@pytest.mark.parametrize('name, source, answers', examples(), ids=lambda value: value if isinstance(value, str) else '')
+def test_examples_match_run_program(name, source, answers):
+    result = spp.compile_program(source).run(inputs=answers)
+    assert result.ok
+    assert result.output == run(source, inputs=answers)
+
+@pytest.mark.parametrize('name', PROGRAMS)
+def test_programs_match_run_program(name):
+    result = spp.compile_program(PROGRAMS[name]).run()
+    error = f'Error: {result.error}\n' if result.error else ''
+    assert result.output + error == run(PROGRAMS[name])
+
+def test_builtin_compile_is_not_shadowed():
+    assert 'compile' not in vars(spp)
+
+def test_errors_carry_the_line():
+    result = spp.compile_program('set x to 1.\nset y to call missing.\n').run()
+    assert not result.ok
+    assert (result.error.message, result.error.line, result.error.kind) == \
+        ("Function 'missing' not defined", 2, 'error')
+    assert result.variables == {'x': 1}
+
+def test_top_level_return_is_reported():
+    result = spp.compile_program('set x to 5.\nreturn x plus 1.\n').run()
+    assert (result.error.message, result.error.line, result.error.kind) == ('6', 2, 'return')
+
+def test_runs_start_fresh():
+    program = spp.compile_program('ask n and store in n.\nset t to n times 2.\nset xs to 1, 2.\n')
+    first = program.run(inputs=['3'])
+    second = program.run(inputs=['4'])
+    assert first.variables == {'n': 3, 't': 6, 'xs': [1, 2]}
+    assert second.variables == {'n': 4, 't': 8, 'xs': [1, 2]}
+    assert not program.run().ok
+
+def test_options_reach_the_interpreter():
+    result = spp.compile_program('repeat while 1 equals 1\n  set i to 1.\nend.\n').run(max_steps=50)
+    assert result.error.message == 'Step limit of 50 exceeded in the loop on line 1'
+
+def test_concurrent_runs_match_sequential_ones():
+    # Loop invariants are cached per run, so threads must not see each other's
+    source = ('ask k and store in k.\nset t to 0.\nset i to 0.\nrepeat while i is less than 2000\n'
+              '  set t to t plus k times 3.\n  set i to i plus 1.\nend.\nprint t.\n')
+    program = spp.compile_program(source)
+    expected = {k: program.run(inputs=[str(k)]).output for k in range(16)}
+    results = {}
+
+    def work(k):
+        for _ in range(5):
+            results.setdefault(k, set()).add(program.run(inputs=[str(k)]).output)
+    threads = [threading.Thread(target=work, args=(k,)) for k in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == {k: {output} for k, output in expected.items()}
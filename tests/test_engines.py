@@ -0,0 +1,51 @@
+import pytest
+
+from support import ENGINES, examples, run
+
+PROGRAMS = {
+    'arithmetic': 'set a to 7.\nset b to 2.\nprint a plus b times 3.\nprint a minus b.\nprint a divided by b.\n',
+    'division by zero': 'set a to 5.\nset b to 0.\nprint a divided by b.\n',
+    'literal fallback': 'print hello world.\nset name to Ada.\nprint name.\n',
+    'comparisons': 'set a to 3.\nif a is greater than 2 then\n  print big.\notherwise\n  print small.\nend.\n'
+                   'print a equals 3.\nprint a is less than 1 or a equals 3.\nprint not a equals 3.\n',
+    'lists': 'set xs to 1, 2, 3.\nset ys to xs times 2.\nprint ys.\nset total to 0.\n'
+             'for each x in ys\n  set total to total plus x.\nend.\nprint total.\n',
+    'counting loop': 'set i to 0.\nset total to 0.\nrepeat while i is less than 100\n'
+                     '  set total to total plus i.\n  set i to i plus 1.\nend.\nprint total.\nprint i.\n',
+    'recursion': 'define fact with n\n  if n is less than 2 then\n    return 1.\n  end.\n'
+                 '  set rest to call fact with n minus 1.\n  return n times rest.\nend.\n'
+                 'set x to call fact with 10.\nprint x.\n',
+    'not over a call': 'define zero\n  return 0.\nend.\nset z to not call zero.\nprint z.\n'
+                       'set w to not call zero or 1.\nprint w.\n',
+    'caller variables': 'define show\n  print seen is v.\nend.\nset v to 4.\ncall show.\n',
+    'top-level return': 'set x to 5.\nreturn x plus 1.\nprint unreachable.\n',
+    'undefined variable': 'set x to y plus 1.\n',
+    'undefined function': 'set x to call nothing with 1.\n',
+}
+
+@pytest.mark.parametrize('engine', ENGINES[1:])
+@pytest.mark.parametrize('name, source, answers', examples(), ids=lambda value: value if isinstance(value, str) else '')
+def test_examples_agree_with_tree(engine, name, source, answers):
+    assert run(source, engine, answers) == run(source, 'tree', answers)
+
+@pytest.mark.parametrize('engine', ENGINES)
+@pytest.mark.parametrize('name', PROGRAMS)
+def test_programs_agree_with_tree(engine, name):
+    source = PROGRAMS[name]
+    assert run(source, engine) == run(source, 'tree')
+
+@pytest.mark.parametrize('engine', ENGINES)
+@pytest.mark.parametrize('name', PROGRAMS)
+def test_optimizer_keeps_output(engine, name):
+    source = PROGRAMS[name]
+    assert run(source, engine, optimize=False) == run(source, engine)
+
+def test_semantics():
+    assert run(PROGRAMS['division by zero']) == '0\n'
+    assert run(PROGRAMS['literal fallback']) == 'hello world\nAda\n'
+    assert run(PROGRAMS['top-level return']) == 'Error: 6\n'
+    assert run(PROGRAMS['undefined function']) == "Error: Function 'nothing' not defined\n"
+    assert run(PROGRAMS['recursion']) == '3628800\n'
+
+def test_engine_only_options_are_rejected():
+    assert run('print 1.', 'vm', max_steps=10) == "Error: max_steps needs the tree engine, not 'vm'\n"
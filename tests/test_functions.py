@@ -0,0 +1,50 @@
+import pytest
+
+from support import ENGINES, run, spp
+
+SCOPES = {
+    'caller variable': ('define show with d\n  print v.\nend.\nset v to 4.\nset r to call show with 0.\n', '4\n'),
+    'calling frame': ('define inner with a\n  print b.\nend.\ndefine outer with b\n  set r to call inner with 0.\n'
+                      'end.\nset r to call outer with 7.\n', '7\n'),
+    'parameter shadows global': ('set n to 1.\ndefine f with n\n  print n.\nend.\nset r to call f with 2.\n'
+                                 'print n.\n', '2\n1\n'),
+    'assignment stays in call': ('set x to 1.\ndefine f with a\n  set x to a.\n  print x.\nend.\n'
+                                 'set r to call f with 5.\nprint x.\n', '5\n1\n'),
+    'missing argument': ('set b to 3.\ndefine f with a, b\n  print b.\nend.\nset r to call f with 1.\n', '3\n'),
+    'recursive locals': ('define sum with n\n  if n is less than 1 then\n    return 0.\n  end.\n'
+                         '  set rest to call sum with n minus 1.\n  set total to n plus rest.\n  return total.\nend.\n'
+                         'set s to call sum with 50.\nprint s.\n', '1275\n'),
+}
+
+@pytest.mark.parametrize('engine', ENGINES)
+@pytest.mark.parametrize('name', SCOPES)
+def test_scopes(engine, name):
+    source, expected = SCOPES[name]
+    assert run(source, engine) == expected
+
+def test_parameters_take_the_first_slots():
+    program = spp.Parser(spp.Lexer('set g to 1.\ndefine f with a, b\n  set t to a plus g.\n  return t.\nend.\n')).parse()
+    spp.Resolver().resolve(program)
+    top, func = program.statements
+    assert top.slot is None
+    assert func.param_slots == [0, 1]
+    assert sorted(func.locals.items(), key=lambda item: item[1])[:2] == [('a', 0), ('b', 1)]
+    assert sorted(func.locals.values()) == [0, 1, 2, 3]
+
+DEEP = ('define down with n\n  if n is less than 1 then\n    return 0.\n  end.\n  set r to call down with n minus 1.\n'
+        '  return r plus 1.\nend.\nset x to call down with 20000.\nprint x.\n')
+
+@pytest.mark.parametrize('engine', ['tree', 'vm'])
+def test_recursion_is_not_limited_by_the_python_stack(engine):
+    assert run(DEEP, engine) == '20000\n'
+
+@pytest.mark.parametrize('engine', ['tree', 'vm'])
+def test_call_depth_cap(engine):
+    assert run(DEEP, engine, max_call_depth=100) == "Error: Maximum call depth of 100 exceeded in call to 'down'\n"
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_return_leaves_nested_blocks(engine):
+    source = ('define find with xs\n  for each x in xs\n    repeat while 1 equals 1\n      if x is greater than 2 then\n'
+              '        return x.\n      end.\n      set x to x plus 1.\n    end.\n  end.\n  return 0.\nend.\n'
+              'set r to call find with 1.\nprint r.\n')
+    assert run(source, engine) == '3\n'
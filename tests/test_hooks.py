@@ -0,0 +1,51 @@
+import pytest
+
+from support import examples, run, spp
+
+SOURCE = ('define double with n\n  return n times 2.\nend.\nset x to 4.\nset y to call double with x.\n'
+          'print y.\nask q and store in a.\n')
+
+def test_events_see_the_run():
+    events = []
+    hooks = spp.Hooks()
+    hooks.add('on_statement', lambda line, node: events.append(('statement', line)))
+    hooks.add('on_call', lambda name, args: events.append(('call', name, args)))
+    hooks.add('on_return', lambda name, value: events.append(('return', name, value)))
+    hooks.add('on_print', lambda text: events.append(('print', text)))
+    hooks.add('on_ask', lambda prompt, value: events.append(('ask', prompt, value)))
+    hooks.add('on_assign', lambda name, value: events.append(('assign', name, value)))
+    assert run(SOURCE, inputs=['ok'], hooks=hooks, memo_size=0) == '8\n'
+    assert events == [('statement', 1), ('statement', 4), ('assign', 'x', 4), ('statement', 5),
+                      ('call', 'double', [4]), ('statement', 2), ('return', 'double', 8), ('assign', 'y', 8),
+                      ('statement', 6), ('print', '8'), ('statement', 7), ('assign', 'a', 'ok'),
+                      ('ask', 'q', 'ok')]
+
+def test_unknown_event_is_rejected():
+    with pytest.raises(Exception, match="Unknown hook event 'on_foo'"):
+        spp.Hooks().add('on_foo', print)
+
+@pytest.mark.parametrize('name, source, answers', examples(), ids=lambda value: value if isinstance(value, str) else '')
+def test_hooked_runs_keep_output(name, source, answers):
+    printed = []
+    hooks = spp.Hooks()
+    hooks.add('on_statement', lambda line, node: None)
+    hooks.add('on_print', printed.append)
+    output = run(source, inputs=answers, hooks=hooks)
+    assert output == run(source, inputs=answers)
+    assert ''.join(text + '\n' for text in printed) == output
+
+@pytest.mark.parametrize('event', spp.Hooks.EVENTS)
+def test_only_statement_and_call_hooks_step_every_child(event):
+    hooks = spp.Hooks()
+    hooks.add(event, lambda *args: None)
+    interpreter = spp.HookedInterpreter(hooks)
+    assert interpreter.step_every_child == (event in ('on_statement', 'on_call', 'on_return'))
+
+def test_print_hooks_keep_the_fast_path():
+    printed = []
+    hooks = spp.Hooks()
+    hooks.add('on_print', printed.append)
+    source = SOURCE.replace('ask q and store in a.\n', 'set z to call double with 5.\nprint z.\n')
+    assert not spp.HookedInterpreter(hooks).step_every_child
+    assert run(source, hooks=hooks) == run(source) == '8\n10\n'
+    assert printed == ['8', '10']
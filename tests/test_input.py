@@ -0,0 +1,73 @@
+import random
+from unittest import mock
+
+import pytest
+
+from support import ENGINES, examples, run, spp
+
+def old_coerce_input(value: str):
+    try:
+        return int(value)
+    except ValueError:
+        try:
+            return float(value)
+        except ValueError:
+            return value
+
+SOURCE = 'ask first store a.\nask second store b.\nprint a plus b.\n'
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_answers_come_from_the_input_source(engine):
+    assert run(SOURCE, engine, ['2', '3']) == '5\n'
+    assert run(SOURCE, engine, ['x', 'y']) == 'xy\n'
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_running_out_of_answers_names_the_ask(engine):
+    assert run(SOURCE, engine, ['2']) == "Error: No input left for ask 'second'\n"
+
+def test_batch_input_reads_lines():
+    answers = spp.BatchInput(['1\n', 'two\n', '3.5'])
+    assert [answers.ask('q') for _ in range(3)] == [1, 'two', 3.5]
+
+def test_prompt_input_flushes_and_prompts():
+    sink = []
+
+    class Sink:
+        def write(self, text):
+            sink.append(text)
+
+        def flush(self):
+            pass
+    output = spp.OutputBuffer(Sink(), 0)
+    output.write_line('before')
+    with mock.patch('builtins.input', lambda prompt: sink.append(prompt) or '7'):
+        assert spp.PromptInput(output).ask('n ') == 7
+    assert sink == ['before\n', 'n ']
+
+@pytest.mark.parametrize('value', ['12', '-3', '+4', ' 5 ', '1_000', '1__0', '_1', '0x10', '1.5', '.5', '5.', '1e3',
+                                   '1E-2', '1_0.2_5', 'inf', '-Infinity', 'NaN', 'nan1', '', ' ', 'abc', '1 2',
+                                   '١٢', '\x1c5', '5\x1f', ' 7', '9' * 5000])
+def test_coerce_input_matches_int_and_float(value):
+    expected = old_coerce_input(value) if len(value) < 4000 else float(value)
+    result = spp.coerce_input(value)
+    assert type(result) is type(expected)
+    assert result == expected or (result != result and expected != expected)
+
+def test_coerce_input_matches_int_and_float_on_random_answers():
+    rng = random.Random(0)
+    alphabet = '0123456789+-._eE \tinfaINFxy١\x1c'
+    for _ in range(20000):
+        value = ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 8)))
+        expected = old_coerce_input(value)
+        result = spp.coerce_input(value)
+        assert type(result) is type(expected), value
+        assert result == expected or (result != result and expected != expected), value
+
+@pytest.mark.parametrize('engine', ENGINES)
+@pytest.mark.parametrize('form', ['and store in', 'store in', 'and store', 'store'])
+def test_ask_forms(engine, form):
+    assert run(f'ask your age {form} age.\nprint age.\n', engine, ['30']) == '30\n'
+
+def test_calculator_example_runs():
+    name, source, answers = next(example for example in examples() if example[0] == '08_calculator.spp')
+    assert 'Error' not in run(source, inputs=answers)
@@ -0,0 +1,52 @@
+import pytest
+
+from support import examples, spp
+
+T = spp.TokenType
+
+def tokens(text: str):
+    return [(token.type, token.value, token.line, token.column) for token in spp.Lexer(text).tokenize()]
+
+def test_statement():
+    assert tokens('set x to 1.5.\nprint x.') == [
+        (T.SET, 'set', 1, 1), (T.IDENTIFIER, 'x', 1, 5), (T.TO, 'to', 1, 7), (T.NUMBER, 1.5, 1, 10),
+        (T.PERIOD, '.', 1, 13), (T.PRINT, 'print', 2, 1), (T.IDENTIFIER, 'x', 2, 7), (T.PERIOD, '.', 2, 8),
+        (T.EOF, None, 2, 9)]
+
+def test_keywords_ignore_case_and_keep_their_text():
+    assert tokens('SET Print')[:2] == [(T.SET, 'SET', 1, 1), (T.PRINT, 'Print', 1, 5)]
+
+@pytest.mark.parametrize('text, token_type, value', [
+    ('divided by', T.DIVIDED_BY, 'divided by'),
+    ('Divided  BY', T.DIVIDED_BY, 'divided by'),
+    ('is greater than', T.IS_GREATER_THAN, 'is greater than'),
+    ('is\nless\n than', T.IS_LESS_THAN, 'is less than'),
+])
+def test_multi_word_operators(text, token_type, value):
+    last_line = text.rsplit('\n', 1)[-1]
+    assert tokens(text + ' 2')[:2] == [(token_type, value, 1, 1),
+                                       (T.NUMBER, 2, 1 + text.count('\n'), len(last_line) + 2)]
+
+@pytest.mark.parametrize('text, words', [('divided byte', ['divided', 'byte']), ('is greatest', ['is', 'greatest']),
+                                         ('is less', ['is', 'less']), ('is lesser than', ['is', 'lesser', 'than'])])
+def test_partial_operators_stay_words(text, words):
+    assert [value for _, value, _, _ in tokens(text)] == words + [None]
+
+def test_comments_and_blank_lines_are_skipped():
+    assert tokens('// note\n\n  print 1. // more\nend')[1:] == [
+        (T.NUMBER, 1, 3, 9), (T.PERIOD, '.', 3, 10), (T.END, 'end', 4, 1), (T.EOF, None, 4, 4)]
+
+def test_number_then_period():
+    assert [value for _, value, _, _ in tokens('1. 2.5.')] == [1, '.', 2.5, '.', None]
+
+def test_invalid_character_is_raised_when_reached():
+    lexer = spp.Lexer('print 1.\n$')
+    assert [lexer.get_next_token().type for _ in range(3)] == [T.PRINT, T.NUMBER, T.PERIOD]
+    with pytest.raises(Exception, match=r"Invalid character '\$' at 2:1"):
+        lexer.get_next_token()
+    with pytest.raises(Exception, match=r"Invalid character '\$' at 2:1"):
+        spp.Lexer('print 1.\n$').tokenize()
+
+def test_examples_tokenize():
+    for name, source, _ in examples():
+        assert tokens(source)[-1][0] == T.EOF
@@ -0,0 +1,75 @@
+from support import run, spp
+
+def test_step_limit_stops_a_loop():
+    source = 'set i to 0.\nrepeat while 1 equals 1\n  set i to i plus 1.\nend.\n'
+    assert run(source, max_steps=1000) == 'Error: Step limit of 1000 exceeded in the loop on line 2\n'
+
+def test_step_limit_names_the_called_function():
+    source = 'define spin with n\n  set m to call spin with n plus 1.\n  return m.\nend.\nset x to call spin with 0.\n'
+    assert run(source, max_steps=500, memo_size=0) == \
+        "Error: Step limit of 500 exceeded in call to 'spin' (defined on line 1)\n"
+
+def test_step_limit_counts_skipped_iterations():
+    # Counting loops and reductions run natively, but still take their steps
+    counting = 'set i to 0.\nrepeat while i is less than 5000\n  set i to i plus 1.\nend.\nprint i.\n'
+    assert run(counting, max_steps=10000) == '5000\n'
+    assert run(counting, max_steps=4000).startswith('Error: Step limit of 4000')
+    reduction = 'set xs to 1, 2, 3, 4, 5.\nset t to 0.\nfor each x in xs\n  set t to t plus x.\nend.\nprint t.\n'
+    assert run(reduction, max_steps=5) == '15\n'
+    assert run(reduction, max_steps=4).startswith('Error: Step limit of 4')
+
+def test_programs_within_the_limits_are_unchanged():
+    source = 'set t to 0.\nrepeat 100 times\n  set t to t plus 1.\nend.\nprint t.\n'
+    assert run(source, max_steps=1000, max_memory=1 << 20) == run(source) == '100\n'
+
+def test_memory_limit_stops_a_growing_string():
+    source = 'set s to x.\nrepeat while 1 equals 1\n  set s to s plus s.\nend.\n'
+    output = run(source, max_memory=1 << 16)
+    assert output.startswith('Error: Memory limit of 65536 bytes exceeded in the loop on line 2: ')
+    assert "'s' holds" in output
+
+def test_memory_limit_checks_call_arguments():
+    source = ('define grow with xs\n  set ys to xs plus xs.\n  set z to call grow with ys.\n  return z.\nend.\n'
+              'set start to 1, 2, 3.\nset r to call grow with start.\n')
+    output = run(source, max_memory=1 << 16)
+    assert output.startswith("Error: Memory limit of 65536 bytes exceeded in call to 'grow'")
+
+def held(output):
+    return int(output.split(' holds ')[1].split()[0])
+
+def test_memory_limit_stops_doubling_right_away():
+    source = 'set s to x.\nrepeat while 1 equals 1\n  set s to s plus s.\nend.\n'
+    assert held(run(source, max_memory=1 << 16)) < 2 * (1 << 16) + 100
+
+def test_memory_limit_stops_a_growing_list():
+    source = 'set xs to 0.\nset i to 0.\nrepeat while 1 equals 1\n  set xs to xs, i.\n  set i to i plus 1.\nend.\n'
+    output = run(source, max_memory=1 << 16)
+    assert "exceeded in the loop on line 3: 'xs' holds" in output
+    assert held(output) < 1.25 * (1 << 16)
+
+def test_memory_checks_stay_linear(monkeypatch):
+    measured = []
+
+    def value_size(value):
+        size = spp_value_size(value)
+        measured.append(size)
+        return size
+    spp_value_size = spp.value_size
+    monkeypatch.setattr(spp, 'value_size', value_size)
+
+    def work(n):
+        measured.clear()
+        source = (f'set xs to 0.\nset i to 0.\nrepeat while i is less than {n}\n  set xs to xs, i.\n'
+                  f'  set i to i plus 1.\nend.\nprint i.\n')
+        assert run(source, max_memory=1 << 30) == f'{n}\n'
+        return sum(measured)
+    # Re-measuring the whole list every iteration would make this ratio 4
+    assert work(4000) < 2.5 * work(2000)
+
+def test_value_size_walks_each_list_once():
+    items = [1, 2, 3]
+    assert spp.value_size([items, items]) == spp.value_size([items, [4, 5, 6]]) - spp.value_size([4, 5, 6])
+    nested = 0
+    for i in range(10000):
+        nested = [nested, i]
+    assert spp.value_size(nested) > 10000 * spp.sys.getsizeof([0, 0])
@@ -0,0 +1,74 @@
+import operator
+import random
+from array import array
+
+import pytest
+
+from support import ENGINES, run, spp
+
+def divide(left, right):
+    # List division always gives floats
+    return 0.0 if right == 0 else left / right
+
+OPERATORS = {'plus': operator.add, 'minus': operator.sub, 'times': operator.mul, 'divided by': divide}
+
+def items(value):
+    return value.items.tolist() if isinstance(value, spp.NumberList) else value
+
+def same_item(result, expected) -> bool:
+    # repr tells -0.0 from 0.0 and matches nan with nan
+    return type(result) is type(expected) and repr(result) == repr(expected)
+
+def test_make_list_packs_numbers():
+    assert spp.make_list([1, 2]).items == array('q', [1, 2])
+    assert spp.make_list([1, 2.5]).items == array('d', [1.0, 2.5])
+    assert spp.make_list([1, 'a']) == [1, 'a']
+    assert spp.make_list([2 ** 70, 1]) == [2 ** 70, 1]
+
+@pytest.mark.parametrize('word', OPERATORS)
+@pytest.mark.parametrize('engine', ENGINES)
+def test_element_wise_arithmetic(engine, word):
+    source = (f'set xs to 6, 3, 0.\nset ys to 2, 0, 4.\nset a to xs {word} ys.\nset b to xs {word} 3.\n'
+              f'set c to 3 {word} xs.\nprint a.\nprint b.\nprint c.\n')
+    op = OPERATORS[word]
+    xs, ys = [6, 3, 0], [2, 0, 4]
+    expected = [[op(x, y) for x, y in zip(xs, ys)], [op(x, 3) for x in xs], [op(3, x) for x in xs]]
+    assert run(source, engine) == ''.join(', '.join(map(str, values)) + '\n' for values in expected)
+
+def test_list_divided_by_zero_is_zeros():
+    assert run('set xs to 1, 2.\nset ys to xs divided by 0.\nprint ys.\n') == '0.0, 0.0\n'
+
+def test_lengths_must_match():
+    assert run('set xs to 1, 2.\nset ys to 1, 2, 3.\nset zs to xs plus ys.\n') == \
+        'Error: Cannot combine lists of 2 and 3 items\n'
+
+def test_lists_are_not_hashable():
+    with pytest.raises(TypeError):
+        hash(spp.make_list([1, 2]))
+
+@pytest.mark.parametrize('use_numpy', [True, False])
+@pytest.mark.parametrize('word', OPERATORS)
+def test_bulk_paths_match_item_by_item(monkeypatch, use_numpy, word):
+    if use_numpy and spp.numpy is None:
+        pytest.skip('NumPy is not installed')
+    if not use_numpy:
+        monkeypatch.setattr(spp, 'numpy', None)
+    rng = random.Random(word)
+    op = OPERATORS[word]
+    samples = [
+        [rng.randint(-1000, 1000) for _ in range(100)],
+        [rng.choice([0, 0.5, -2.25, 3]) for _ in range(100)],
+        [rng.choice([2 ** 62, -2 ** 62, 2 ** 53 + 1, 7]) for _ in range(100)],
+        [float('inf'), float('-inf'), -0.0, float('nan')] * 25,
+    ]
+    list_op = operator.truediv if word == 'divided by' else op
+    for left in samples:
+        for right in samples + [3, 0, 2 ** 62, 0.5]:
+            right_value = spp.make_list(right) if isinstance(right, list) else right
+            # Compare against the packed items: a list holding any float holds only floats
+            left_items = items(spp.make_list(left))
+            right_items = items(right_value) if isinstance(right, list) else [right] * len(left_items)
+            expected = list(map(op, left_items, right_items))
+            result = items(list_op(spp.make_list(left), right_value))
+            assert len(result) == len(expected)
+            assert all(map(same_item, result, expected))
@@ -0,0 +1,62 @@
+import pytest
+
+from support import run, spp
+
+def analyzed_loop(source: str) -> spp.ASTNode:
+    program = spp.Parser(spp.Lexer(source)).parse()
+    spp.Interpreter.prepare(program)
+    return program.statements[-1]
+
+COUNTING_LOOPS = [
+    'set i to 0.\nrepeat while i is less than 10\n  set i to i plus 1.\nend.\nprint i.\n',
+    'set i to 1.\nset t to 0.\nrepeat while i is less than 20\n  set t to t plus i.\n  set i to i plus 3.\nend.\n'
+    'print i.\nprint t.\n',
+    'set i to 10.\nrepeat while i is greater than 0\n  print i.\n  set i to i minus 2.\nend.\nprint i.\n',
+    'set i to 0.\nset n to 7.5.\nrepeat while i is less than n\n  set i to i plus 1.\nend.\nprint i.\n',
+    'set i to 0.5.\nrepeat while i is less than 3\n  set i to i plus 1.\nend.\nprint i.\n',
+    'set i to 5.\nrepeat while i is less than 3\n  set i to i plus 1.\nend.\nprint i.\n',
+]
+
+@pytest.mark.parametrize('source', COUNTING_LOOPS)
+def test_counting_loops_match_unoptimized(source):
+    assert run(source) == run(source, optimize=False)
+
+def test_counting_loop_is_detected():
+    loop = analyzed_loop('set i to 0.\nrepeat while i is less than 10\n  set i to i plus 1.\nend.\n')
+    assert loop.counting is not None and loop.counting.step == 1
+
+def test_loop_that_changes_its_limit_is_not_counting():
+    loop = analyzed_loop('set i to 0.\nset n to 5.\nrepeat while i is less than n\n'
+                         '  set n to n minus 1.\n  set i to i plus 1.\nend.\n')
+    assert loop.counting is None
+
+REDUCTIONS = {
+    'sum': 'set t to 0.\nfor each x in xs\n  set t to t plus x.\nend.\nprint t.\nprint x.\n',
+    'product': 'set t to 1.\nfor each x in xs\n  set t to t times x.\nend.\nprint t.\n',
+    'count': 'set t to 0.\nfor each x in xs\n  set t to t plus 1.\nend.\nprint t.\n',
+    'max': 'set t to 0.\nfor each x in xs\n  if x is greater than t then\n    set t to x.\n  end.\nend.\nprint t.\n',
+    'min': 'set t to 100.\nfor each x in xs\n  if x is less than t then\n    set t to x.\n  end.\nend.\nprint t.\n',
+    'several': 'set s to 0.\nset c to 0.\nfor each x in xs\n  set s to x plus s.\n  set c to c plus 1.\nend.\n'
+               'print s.\nprint c.\n',
+}
+
+LISTS = ['3, 1, 4, 1, 5, 9, 2, 6', '1.5, 2.25, -3.0', '7', 'a, b', '1, two, 3']
+
+@pytest.mark.parametrize('list_source', LISTS)
+@pytest.mark.parametrize('kind', REDUCTIONS)
+def test_reductions_match_unoptimized(kind, list_source):
+    source = f'set xs to {list_source}.\n' + REDUCTIONS[kind]
+    assert run(source) == run(source, optimize=False)
+
+@pytest.mark.parametrize('kind', REDUCTIONS)
+def test_reduction_is_detected(kind):
+    loop = analyzed_loop('set xs to 1, 2.\n' + REDUCTIONS[kind].split('end.\nprint')[0] + 'end.\n')
+    assert isinstance(loop, spp.ForEachStatement) and loop.reduction is not None
+
+def test_reduction_with_a_text_accumulator_runs_the_loop():
+    source = 'set xs to 1, 2, 3.\nset t to a.\nfor each x in xs\n  set t to t plus x.\nend.\nprint t.\n'
+    assert run(source) == run(source, optimize=False)
+
+def test_large_integer_sum():
+    source = 'set xs to 9223372036854775807, 9223372036854775807.\n' + REDUCTIONS['sum']
+    assert run(source) == '18446744073709551614\n9223372036854775807\n'
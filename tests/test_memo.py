@@ -0,0 +1,44 @@
+import pytest
+
+from support import run, spp
+
+FIB = ('define fib with n\n  if n is less than 2 then\n    return n.\n  end.\n  set a to call fib with n minus 1.\n'
+       '  set b to call fib with n minus 2.\n  return a plus b.\nend.\nset x to call fib with 25.\nprint x.\n')
+
+PROGRAMS = {
+    'free variable changes': 'define f with n\n  return n plus k.\nend.\nset k to 1.\nset a to call f with 1.\n'
+                             'set k to 10.\nset b to call f with 1.\nprint a.\nprint b.\n',
+    'caller frame': 'define g with n\n  return n plus m.\nend.\ndefine h with m\n  set r to call g with 1.\n'
+                    '  return r.\nend.\nset a to call h with 2.\nset b to call h with 3.\nprint a.\nprint b.\n',
+    'int and float': 'define half with n\n  return n divided by 2.\nend.\nset a to call half with 3.\n'
+                     'set b to call half with 3.0.\nprint a.\nprint b.\n',
+    'printing function': 'define shout with n\n  print n.\n  return n.\nend.\nset a to call shout with 1.\n'
+                         'set b to call shout with 1.\n',
+    'missing argument': 'define f with a, b\n  return b.\nend.\nset b to 1.\nset x to call f with 0.\n'
+                        'set b to 2.\nset y to call f with 0.\nprint x.\nprint y.\n',
+    'list argument': 'define first with xs\n  for each x in xs\n    return x.\n  end.\nend.\nset xs to 4, 5.\n'
+                     'set a to call first with xs.\nprint a.\n',
+}
+
+@pytest.mark.parametrize('name', PROGRAMS)
+def test_memoized_runs_match_uncached(name):
+    assert run(PROGRAMS[name]) == run(PROGRAMS[name], memo_size=0)
+
+def test_pure_calls_hit_the_cache():
+    # The stats go to stderr, so they are not ordered with the output
+    output = run(FIB, memo_stats=True)
+    assert '75025\n' in output
+    assert 'memo fib: hits=23 misses=26 ' in output
+
+def test_functions_with_effects_are_not_memoized():
+    output = run(PROGRAMS['printing function'], memo_stats=True)
+    assert output == '1\n1\n'
+
+def test_cache_evicts_the_least_recently_used_entry():
+    cache = spp.MemoCache(2, ())
+    cache.put((1,), 'a')
+    cache.put((2,), 'b')
+    assert cache.get((1,)) == 'a'
+    cache.put((3,), 'c')
+    assert cache.get((2,)) is spp.UNSET
+    assert (cache.hits, cache.misses, cache.evictions) == (1, 1, 1)
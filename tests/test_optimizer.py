@@ -0,0 +1,50 @@
+from support import run, spp
+
+def optimized(source: str) -> spp.Program:
+    return spp.Optimizer().optimize(spp.Parser(spp.Lexer(source)).parse())
+
+def prepared(source: str) -> spp.Program:
+    program = optimized(source)
+    spp.Interpreter.prepare(program)
+    return program
+
+def test_folds_constant_expressions():
+    statement = optimized('set x to 2 plus 3 times 4.\n').statements[0]
+    assert type(statement.value) is spp.Literal
+    assert statement.value.value == 14
+
+def test_folded_division_by_zero_is_zero():
+    statement = optimized('set x to 6 divided by 0.\n').statements[0]
+    assert type(statement.value) is spp.Literal
+    assert statement.value.value == 0
+
+def test_keeps_operations_that_fail_at_run_time():
+    statement = optimized('set x to 1, 2 minus hello.\n').statements[0]
+    assert not isinstance(statement.value, spp.Literal)
+
+def test_removes_constant_branches_and_dead_loops():
+    optimizer = spp.Optimizer()
+    program = optimizer.optimize(spp.Parser(spp.Lexer(
+        'if 1 equals 2 then\n  print no.\notherwise\n  print yes.\nend.\n'
+        'repeat while 1 is greater than 2\n  print never.\nend.\n')).parse())
+    assert [type(stmt) for stmt in program.statements] == [spp.PrintStatement]
+    assert optimizer.removed > 0
+    assert run('if 1 equals 2 then\n  print no.\notherwise\n  print yes.\nend.\n') == 'yes\n'
+
+def test_literal_fallback_needs_the_whole_program():
+    source = 'print word.\n'
+    assert type(optimized(source).statements[0].expression) is spp.Literal
+    program = spp.Optimizer(whole_program=False).optimize(spp.Parser(spp.Lexer(source)).parse())
+    assert type(program.statements[0].expression) is spp.Variable
+
+def test_marks_loop_invariants():
+    loop = prepared('set k to 3.\nset i to 0.\nset t to 0.\nrepeat while i is less than 10\n'
+                    '  set t to t plus k times 2.\n  set i to i plus 1.\nend.\n').statements[-1]
+    assert len(loop.invariants) == 1
+
+def test_invariants_follow_the_enclosing_loop():
+    # The inner limit changes with every outer iteration
+    source = ('set n to 0.\nrepeat 3 times\n  set n to n plus 1.\n  set k to n.\n  set j to 0.\n'
+              '  repeat while j is less than k times 2\n    set j to j plus 1.\n  end.\n  print j.\nend.\n')
+    assert run(source) == '2\n4\n6\n'
+    assert run(source, optimize=False) == '2\n4\n6\n'
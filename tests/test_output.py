@@ -0,0 +1,80 @@
+import contextlib
+import io
+from unittest import mock
+
+import pytest
+
+from support import ENGINES, run, spp
+
+class Sink:
+    """Records each write and flush"""
+    def __init__(self, tty: bool = False):
+        self.events = []
+        self.tty = tty
+
+    def write(self, text):
+        self.events.append(text)
+
+    def flush(self):
+        self.events.append('flush')
+
+    def isatty(self):
+        return self.tty
+
+def test_lines_wait_for_flush():
+    sink = Sink()
+    output = spp.OutputBuffer(sink, 0)
+    output.write_line('a')
+    output.write_line('b')
+    assert sink.events == []
+    output.flush()
+    assert sink.events == ['a\nb\n', 'flush']
+
+def test_flush_every_n_lines():
+    sink = Sink()
+    output = spp.OutputBuffer(sink, 2)
+    for text in 'abcde':
+        output.write_line(text)
+    assert sink.events == ['a\nb\n', 'flush', 'c\nd\n', 'flush']
+
+def test_full_buffer_is_written():
+    sink = Sink()
+    output = spp.OutputBuffer(sink, 0, buffer_size=10)
+    output.write_line('12345')
+    output.write_line('6789')
+    assert sink.events == ['12345\n6789\n', 'flush']
+
+@pytest.mark.parametrize('tty, flush_every', [(True, 1), (False, 0)])
+def test_default_policy_follows_the_sink(tty, flush_every):
+    assert spp.OutputBuffer(Sink(tty)).flush_every == flush_every
+
+def test_stdout_sink_follows_sys_stdout():
+    captured = io.StringIO()
+    output = spp.OutputBuffer(spp.StdoutSink(), 0)
+    output.write_line('hi')
+    with contextlib.redirect_stdout(captured):
+        output.flush()
+    assert captured.getvalue() == 'hi\n'
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_engines_write_through_the_buffer(engine):
+    sink = Sink()
+    spp.run_program('print 1.\nprint two.\n', engine, output=spp.OutputBuffer(sink, 0))
+    assert sink.events == ['1\ntwo\n', 'flush']
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_ask_follows_earlier_output(engine):
+    sink = Sink()
+    seen = []
+
+    def answer(prompt):
+        seen.append(list(sink.events))
+        return '3'
+    with mock.patch('builtins.input', answer):
+        spp.run_program('print 1.\nask n store n.\nprint n.\n', engine, output=spp.OutputBuffer(sink, 0))
+    assert seen == [['1\n', 'flush']]
+    assert sink.events == ['1\n', 'flush', '3\n', 'flush']
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_output_comes_before_the_error(engine):
+    assert run('print 1.\nset x to call missing.\n', engine) == "1\nError: Function 'missing' not defined\n"
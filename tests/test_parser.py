@@ -0,0 +1,31 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from support import REPO_DIR, run, spp
+
+def parse(source: str) -> spp.Program:
+    return spp.Parser(spp.Lexer(source)).parse()
+
+def test_functions_example_finishes():
+    # The parser used to loop forever on this file
+    result = subprocess.run([sys.executable, os.path.join(REPO_DIR, 'interpreter.py'), '--no-cache',
+                             os.path.join(REPO_DIR, 'examples', '06_functions.spp')],
+                            capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0
+    assert result.stderr == ''
+
+def test_token_that_cannot_start_a_statement_is_an_error():
+    with pytest.raises(Exception, match='Unexpected token'):
+        parse('set x to 1.\nplus 2.\n')
+
+@pytest.mark.parametrize('source, expected', [
+    ('define greet with name.\n  print name.\nend.\nset who to 5.\ncall greet with who.\n', '5\n'),
+    ('set xs to 1, 2.\nfor each x in xs.\n  print x.\nend.\n', '1\n2\n'),
+    ('set i to 0.\nrepeat while i is less than 2.\n  set i to i plus 1.\nend.\nprint i.\n', '2\n'),
+    ('repeat 2 times.\n  print hi.\nend.\n', 'hi\nhi\n'),
+])
+def test_optional_periods(source, expected):
+    assert run(source) == expected
@@ -0,0 +1,55 @@
+import io
+
+import pytest
+
+from support import examples, run, spp
+
+SOURCE = ('define double with n\n  return n times 2.\nend.\nset x to 4.\nset y to call double with x.\n'
+          'print y.\nask q and store in a.\n')
+
+FACT = ('define fact with n\n  if n is less than 2 then\n    return 1.\n  end.\n  set rest to call fact with n minus 1.\n'
+        '  return n times rest.\nend.\nset i to 0.\nrepeat 5 times\n  set f to call fact with 10.\n  set i to i plus 1.\n'
+        'end.\n')
+
+@pytest.mark.parametrize('name, source, answers', examples(), ids=lambda value: value if isinstance(value, str) else '')
+def test_profiling_keeps_output(name, source, answers):
+    profiler = spp.Profiler()
+    assert run(source, inputs=answers, profiler=profiler) == run(source, inputs=answers)
+    assert profiler.elapsed > 0
+
+def test_profiler_counts_lines_and_calls():
+    profiler = spp.Profiler()
+    run(SOURCE, inputs=['ok'], profiler=profiler, memo_size=0)
+    assert profiler.lines[2][0] == 1
+    assert profiler.functions['double'][0] == 1
+
+def test_recursive_calls_count_their_time_once():
+    profiler = spp.Profiler()
+    run(FACT, profiler=profiler, memo_size=0)
+    count, cumulative, self_time = profiler.functions['fact']
+    assert count == 50
+    assert self_time <= cumulative <= profiler.elapsed
+    assert profiler.lines[11][0] == 5
+    assert sum(entry[2] for entry in profiler.lines.values()) <= profiler.elapsed
+
+def test_error_closes_open_entries():
+    profiler = spp.Profiler()
+    output = run('define f with n\n  set x to call missing.\nend.\nset y to call f with 1.\n', profiler=profiler)
+    assert output.startswith('Error:')
+    assert not profiler.open_calls and not profiler.open_lines
+    assert profiler.functions['f'][0] == 1
+
+def test_report_and_stacks(tmp_path):
+    profiler = spp.Profiler()
+    run(FACT, profiler=profiler, memo_size=0)
+    report = io.StringIO()
+    profiler.report(FACT, report)
+    lines = report.getvalue().splitlines()
+    assert lines[0].startswith('profile: ')
+    assert any(line.split()[0] == '11' and line.endswith('set i to i plus 1.') for line in lines)
+    assert any(line.startswith('fact ') for line in lines)
+    path = tmp_path / 'stacks.txt'
+    profiler.write_stacks(str(path))
+    stacks = dict(line.rsplit(' ', 1) for line in path.read_text().splitlines())
+    assert '<program>;fact;fact' in stacks
+    assert all(int(value) > 0 for value in stacks.values())
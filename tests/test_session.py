@@ -0,0 +1,70 @@
+import contextlib
+import io
+from unittest import mock
+
+from support import spp
+
+def session_output(lines, session=None):
+    """Feed lines to a session; returns its output, messages and errors and whether it is still open"""
+    sink = io.StringIO()
+    session = session or spp.Session(output=spp.OutputBuffer(sink, 0))
+    session.interpreter.output.sink = sink
+    open_ = True
+    with contextlib.redirect_stdout(sink), contextlib.redirect_stderr(sink):
+        for line in lines:
+            open_ = session.feed(line)
+    return sink.getvalue(), open_
+
+def test_entries_share_variables_and_functions():
+    output, _ = session_output(['set x to 2.', 'define double with n', '  return n times 2.', 'end.',
+                                'set y to call double with x.', 'print y plus 1.'])
+    assert output == '5\n'
+
+def test_blocks_run_once_complete():
+    session = spp.Session(output=spp.OutputBuffer(io.StringIO(), 0))
+    assert session_output(['repeat 2 times', '  print hi.'], session) == ('', True)
+    assert session_output(['end.'], session) == ('hi\nhi\n', True)
+
+def test_errors_do_not_end_the_session():
+    output, open_ = session_output(['set x to call missing.', 'set y to .', 'print 1.'])
+    first, second, last = output.splitlines()
+    assert first == "Error: Function 'missing' not defined"
+    assert second.startswith('Error: Unexpected token')
+    assert (last, open_) == ('1', True)
+
+def test_later_entries_can_define_printed_names():
+    assert session_output(['print later.', 'set later to 5.', 'print later.'])[0] == 'later\n5\n'
+
+def test_stop_and_quit_end_the_session():
+    assert session_output(['print 1.', 'STOP.']) == ('1\n', False)
+    assert session_output([':quit']) == ('', False)
+
+def test_commands():
+    session = spp.Session(output=spp.OutputBuffer(io.StringIO(), 0))
+    assert session_output([':time'], session)[0] == 'Nothing has run yet\n'
+    assert session_output(['set x to 1.', ':vars'], session)[0] == '  x = 1\n'
+    assert session_output([':time'], session)[0].startswith('parse ')
+    assert session_output(['repeat 2 times', ':cancel', 'print x.'], session)[0] == '1\n'
+    assert session_output([':reset', ':vars'], session)[0] == ''
+    assert session_output([':nope'], session)[0] == 'Unknown command :nope; type :help for commands\n'
+
+def test_load_and_reload(tmp_path):
+    path = tmp_path / 'lib.spp'
+    path.write_text('define f with n\n  return n plus 1.\nend.\n')
+    session = spp.Session(output=spp.OutputBuffer(io.StringIO(), 0))
+    assert session_output([f':load {path}', 'set a to call f with 1.', 'print a.'], session)[0] == '2\n'
+    path.write_text('define f with n\n  return n plus 10.\nend.\n')
+    assert session_output([':reload', 'set a to call f with 1.', 'print a.'], session)[0] == '11\n'
+
+def test_end_of_input_runs_the_unfinished_entry():
+    lines = iter(['print 1.', 'repeat 2 times', '  print 2.'])
+
+    def answer(prompt):
+        line = next(lines, None)
+        if line is None:
+            raise EOFError
+        return line
+    sink = io.StringIO()
+    with contextlib.redirect_stdout(sink), contextlib.redirect_stderr(sink), mock.patch('builtins.input', answer):
+        spp.Session(output=spp.OutputBuffer(sink, 0)).run()
+    assert sink.getvalue().splitlines()[2:] == ['1', 'Error: Expected TokenType.END, got TokenType.EOF', '']
@@ -0,0 +1,55 @@
+import pickle
+
+import pytest
+
+from support import run, spp
+
+def prepared(source: str) -> spp.Program:
+    program = spp.Optimizer().optimize(spp.Parser(spp.Lexer(source)).parse())
+    spp.Interpreter.prepare(program)
+    return program
+
+def binary(left: spp.ASTNode, op: spp.TokenType, right: spp.ASTNode) -> spp.BinaryOp:
+    return spp.BinaryOp(left, spp.Token(op, op.value, 1, 1), right)
+
+@pytest.mark.parametrize('expression', ['x plus 1', '2 times x', 'x minus y', 'x divided by 2', 'x divided by 0',
+                                        'x is less than 10', '10 is greater than x', 'x equals y', 'x or 0',
+                                        '0 or x', 'x times 2 plus y minus 1', 'x plus hello'])
+def test_specialized_operators_match_unoptimized(expression):
+    source = f'set x to 7.\nset y to 3.\nprint {expression}.\nset z to {expression}.\nprint z.\n'
+    assert run(source) == run(source, optimize=False) == run(source, 'vm')
+
+def test_binary_ops_are_specialized():
+    program = prepared('set x to 7.\nset y to x plus 1.\nset z to 2 times x.\nset w to x minus y.\n')
+    kinds = [type(stmt.value) for stmt in program.statements[1:]]
+    assert [kind.__name__ for kind in kinds] == ['AddVariableLiteralOp', 'MultiplyLiteralVariableOp',
+                                                 'SubtractBinaryOp']
+
+@pytest.mark.parametrize('left, right, form', [
+    (spp.Variable('x'), spp.Literal(1), spp.VariableLiteralOp),
+    (spp.Literal(1), spp.Variable('x'), spp.LiteralVariableOp),
+    (spp.Variable('x'), spp.Variable('y'), spp.BinaryOp),
+    (spp.Literal(1), spp.Literal(2), spp.BinaryOp),
+])
+def test_form_follows_the_operand_shapes(left, right, form):
+    node = binary(left, spp.TokenType.PLUS, right)
+    spp.specialize(node)
+    assert type(node).__bases__ == (form,)
+    assert (node.left, node.right, node.op.type) == (left, right, spp.TokenType.PLUS)
+
+@pytest.mark.parametrize('op, left, right, expected', [
+    (spp.TokenType.PLUS, 2, 3, 5), (spp.TokenType.MINUS, 2, 3, -1), (spp.TokenType.TIMES_OP, 2, 3, 6),
+    (spp.TokenType.DIVIDED_BY, 6, 3, 2.0), (spp.TokenType.DIVIDED_BY, 6, 0, 0),
+    (spp.TokenType.EQUALS, 2, 2, True), (spp.TokenType.IS_GREATER_THAN, 2, 3, False),
+    (spp.TokenType.IS_LESS_THAN, 2, 3, True), (spp.TokenType.OR, 0, 0, False),
+])
+def test_apply_is_the_operation(op, left, right, expected):
+    node = binary(spp.Variable('x'), op, spp.Variable('y'))
+    spp.specialize(node)
+    assert node.apply(left, right) == spp.apply_binary_op(op, left, right) == expected
+
+def test_specialized_trees_pickle():
+    program = prepared('set x to 7.\nset y to x plus 1.\nprint 2 times y.\n')
+    copy = pickle.loads(pickle.dumps(program))
+    assert type(copy.statements[1].value) is spp.AddVariableLiteralOp
+    assert type(copy.statements[2].expression) is spp.MultiplyLiteralVariableOp
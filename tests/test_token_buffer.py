@@ -0,0 +1,49 @@
+import pytest
+
+from support import examples, spp
+
+C = spp.TokenCode
+
+def columns(buffer: spp.TokenBuffer):
+    return [(buffer.types[index], buffer.value(index), buffer.lines[index], buffer.column(index))
+            for index in range(len(buffer))]
+
+def test_columns_hold_codes_offsets_and_lines():
+    buffer = spp.Lexer('set x to 12.\n  print x.').token_buffer()
+    assert list(buffer.types) == [C.SET, C.IDENTIFIER, C.TO, C.NUMBER, C.PERIOD, C.PRINT, C.IDENTIFIER, C.PERIOD,
+                                  C.EOF]
+    assert list(buffer.starts[:4]) == [0, 4, 6, 9]
+    assert list(buffer.ends[:4]) == [3, 5, 8, 11]
+    assert list(buffer.lines) == [1, 1, 1, 1, 1, 2, 2, 2, 2]
+    assert buffer.column(5) == 3
+
+def test_values_are_sliced_on_demand():
+    buffer = spp.Lexer('Divided\n BY divided 2.5 7 ,').token_buffer()
+    assert [buffer.value(index) for index in range(len(buffer))] == ['divided by', 'divided', 2.5, 7, ',', None]
+
+def test_codes_match_token_types():
+    assert [spp.TOKEN_TYPES[code] for code in spp.TOKEN_CODES.values()] == list(spp.TOKEN_CODES)
+
+@pytest.mark.parametrize('name, source, answers', examples(), ids=lambda value: value if isinstance(value, str) else '')
+def test_unicode_scan_matches_ascii_scan(name, source, answers):
+    # A non-ASCII comment at the end sends the source down the per-match path
+    ascii_buffer = spp.Lexer(source).token_buffer()
+    unicode_buffer = spp.Lexer(source + '\n// é').token_buffer()
+    assert columns(ascii_buffer)[:-1] == columns(unicode_buffer)[:-1]
+
+def test_buffer_stops_before_an_invalid_character():
+    for source in ('print 1.\n$ print 2.', 'print 1.\n$ print é.'):
+        buffer = spp.Lexer(source).token_buffer()
+        assert list(buffer.types) == [C.PRINT, C.NUMBER, C.PERIOD]
+        assert str(buffer.error) == "Invalid character '$' at 2:1"
+
+def test_truncate_drops_every_column():
+    buffer = spp.Lexer('print 1.').token_buffer()
+    buffer.truncate(1)
+    assert (len(buffer), len(buffer.starts), len(buffer.ends), len(buffer.lines)) == (1, 1, 1, 1)
+
+def test_tokens_are_built_from_the_buffer():
+    lexer = spp.Lexer('print 1.')
+    token = lexer.get_next_token()
+    assert (token.type, token.value, token.line, token.column) == (spp.TokenType.PRINT, 'print', 1, 1)
+    assert not hasattr(token, '__dict__')